@@ -0,0 +1,111 @@
+"""
+Patches every .apbfbb file of a directory without the client.
+Run from the Archipelago directory with `python -m worlds.bfbb.BatchPatch <patch dir>`.
+
+The base ROM is hashed once, the HIP edits of all patches are collected,
+identical ones are made only once and spread over the worker processes,
+the games are then written by as many threads.
+With --delta only the writes against the base ROM are stored, see Delta.py.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from .Delta import DELTA_FILE_ENDING, write_delta
+from .PatchCache import file_md5
+from .Rom import BFBB_HASH, BfBBContainer
+
+logger = logging.getLogger("BfBBPatch")
+
+
+def batch_patch(patch_files: List[str], output_dir: Optional[str] = None, workers: int = 1,
+                delta: bool = False, force: bool = False) -> List[str]:
+    """
+    Patch all files, returns the paths of the patched games.
+    With `delta` deltas are written instead, except for games whose HIPs don't fit in place.
+    `workers` processes edit the HIPs and as many threads write the games.
+    Unless `force` is given the base ROM has to match the known MD5 hash.
+    """
+    from .inc.wwrando.wwlib.gcm import GCM
+    rom_path = BfBBContainer.get_rom_path()
+    rom_md5 = file_md5(rom_path)
+    if rom_md5 != BFBB_HASH:
+        if not force:
+            raise Exception(f"Supplied Base Rom does not match known MD5 Hash for BfBB (US). "
+                            f"Get the correct game and version or use --force. "
+                            f"The known MD5 Hash is \"{BFBB_HASH}\".")
+        logger.warning(f"Base ROM doesn't match the known MD5 hash \"{BFBB_HASH}\"")
+    gcm = GCM(rom_path)
+    gcm.read_entire_disc()
+
+    all_edits = []
+    job_edits = []
+    for patch_file in patch_files:
+        with zipfile.ZipFile(patch_file, 'r') as patch_archive:
+            if not BfBBContainer.check_version(patch_archive):
+                raise Exception(f"{patch_file}: apbfbb version doesn't match this apworld.")
+            edits = list(BfBBContainer.get_patch_hip_edits(patch_archive).items())
+        job_edits.append((len(all_edits), len(edits)))
+        all_edits += edits
+    logger.info(f"{len(patch_files)} patches with {len(all_edits)} HIP edits")
+    hips = BfBBContainer.edit_hips(gcm, rom_path, all_edits, processes=workers, keep_workers=False)
+
+    def write_result(patch_file: str, job_edit: Tuple[int, int]) -> str:
+        start, count = job_edit
+        job_hips = {hip_name: data for (hip_name, _), data in zip(all_edits[start:start + count],
+                                                                  hips[start:start + count])}
+        base_name = os.path.join(output_dir or os.path.dirname(patch_file),
+                                 os.path.splitext(os.path.basename(patch_file))[0])
+        if delta:
+            writes = BfBBContainer.get_in_place_hip_changes(gcm, rom_path, job_hips) if job_hips else []
+            if writes is not None:
+                with zipfile.ZipFile(patch_file, 'r') as patch_archive:
+                    writes += BfBBContainer.get_binary_changes(patch_archive)
+                result_path = base_name + DELTA_FILE_ENDING
+                logger.info(f"writing {result_path}")
+                write_delta(result_path, rom_md5, writes)
+                return result_path
+        result_path = base_name + BfBBContainer.result_file_ending
+        logger.info(f"writing {result_path}")
+        # a rebuild keeps the changed HIPs in the GCM, so every game gets its own
+        job_gcm = GCM(rom_path)
+        job_gcm.read_entire_disc()
+        # cloned with only the changes written like in the client, rebuilt if a HIP grew
+        with zipfile.ZipFile(patch_file, 'r') as patch_archive:
+            BfBBContainer.write_patched_iso(patch_archive, job_gcm, rom_path, result_path, job_hips)
+        return result_path
+
+    with ThreadPoolExecutor(max(1, workers)) as executor:
+        return list(executor.map(write_result, patch_files, job_edits))
+
+
+def main(args: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Patch every .apbfbb file of a directory.")
+    parser.add_argument("patch_dir", help="directory containing the .apbfbb files")
+    parser.add_argument("--output", help="directory for the patched games, next to the patch files if not given")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processes editing HIPs and threads writing the games in parallel")
+    parser.add_argument("--delta", action="store_true",
+                        help=f"write {DELTA_FILE_ENDING} files with only the changes instead of full games")
+    parser.add_argument("--force", action="store_true",
+                        help="patch even if the base ROM doesn't match the known MD5 hash")
+    parsed = parser.parse_args(args)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    patch_files = sorted(os.path.join(parsed.patch_dir, file) for file in os.listdir(parsed.patch_dir)
+                         if file.endswith(BfBBContainer.patch_file_ending))
+    if not patch_files:
+        parser.error(f"no {BfBBContainer.patch_file_ending} files in {parsed.patch_dir}")
+    if parsed.output:
+        os.makedirs(parsed.output, exist_ok=True)
+    for result_path in batch_patch(patch_files, parsed.output, parsed.workers, parsed.delta, parsed.force):
+        print(result_path)
+
+
+if __name__ == '__main__':
+    # the patch workers are spawned processes
+    multiprocessing.freeze_support()
+    main()
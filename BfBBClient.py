@@ -1,15 +1,18 @@
 import asyncio
+import multiprocessing
 import os.path
-import shutil
+import random
+import struct
 import subprocess
 import sys
 import time
 import traceback
 import zipfile
-from enum import Flag
-from typing import Callable, Optional, Any, Dict, Tuple
-
-import dolphin_memory_engine
+from bisect import bisect_left
+from collections import Counter
+from enum import Enum, Flag
+from functools import lru_cache
+from typing import Callable, Optional, Any, Dict, Tuple, List, NamedTuple, Set
 
 import Utils
 import settings
@@ -29,7 +32,11 @@ except ModuleNotFoundError:
 from CommonClient import server_loop, gui_enabled, logger, \
     get_base_parser, handle_url_arg
 from settings import get_settings
+from .Items import item_table
+from .Memory import CoalescedReader, MemoryBackend, DolphinMemoryBackend
+from .Profiling import CountingMemoryBackend, ProfilingMemoryBackend, TickProfiler
 from .Rom import BfBBContainer
+from .constants import ItemNames
 
 
 class CheckTypes(Flag):
@@ -41,6 +48,129 @@ class CheckTypes(Flag):
     PURPLE_SO = 32
 
 
+class SceneObjCache:
+    """
+    Obj ptrs resolved from the scene obj table.
+    Objects don't move while a scene is loaded, so resolved ptrs stay valid until the scene key changes.
+    """
+
+    def __init__(self):
+        # (scene id, scene ptr, obj table ptr)
+        self.key: Optional[Tuple[bytes, int, int]] = None
+        self.ptrs: Dict[int, int] = {}
+        # ids that aren't in the scene, most of the ids looked up every tick belong to other scenes
+        self.missing: Set[int] = set()
+        # id -> obj ptr snapshot of the whole obj table, taken lazily and only valid for a single sync tick
+        self.table: Optional[Dict[int, int]] = None
+
+    def set_key(self, key: Optional[Tuple[bytes, int, int]]):
+        if key != self.key:
+            self.key = key
+            self.ptrs.clear()
+            self.missing.clear()
+        self.table = None
+
+    def clear(self):
+        self.set_key(None)
+
+
+class LocationStateCache:
+    """
+    Last seen state bytes of the objs the location checks look at.
+    A check is only evaluated again once its bytes changed, nothing is evaluated while the fingerprint of all
+    state reads of a tick stays the same.
+    """
+
+    def __init__(self):
+        self.key: Optional[Tuple[bytes, int, int]] = None
+        self.fingerprint: Optional[tuple] = None
+        # (location id, obj ptr) -> state bytes
+        self.states: Dict[Tuple[int, int], Optional[bytes]] = {}
+
+    def set_key(self, key: Optional[Tuple[bytes, int, int]]):
+        if key != self.key:
+            self.key = key
+            self.fingerprint = None
+            self.states.clear()
+
+    def clear(self):
+        self.set_key(None)
+
+
+class SyncScheduler:
+    """
+    Decides how long dolphin_sync_task waits before its next tick.
+    Ticks fast right after a scene change or while items are queued, slows down while the game is idle
+    or paused and backs off exponentially (with jitter) while (re)connecting to Dolphin.
+    The back-off is only reset after a tick got past the game and save validation.
+    """
+    FAST_INTERVAL = .1
+    ACTIVE_INTERVAL = .5
+    IDLE_INTERVAL = 1.
+    # stays fast, so loading a save is picked up right away
+    MENU_INTERVAL = .1
+    # how many ticks we stay fast after a scene change and how many quiet ticks it takes to count as idle
+    FAST_TICKS = 10
+    IDLE_TICKS = 20
+    BACKOFF_MIN = 1.
+    BACKOFF_MAX = 30.
+    # wrong game or save, nothing changes until the player does something
+    REFUSED_BACKOFF_MIN = 5.
+    BACKOFF_JITTER = .2
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng = rng if rng is not None else random.Random()
+        self.scene_key = None
+        self.fast_ticks = 0
+        self.quiet_ticks = 0
+        self.backoff = self.BACKOFF_MIN
+        self._wake = asyncio.Event()
+
+    def wake(self):
+        """Cut the current wait short, e.g. because new items arrived."""
+        self._wake.set()
+
+    async def sleep(self, delay: float):
+        try:
+            await asyncio.wait_for(self._wake.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+
+    def connected(self):
+        self.backoff = self.BACKOFF_MIN
+
+    def backoff_interval(self, minimum: Optional[float] = None) -> float:
+        self.backoff = max(self.backoff, minimum or self.BACKOFF_MIN)
+        delay = self.backoff * (1 + self.rng.uniform(-self.BACKOFF_JITTER, self.BACKOFF_JITTER))
+        self.backoff = min(self.backoff * 2, self.BACKOFF_MAX)
+        return delay
+
+    def refused_interval(self) -> float:
+        return self.backoff_interval(self.REFUSED_BACKOFF_MIN)
+
+    def menu_interval(self) -> float:
+        self.scene_key = None
+        return self.MENU_INTERVAL
+
+    def tick_interval(self, scene_key: Any, items_pending: bool, has_control: bool, activity: bool) -> float:
+        if scene_key != self.scene_key:
+            self.scene_key = scene_key
+            self.fast_ticks = self.FAST_TICKS
+        if activity:
+            self.quiet_ticks = 0
+        else:
+            self.quiet_ticks += 1
+        if items_pending and has_control:
+            return self.FAST_INTERVAL
+        if self.fast_ticks > 0:
+            self.fast_ticks -= 1
+            return self.FAST_INTERVAL
+        if not has_control or self.quiet_ticks >= self.IDLE_TICKS:
+            return self.IDLE_INTERVAL
+        return self.ACTIVE_INTERVAL
+
+
 CONNECTION_REFUSED_VANILLA_GAME_STATUS = "Vanilla game detected. Please load the patched game."
 CONNECTION_REFUSED_GAME_STATUS = "Dolphin Connection refused due to invalid Game. Please load the US Version of BfBB or if you already do, restart dolphin."
 CONNECTION_REFUSED_SAVE_STATUS = "Dolphin Connection refused due to invalid Save. " \
@@ -53,6 +183,10 @@ GAME_ID = b'GQPE78'
 
 SCENE_OBJ_LIST_PTR_ADDR = 0x803cb9ec
 SCENE_OBJ_LIST_SIZE_ADDR = 0x803cac08
+# upper bound for the obj table size we are willing to read in one go (0x8 bytes per entry)
+SCENE_OBJ_LIST_MAX_SIZE = 0x4000
+# time given to the game to pick up written item values
+ITEM_SETTLE_DELAY = .01
 
 CUR_SCENE_PTR_ADDR = 0x803c2518
 
@@ -576,6 +710,31 @@ class BfBBCommandProcessor(SuperClientCommandProcessor):
         if isinstance(self.ctx, BfBBContext):
             logger.info(f"Dolphin Status: {self.ctx.dolphin_status}")
 
+    def _cmd_perf(self, mode: str = ""):
+        """
+        Show timings and memory access counts of the recent sync ticks.
+        Use /perf dump to save them as json lines, /perf memory for the memory calls by caller (if profiling is enabled).
+        """
+        if isinstance(self.ctx, BfBBContext):
+            if mode == "memory":
+                if self.ctx.memory_profiler is None:
+                    logger.info("Memory profiling is not enabled, set profile_memory in the bfbb_options of your host.yaml")
+                    return
+                for line in self.ctx.memory_profiler.report():
+                    logger.info(line)
+                return
+            for line in self.ctx.profiler.summary():
+                logger.info(line)
+            if mode == "dump":
+                timestamp = time.strftime('%Y%m%d_%H%M%S')
+                path = Utils.user_path("logs", f"BfBBClient_perf_{timestamp}.jsonl")
+                count = self.ctx.profiler.dump(path)
+                logger.info(f"Wrote {count} ticks to {path}")
+                if self.ctx.memory_profiler is not None:
+                    path = Utils.user_path("logs", f"BfBBClient_memory_{timestamp}.folded")
+                    count = self.ctx.memory_profiler.dump_folded(path)
+                    logger.info(f"Wrote {count} memory call stacks to {path}")
+
     def _cmd_deathlink(self):
         """Toggle Death Link override."""
         if self.ctx.server is None or self.ctx.server.socket.closed or self.ctx.auth is None:
@@ -640,10 +799,17 @@ class BfBBContext(SuperContext):
     items_handling = 0b111  # full remote
     tags = {"AP"}
 
-    def __init__(self, server_address, password):
+    def __init__(self, server_address, password, memory: Optional[MemoryBackend] = None):
         super().__init__(server_address, password)
+        self.memory_profiler: Optional[ProfilingMemoryBackend] = memory \
+            if isinstance(memory, ProfilingMemoryBackend) else None
+        self.memory: MemoryBackend = CountingMemoryBackend(memory if memory is not None else DolphinMemoryBackend())
+        self.profiler = TickProfiler(self.memory)
+        self.sync_scheduler = SyncScheduler()
         self.included_check_types: CheckTypes = CheckTypes.SPAT
+        # (item, index) in index order, only ever appended to
         self.items_received_2 = []
+        self.received_item_counts: Counter = Counter()
         self.dolphin_sync_task = None
         self.dolphin_status = CONNECTION_INITIAL_STATUS
         self.awaiting_rom = False
@@ -663,6 +829,12 @@ class BfBBContext(SuperContext):
         self.previous_shiny_objects = None
         self.instance_id = time.time()
         self.so_to_ring_ratio = 10
+        # scene obj lookups are only cached while a sync tick is running
+        self.use_obj_cache = False
+        self.obj_cache = SceneObjCache()
+        self.location_state_cache = LocationStateCache()
+        # prefetched obj state reads of the current check_locations call
+        self.state_reader: Optional[CoalescedReader] = None
 
     async def disconnect(self, allow_autoreconnect: bool = False):
         self.auth = None
@@ -678,6 +850,8 @@ class BfBBContext(SuperContext):
             self.set_notify(self.current_scene_key)
             self.last_rev_index = -1
             self.items_received_2 = []
+            self.received_item_counts.clear()
+            self.location_state_cache.clear()
             self.included_check_types = CheckTypes.SPAT
             self.death_link = bool(args['slot_data'].get('death_link', 0))
             self.ring_link = bool(args['slot_data'].get('ring_link', 0))
@@ -700,8 +874,8 @@ class BfBBContext(SuperContext):
                 for item in args['items']:
                     self.items_received_2.append((item, self.last_rev_index))
                     self.last_rev_index += 1
-            self.items_received_2.sort(key=lambda v: v[1])
-            self._update_item_counts(args)
+                self._update_item_counts(args['items'])
+            self.sync_scheduler.wake()
         elif cmd == "Bounced":
             if "tags" in args:
                 related_tags = args["tags"]
@@ -745,9 +919,11 @@ class BfBBContext(SuperContext):
         super().on_deathlink(data)
         _give_death(self)
 
-    def _update_item_counts(self, args: dict):
-        self.spat_count = len([item for item in self.items_received if item.item == base_id + 0])
-        self.sock_count = len([item for item in self.items_received if item.item == base_id + 1])
+    def _update_item_counts(self, new_items: list):
+        # only count the new items, items_received isn't updated until super().on_package anyway
+        self.received_item_counts.update(item.item for item in new_items)
+        self.spat_count = self.received_item_counts[base_id + 0]
+        self.sock_count = self.received_item_counts[base_id + 1]
 
     async def server_auth(self, password_requested: bool = False):
         self.password_requested = password_requested
@@ -778,11 +954,11 @@ def _is_ptr_valid(ptr):
     return 0x80000000 <= ptr < 0x817fffff
 
 
-def _find_obj_in_obj_table(id: int, ptr: Optional[int] = None, size: Optional[int] = None):
+def _find_obj_in_obj_table(ctx: BfBBContext, id: int, ptr: Optional[int] = None, size: Optional[int] = None):
     if size is None:
-        size = dolphin_memory_engine.read_word(SCENE_OBJ_LIST_SIZE_ADDR)
+        size = ctx.memory.read_word(SCENE_OBJ_LIST_SIZE_ADDR)
     if ptr is None:
-        ptr = dolphin_memory_engine.read_word(SCENE_OBJ_LIST_PTR_ADDR)
+        ptr = ctx.memory.read_word(SCENE_OBJ_LIST_PTR_ADDR)
         if not _is_ptr_valid(ptr): return None
     try:
         counter_list_entry = 0
@@ -795,7 +971,7 @@ def _find_obj_in_obj_table(id: int, ptr: Optional[int] = None, size: Optional[in
             if not _is_ptr_valid(counter_list_entry):
                 return None
             # get id from the entry
-            obj_id = dolphin_memory_engine.read_word(counter_list_entry)
+            obj_id = ctx.memory.read_word(counter_list_entry)
             # if the id matches, we are at the right entry
             if obj_id == id:
                 break
@@ -809,7 +985,7 @@ def _find_obj_in_obj_table(id: int, ptr: Optional[int] = None, size: Optional[in
                 idx = 0
         if skip: return -1
         # read counter pointer from the entry
-        obj_ptr = dolphin_memory_engine.read_word(counter_list_entry + 0x4)
+        obj_ptr = ctx.memory.read_word(counter_list_entry + 0x4)
         if not _is_ptr_valid(obj_ptr):
             return None
         return obj_ptr
@@ -817,60 +993,89 @@ def _find_obj_in_obj_table(id: int, ptr: Optional[int] = None, size: Optional[in
         return None
 
 
-def _give_spat(ctx: BfBBContext):
-    cur_spat_count = dolphin_memory_engine.read_word(SPAT_COUNT_ADDR)
-    dolphin_memory_engine.write_word(SPAT_COUNT_ADDR, cur_spat_count + 1)
-    if cur_spat_count > ctx.spat_count:
-        logger.info("!Some went wrong with the spat count!")
-
-
-def _give_sock(ctx: BfBBContext):
-    cur_sock_count = dolphin_memory_engine.read_word(SOCK_COUNT_ADDR)
-    dolphin_memory_engine.write_word(SOCK_COUNT_ADDR, cur_sock_count + 1)
-    if cur_sock_count > ctx.sock_count:
-        logger.info("!Some went wrong with the sock count!")
+def _read_obj_table(ctx: BfBBContext, ptr: Optional[int] = None, size: Optional[int] = None) -> Optional[Dict[int, int]]:
+    """Read the whole scene obj table with a single read and decode it into an id -> obj ptr dict."""
+    if size is None:
+        size = ctx.memory.read_word(SCENE_OBJ_LIST_SIZE_ADDR)
+    if ptr is None:
+        ptr = ctx.memory.read_word(SCENE_OBJ_LIST_PTR_ADDR)
+    # the table is only sane if size is a power of 2 (we mask ids with size - 1) and it lies in MEM1
+    if not 0 < size <= SCENE_OBJ_LIST_MAX_SIZE or size & (size - 1) != 0:
+        return None
+    if not _is_ptr_valid(ptr) or not _is_ptr_valid(ptr + size * 0x8 - 1):
+        return None
+    entries = list(struct.iter_unpack(">II", ctx.memory.read_bytes(ptr, size * 0x8)))
+    table = {}
+    resolved = set()
+    for obj_id, _ in entries:
+        if obj_id == 0 or obj_id in resolved:
+            continue
+        resolved.add(obj_id)
+        # resolve every id like the game does: probe from its own slot and stop at the id or the first empty slot,
+        # so stale copies of an id and entries cut off from their slot by a vacated one aren't found either
+        idx = obj_id & (size - 1)
+        for _ in range(size):
+            entry_id, obj_ptr = entries[idx]
+            if entry_id == obj_id:
+                table[obj_id] = obj_ptr
+                break
+            if entry_id == 0:
+                break
+            idx = (idx + 1) & (size - 1)
+    return table
 
 
-def _give_golden_underwear(ctx: BfBBContext):
-    cur_max_health = dolphin_memory_engine.read_word(MAX_HEALTH_ADDR)
-    dolphin_memory_engine.write_word(MAX_HEALTH_ADDR, cur_max_health + 1)
-    dolphin_memory_engine.write_word(HEALTH_ADDR, cur_max_health + 1)
-    if cur_max_health > 6:
-        logger.info("!Some went wrong with max health!")
+def _update_obj_cache_key(ctx: BfBBContext):
+    """Check if the loaded scene is still the one the cached obj ptrs belong to and drop them if not."""
+    scene_ptr = ctx.memory.read_word(CUR_SCENE_PTR_ADDR)
+    obj_table_ptr = ctx.memory.read_word(SCENE_OBJ_LIST_PTR_ADDR)
+    if not _is_ptr_valid(scene_ptr) or not _is_ptr_valid(obj_table_ptr):
+        ctx.obj_cache.clear()
+        return
+    scene = ctx.memory.read_bytes(scene_ptr, 0x4)
+    ctx.obj_cache.set_key((scene, scene_ptr, obj_table_ptr))
 
 
-def _give_powerup(ctx: BfBBContext, offset: int):
-    dolphin_memory_engine.write_byte(POWERUPS_ADDR + offset, 1)
+def _get_obj_ptr(ctx: BfBBContext, id: int, ptr: Optional[int] = None, size: Optional[int] = None):
+    if not ctx.use_obj_cache or ctx.obj_cache.key is None:
+        return _find_obj_in_obj_table(ctx, id, ptr, size)
+    cache = ctx.obj_cache
+    obj_ptr = cache.ptrs.get(id)
+    if obj_ptr is not None:
+        return obj_ptr
+    if id in cache.missing:
+        return None
+    if cache.table is None:
+        # first miss since the snapshot got dropped, read the whole table once for the rest of the tick
+        cache.table = _read_obj_table(ctx, cache.key[2], size)
+        if cache.table is None:
+            return _find_obj_in_obj_table(ctx, id, ptr, size)
+    obj_ptr = cache.table.get(id)
+    if obj_ptr is None or not _is_ptr_valid(obj_ptr):
+        cache.missing.add(id)
+        return None
+    cache.ptrs[id] = obj_ptr
+    return obj_ptr
 
 
 def _give_death(ctx: BfBBContext):
-    if ctx.slot and dolphin_memory_engine.is_hooked() and ctx.dolphin_status == CONNECTION_CONNECTED_STATUS \
+    if ctx.slot and ctx.memory.is_hooked() and ctx.dolphin_status == CONNECTION_CONNECTED_STATUS \
             and check_ingame(ctx) and check_control_owner(ctx, lambda owner: owner == 0):
-        dolphin_memory_engine.write_word(HEALTH_ADDR, 0)
+        ctx.memory.write_word(HEALTH_ADDR, 0)
 
 
-def _give_level_pickup(ctx: BfBBContext, lvl_idx: int):
-    assert -1 < lvl_idx < 15, "invalid level index in _give_level_pickup"
-    addr = LEVEL_PICKUP_PER_LEVEL_ADDR + 0x4 * lvl_idx
-    cur_count = dolphin_memory_engine.read_word(addr)
-    dolphin_memory_engine.write_word(addr, cur_count + 1)
-    # ToDo: check if we need to write to CurrentLevel too
-
-
-def _give_shiny_objects(ctx: BfBBContext, amount: int) -> object:
-    cur_count = dolphin_memory_engine.read_word(SHINY_COUNT_ADDR)
-    dolphin_memory_engine.write_word(SHINY_COUNT_ADDR, min(0x01869F, max(cur_count + amount, 0)))
-
-
-def _inc_delayed_item_count(ctx: BfBBContext, addr: int, val: int = 1):
-    cur_count = dolphin_memory_engine.read_byte(addr)
-    dolphin_memory_engine.write_byte(addr, cur_count + val)
+def _give_shiny_objects(ctx: BfBBContext, amount: int):
+    _apply_item_diff(ctx, _merge_item_effects([_shiny_objects_effect(amount)]))
 
 
 def _get_ptr_from_info(ctx: BfBBContext, info: Tuple[bytes, int]):
-    if not _check_cur_scene(ctx, info[0]):
+    if ctx.use_obj_cache and ctx.obj_cache.key is not None:
+        # the cache key already tells us which scene is loaded
+        if ctx.obj_cache.key[0] != info[0]:
+            return None
+    elif not _check_cur_scene(ctx, info[0]):
         return None
-    obj_ptr = _find_obj_in_obj_table(info[1])
+    obj_ptr = _get_obj_ptr(ctx, info[1])
     if obj_ptr is None or obj_ptr == -1:
         return None
     return obj_ptr
@@ -881,47 +1086,47 @@ def _set_counter_value(ctx: BfBBContext, cntr_info: Tuple[bytes, int], val: int)
     if obj_ptr is None:
         return
     count_addr = obj_ptr + 0x14
-    cur_count = int.from_bytes(dolphin_memory_engine.read_bytes(count_addr, 0x2), "big")
+    cur_count = int.from_bytes(ctx.memory.read_bytes(count_addr, 0x2), "big")
     if cur_count != val:
-        dolphin_memory_engine.write_bytes(count_addr, val.to_bytes(0x2, "big"))
+        ctx.memory.write_bytes(count_addr, val.to_bytes(0x2, "big"))
 
 
 def _set_pickup_active(ctx: BfBBContext, pickup_info: Tuple[bytes, int]):
     obj_ptr = _get_ptr_from_info(ctx, pickup_info)
     if obj_ptr is None:
         return
-    state = dolphin_memory_engine.read_word(obj_ptr + 0x16c)
+    state = ctx.memory.read_word(obj_ptr + 0x16c)
     if state & 0x8 == 0:  # not collected yet
-        current_pickup_flags = int.from_bytes(dolphin_memory_engine.read_bytes(obj_ptr + 0x264, 0x2), "big")
+        current_pickup_flags = int.from_bytes(ctx.memory.read_bytes(obj_ptr + 0x264, 0x2), "big")
         current_pickup_flags |= 0x2
-        dolphin_memory_engine.write_bytes(obj_ptr + 0x264, current_pickup_flags.to_bytes(0x2, "big"))
-        current_ent_flags = dolphin_memory_engine.read_byte(obj_ptr + 0x18)
+        ctx.memory.write_bytes(obj_ptr + 0x264, current_pickup_flags.to_bytes(0x2, "big"))
+        current_ent_flags = ctx.memory.read_byte(obj_ptr + 0x18)
         current_ent_flags |= 0x1
-        dolphin_memory_engine.write_byte(obj_ptr + 0x18, current_ent_flags)
+        ctx.memory.write_byte(obj_ptr + 0x18, current_ent_flags)
 
 
 def _set_plat_active(ctx: BfBBContext, plat_info: Tuple[bytes, int]):
     obj_ptr = _get_ptr_from_info(ctx, plat_info)
     if obj_ptr is None:
         return
-    state = dolphin_memory_engine.read_byte(obj_ptr + 0x18)
+    state = ctx.memory.read_byte(obj_ptr + 0x18)
     if state & 0x1 == 0:
-        dolphin_memory_engine.write_byte(obj_ptr + 0x18, state | 0x1)  # visible
-    coll_mask = dolphin_memory_engine.read_byte(obj_ptr + 0x22)
+        ctx.memory.write_byte(obj_ptr + 0x18, state | 0x1)  # visible
+    coll_mask = ctx.memory.read_byte(obj_ptr + 0x22)
     if coll_mask != 0x18:
-        dolphin_memory_engine.write_byte(obj_ptr + 0x22, 0x18)  # collision on
+        ctx.memory.write_byte(obj_ptr + 0x22, 0x18)  # collision on
 
 
 def _set_plat_inactive(ctx: BfBBContext, plat_info: Tuple[bytes, int]):
     obj_ptr = _get_ptr_from_info(ctx, plat_info)
     if obj_ptr is None:
         return
-    state = dolphin_memory_engine.read_byte(obj_ptr + 0x18)
+    state = ctx.memory.read_byte(obj_ptr + 0x18)
     if state & 0x1 == 0x1:
-        dolphin_memory_engine.write_byte(obj_ptr + 0x18, state & ~0x1)  # invisible
-    coll_mask = dolphin_memory_engine.read_byte(obj_ptr + 0x22)
+        ctx.memory.write_byte(obj_ptr + 0x18, state & ~0x1)  # invisible
+    coll_mask = ctx.memory.read_byte(obj_ptr + 0x22)
     if coll_mask == 0x18:
-        dolphin_memory_engine.write_byte(obj_ptr + 0x22, 0)  # collision off
+        ctx.memory.write_byte(obj_ptr + 0x22, 0)  # collision off
 
 
 def _set_taskbox_success(ctx: BfBBContext, task_info: Tuple[bytes, int]):
@@ -929,11 +1134,11 @@ def _set_taskbox_success(ctx: BfBBContext, task_info: Tuple[bytes, int]):
     if obj_ptr is None:
         return
     state_addr = obj_ptr + 0x18
-    state = dolphin_memory_engine.read_word(state_addr)
+    state = ctx.memory.read_word(state_addr)
     enabled_ptr = obj_ptr + 0x10
-    enabled = dolphin_memory_engine.read_byte(enabled_ptr)
+    enabled = ctx.memory.read_byte(enabled_ptr)
     if 0 < state < 3 and enabled == 1:
-        dolphin_memory_engine.write_word(state_addr, 3)
+        ctx.memory.write_word(state_addr, 3)
         # _set_trig_active(ctx, BALLOON_KID_SUC_TRIG_ID)
 
 
@@ -942,21 +1147,21 @@ def _set_trig_active(ctx: BfBBContext, trig_info: Tuple[bytes, int]):
     if obj_ptr is None:
         return
     addr = obj_ptr + 0x7
-    val = dolphin_memory_engine.read_byte(addr)
+    val = ctx.memory.read_byte(addr)
     if val & 1 != 1:
-        dolphin_memory_engine.write_byte(addr, val & 1)
+        ctx.memory.write_byte(addr, val & 1)
 
 
 def _check_cur_scene(ctx: BfBBContext, scene_id: bytes, scene_ptr: Optional[int] = None):
     if scene_ptr is None:
-        scene_ptr = dolphin_memory_engine.read_word(CUR_SCENE_PTR_ADDR)
+        scene_ptr = ctx.memory.read_word(CUR_SCENE_PTR_ADDR)
         if not _is_ptr_valid(scene_ptr): return False
-    cur_scene = dolphin_memory_engine.read_bytes(scene_ptr, 0x4)
+    cur_scene = ctx.memory.read_bytes(scene_ptr, 0x4)
     return cur_scene == scene_id
 
 
 def _print_player_info(ctx: BfBBContext):
-    base_flags = dolphin_memory_engine.read_bytes(PLAYER_ADDR + 6, 0x2)
+    base_flags = ctx.memory.read_bytes(PLAYER_ADDR + 6, 0x2)
     if base_flags != ctx.LAST_STATE[0]:
         str_1 = format(int(ctx.LAST_STATE[0].hex(), 16), '#018b')
         str_1 = f"{str_1[2:10]} {str_1[10:]}"
@@ -964,7 +1169,7 @@ def _print_player_info(ctx: BfBBContext):
         str_2 = f"{str_2[2:10]} {str_2[10:]}"
         print(f"player base flags:\t{str_1}-> {str_2}")
         ctx.LAST_STATE[0] = base_flags
-    ent_flags = dolphin_memory_engine.read_bytes(PLAYER_ADDR + 0x18, 0x2)
+    ent_flags = ctx.memory.read_bytes(PLAYER_ADDR + 0x18, 0x2)
     if ent_flags != ctx.LAST_STATE[1]:
         str_1 = format(int(ctx.LAST_STATE[1].hex(), 16), '#018b')
         str_1 = f"{str_1[2:10]} {str_1[10:]}"
@@ -972,7 +1177,7 @@ def _print_player_info(ctx: BfBBContext):
         str_2 = f"{str_2[2:10]} {str_2[10:]}"
         print(f"ent_flags:\t\t\t{str_1}-> {str_2}")
         ctx.LAST_STATE[1] = ent_flags
-    pflags = dolphin_memory_engine.read_bytes(PLAYER_ADDR + 0x1b, 0x2)
+    pflags = ctx.memory.read_bytes(PLAYER_ADDR + 0x1b, 0x2)
     if pflags != ctx.LAST_STATE[2]:
         str_1 = format(int(ctx.LAST_STATE[2].hex(), 16), '#018b')
         str_1 = f"{str_1[2:10]} {str_1[10:]}"
@@ -982,70 +1187,135 @@ def _print_player_info(ctx: BfBBContext):
         ctx.LAST_STATE[2] = pflags
 
 
-def _give_item(ctx: BfBBContext, item_id: int):
-    temp = item_id - base_id
-    if temp == 0:
-        _give_spat(ctx)
-    elif temp == 1:
-        _give_sock(ctx)
-    elif temp == 2:
-        _give_shiny_objects(ctx, 100)
-    elif temp == 3:
-        _give_shiny_objects(ctx, 250)
-    elif temp == 4:
-        _give_shiny_objects(ctx, 500)
-    elif temp == 5:
-        _give_shiny_objects(ctx, 750)
-    elif temp == 6:
-        _give_shiny_objects(ctx, 1000)
-    elif temp == 7:
-        _give_powerup(ctx, 0)
-    elif temp == 8:
-        _give_powerup(ctx, 1)
-    elif temp == 9:
-        _give_golden_underwear(ctx)
-    elif temp == 10:
-        _give_level_pickup(ctx, 1)
-    elif temp == 11:
-        _give_level_pickup(ctx, 2)
-    elif temp == 12:
-        _give_level_pickup(ctx, 3)
-        _inc_delayed_item_count(ctx, BALLOON_KID_COUNT_ADDR)
-    elif temp == 13:
-        _give_level_pickup(ctx, 5)
-    elif temp == 14:
-        _give_level_pickup(ctx, 6)
-    elif temp == 15:
-        _inc_delayed_item_count(ctx, SANDMAN_COUNT_ADDR)
-    elif temp == 16:
-        _give_level_pickup(ctx, 9)
-    elif temp == 17:
-        _inc_delayed_item_count(ctx, POWER_CRYSTAL_COUNT_ADDR)
-    elif temp == 18:
-        _give_level_pickup(ctx, 10)
-        _inc_delayed_item_count(ctx, CANNON_BUTTON_COUNT_ADDR)
-    else:
-        logger.warning(f"Received unknown item with id {item_id}")
+class ItemOp(Enum):
+    ADD = 0
+    SET = 1
+    # set to the (new) value of the address given as operand
+    COPY = 2
+
+
+class ItemEffect(NamedTuple):
+    addr: int
+    size: int
+    op: ItemOp
+    operand: int
+    clamp: Optional[Tuple[int, int]] = None
+
+
+SHINY_COUNT_CLAMP = (0, 0x01869F)
+BYTE_CLAMP = (0, 0xFF)
+
+
+def _level_pickup_effect(lvl_idx: int) -> ItemEffect:
+    assert -1 < lvl_idx < 15, "invalid level index in _level_pickup_effect"
+    # ToDo: check if we need to write to CurrentLevel too
+    return ItemEffect(LEVEL_PICKUP_PER_LEVEL_ADDR + 0x4 * lvl_idx, 0x4, ItemOp.ADD, 1)
+
+
+def _delayed_item_effect(addr: int) -> ItemEffect:
+    return ItemEffect(addr, 0x1, ItemOp.ADD, 1, BYTE_CLAMP)
+
+
+def _shiny_objects_effect(amount: int) -> ItemEffect:
+    return ItemEffect(SHINY_COUNT_ADDR, 0x4, ItemOp.ADD, amount, SHINY_COUNT_CLAMP)
+
+
+item_effects_by_name: Dict[str, List[ItemEffect]] = {
+    ItemNames.spat: [ItemEffect(SPAT_COUNT_ADDR, 0x4, ItemOp.ADD, 1)],
+    ItemNames.sock: [ItemEffect(SOCK_COUNT_ADDR, 0x4, ItemOp.ADD, 1)],
+    ItemNames.so_100: [_shiny_objects_effect(100)],
+    ItemNames.so_250: [_shiny_objects_effect(250)],
+    ItemNames.so_500: [_shiny_objects_effect(500)],
+    ItemNames.so_750: [_shiny_objects_effect(750)],
+    ItemNames.so_1000: [_shiny_objects_effect(1000)],
+    ItemNames.bubble_bowl: [ItemEffect(POWERUPS_ADDR + 0, 0x1, ItemOp.SET, 1)],
+    ItemNames.cruise_bubble: [ItemEffect(POWERUPS_ADDR + 1, 0x1, ItemOp.SET, 1)],
+    ItemNames.golden_underwear: [
+        ItemEffect(MAX_HEALTH_ADDR, 0x4, ItemOp.ADD, 1),
+        ItemEffect(HEALTH_ADDR, 0x4, ItemOp.COPY, MAX_HEALTH_ADDR),
+    ],
+    ItemNames.lvl_itm_jf: [_level_pickup_effect(1)],
+    ItemNames.lvl_itm_bb: [_level_pickup_effect(2)],
+    ItemNames.lvl_itm_gl: [_level_pickup_effect(3), _delayed_item_effect(BALLOON_KID_COUNT_ADDR)],
+    ItemNames.lvl_itm_rb: [_level_pickup_effect(5)],
+    ItemNames.lvl_itm_bc: [_level_pickup_effect(6)],
+    ItemNames.lvl_itm_sm: [_delayed_item_effect(SANDMAN_COUNT_ADDR)],
+    ItemNames.lvl_itm_kf1: [_level_pickup_effect(9)],
+    ItemNames.lvl_itm_kf2: [_delayed_item_effect(POWER_CRYSTAL_COUNT_ADDR)],
+    ItemNames.lvl_itm_gy: [_level_pickup_effect(10), _delayed_item_effect(CANNON_BUTTON_COUNT_ADDR)],
+}
+ITEM_EFFECTS: Dict[int, List[ItemEffect]] = {
+    data.id: item_effects_by_name[name] for name, data in item_table.items() if data.id is not None
+}
+
+# (addr, size) -> (op, operand, clamp)
+ItemDiff = Dict[Tuple[int, int], Tuple[ItemOp, int, Optional[Tuple[int, int]]]]
+
+
+def _merge_item_effects(effects: List[ItemEffect], diff: Optional[ItemDiff] = None) -> ItemDiff:
+    """Fold effects into a diff with one entry per target address."""
+    if diff is None:
+        diff = {}
+    for effect in effects:
+        key = (effect.addr, effect.size)
+        if effect.op == ItemOp.ADD and key in diff and diff[key][0] == ItemOp.ADD:
+            diff[key] = (ItemOp.ADD, diff[key][1] + effect.operand, effect.clamp)
+        else:
+            diff[key] = (effect.op, effect.operand, effect.clamp)
+    return diff
+
+
+def _get_item_diff(item_ids: List[int]) -> ItemDiff:
+    diff: ItemDiff = {}
+    for item_id in item_ids:
+        if item_id not in ITEM_EFFECTS:
+            logger.warning(f"Received unknown item with id {item_id}")
+            continue
+        _merge_item_effects(ITEM_EFFECTS[item_id], diff)
+    return diff
+
+
+def _apply_item_diff(ctx: BfBBContext, diff: ItemDiff):
+    # one read-modify-write per target address, copies last so they see the new values
+    new_values = {}
+    for (addr, size), (op, operand, clamp) in sorted(diff.items(), key=lambda entry: entry[1][0] == ItemOp.COPY):
+        if op == ItemOp.ADD:
+            val = int.from_bytes(ctx.memory.read_bytes(addr, size), "big") + operand
+        elif op == ItemOp.SET:
+            val = operand
+        else:
+            val = new_values[operand] if operand in new_values else ctx.memory.read_word(operand)
+        if clamp is not None:
+            val = min(clamp[1], max(val, clamp[0]))
+        ctx.memory.write_bytes(addr, val.to_bytes(size, "big"))
+        new_values[addr] = val
+    # sanity checks, the counts we write should never exceed what we received
+    if SPAT_COUNT_ADDR in new_values and new_values[SPAT_COUNT_ADDR] - 1 > ctx.spat_count:
+        logger.info("!Some went wrong with the spat count!")
+    if SOCK_COUNT_ADDR in new_values and new_values[SOCK_COUNT_ADDR] - 1 > ctx.sock_count:
+        logger.info("!Some went wrong with the sock count!")
+    if MAX_HEALTH_ADDR in new_values and new_values[MAX_HEALTH_ADDR] - 1 > 6:
+        logger.info("!Some went wrong with max health!")
 
 
 async def update_delayed_items(ctx: BfBBContext):
     if not await check_alive(ctx):
         return
     if CheckTypes.LEVEL_ITEMS in ctx.included_check_types:
-        balloon_count = dolphin_memory_engine.read_byte(BALLOON_KID_COUNT_ADDR)
+        balloon_count = ctx.memory.read_byte(BALLOON_KID_COUNT_ADDR)
         _set_counter_value(ctx, BALLOON_KID_COUNTER_ID, max(5 - balloon_count, 0))
         if balloon_count >= 5:
             _set_taskbox_success(ctx, BALLOON_KID_TASKBOX_ID)
-        sandman_count = dolphin_memory_engine.read_byte(SANDMAN_COUNT_ADDR)
+        sandman_count = ctx.memory.read_byte(SANDMAN_COUNT_ADDR)
         _set_counter_value(ctx, SANDMAN_CNTR_ID, max(8 - sandman_count, 0))
         if sandman_count >= 8:
             _set_pickup_active(ctx, SANDMAN_SOCK_ID)
-        power_crystal_count = dolphin_memory_engine.read_byte(POWER_CRYSTAL_COUNT_ADDR)
+        power_crystal_count = ctx.memory.read_byte(POWER_CRYSTAL_COUNT_ADDR)
         _set_counter_value(ctx, POWERCRYSTAL_COUNTER_ID, power_crystal_count)
         if power_crystal_count >= 6:
             for v in POWERCRYSTAL_TASKBOX_IDS:
                 _set_taskbox_success(ctx, v)
-        cannon_button_count = dolphin_memory_engine.read_byte(CANNON_BUTTON_COUNT_ADDR)
+        cannon_button_count = ctx.memory.read_byte(CANNON_BUTTON_COUNT_ADDR)
         if cannon_button_count >= 4:
             _set_pickup_active(ctx, CANNON_BUTTON_SPAT_ID)
             _set_plat_active(ctx, CANNON_BUTTON_PLAT_IDS[0])
@@ -1053,66 +1323,83 @@ async def update_delayed_items(ctx: BfBBContext):
             # _set_plat_inactive(ctx, CANNON_BUTTON_PLAT_IDS[2])
 
 
-async def give_items(ctx: BfBBContext):
+async def give_items(ctx: BfBBContext) -> bool:
+    """Give all queued items, returns whether some are still queued."""
     await update_delayed_items(ctx)
-    expected_idx = dolphin_memory_engine.read_word(EXPECTED_INDEX_ADDR)
-    # we need to loop some items
-    for item, idx in ctx.items_received_2:
-        if check_control_owner(ctx, lambda owner: owner & 0x2 or owner & 0x8000 or owner & 0x200 or owner & 0x1):
-            return
-        if expected_idx <= idx:
-            item_id = item.item
-            _give_item(ctx, item_id)
-            dolphin_memory_engine.write_word(EXPECTED_INDEX_ADDR, idx + 1)
-            await asyncio.sleep(.01)  # wait a bit for values to update
+    expected_idx = ctx.memory.read_word(EXPECTED_INDEX_ADDR)
+    if not ctx.items_received_2 or ctx.items_received_2[-1][1] < expected_idx:
+        return False
+    # items_received_2 is ordered by index, so everything from the cursor on is pending
+    cursor = bisect_left(ctx.items_received_2, expected_idx, key=lambda v: v[1])
+    pending = ctx.items_received_2[cursor:]
+    if check_control_owner(ctx, lambda owner: owner & 0x2 or owner & 0x8000 or owner & 0x200 or owner & 0x1):
+        return True
+    # combine all pending items into one write per address
+    _apply_item_diff(ctx, _get_item_diff([item.item for item, _ in pending]))
+    # only advance the expected index once everything got written
+    ctx.memory.write_word(EXPECTED_INDEX_ADDR, pending[-1][1] + 1)
+    await asyncio.sleep(ITEM_SETTLE_DELAY)  # wait a bit for values to update
+    # the scene might have changed while we were waiting
+    if ctx.use_obj_cache:
+        _update_obj_cache_key(ctx)
+    return False
 
 
 # ToDo: do we actually want this?
 # ToDo: implement socks/golden underwear/lvl_pickups/skills/ etc..
 # async def set_locations(ctx: BfBBContext):
-#     scene_ptr = dolphin_memory_engine.read_word(CUR_SCENE_PTR_ADDR)
+#     scene_ptr = ctx.memory.read_word(CUR_SCENE_PTR_ADDR)
 #     if not _is_ptr_valid(scene_ptr):
 #         return
-#     scene = dolphin_memory_engine.read_bytes(scene_ptr, 0x4)
-#     ptr = dolphin_memory_engine.read_word(SCENE_OBJ_LIST_PTR_ADDR)
+#     scene = ctx.memory.read_bytes(scene_ptr, 0x4)
+#     ptr = ctx.memory.read_word(SCENE_OBJ_LIST_PTR_ADDR)
 #     if not _is_ptr_valid(ptr):
 #         return
-#     size = dolphin_memory_engine.read_word(SCENE_OBJ_LIST_SIZE_ADDR)
+#     size = ctx.memory.read_word(SCENE_OBJ_LIST_SIZE_ADDR)
 #     for v in ctx.checked_locations:
 #         if v not in SPAT_PICKUP_IDS.keys():
 #             continue
 #         val = SPAT_PICKUP_IDS[v]
 #         if val[0] != scene:
 #             continue
-#         obj_ptr = _find_obj_in_obj_table(val[1], ptr, size)
+#         obj_ptr = _find_obj_in_obj_table(ctx, val[1], ptr, size)
 #         if obj_ptr is None: break
 #         if obj_ptr == -1: continue
 #         if not _is_ptr_valid(obj_ptr + 0x16C):
 #             return
-#         obj_state = dolphin_memory_engine.read_word(obj_ptr + 0x16C)
+#         obj_state = ctx.memory.read_word(obj_ptr + 0x16C)
 #         print(obj_state)
 #         if obj_state is not None and obj_state & 0x4 == 0:
-#             dolphin_memory_engine.write_word(obj_ptr + 0x16c, obj_state & ~0x3f | 0x4)
+#             ctx.memory.write_word(obj_ptr + 0x16c, obj_state & ~0x3f | 0x4)
+
+
+def _read_obj_state(ctx: BfBBContext, addr: int, size: int) -> int:
+    # served from the prefetched state reads of this tick if possible
+    if ctx.state_reader is not None:
+        val = ctx.state_reader.read_int(addr, size)
+        if val is not None:
+            return val
+    return int.from_bytes(ctx.memory.read_bytes(addr, size), "big")
 
 
 def _check_pickup_state(ctx: BfBBContext, obj_ptr: int):
     if not _is_ptr_valid(obj_ptr + 0x16C):
         return False
-    obj_state = dolphin_memory_engine.read_word(obj_ptr + 0x16c)
+    obj_state = _read_obj_state(ctx, obj_ptr + 0x16c, 0x4)
     return obj_state & 0x08 > 0 and obj_state & 0x37 == 0
 
 
 def _check_button_state(ctx: BfBBContext, obj_ptr: int):
     if not _is_ptr_valid(obj_ptr + 0x144):
         return False
-    btn_state = dolphin_memory_engine.read_word(obj_ptr + 0x144)
+    btn_state = _read_obj_state(ctx, obj_ptr + 0x144, 0x4)
     return btn_state & 0x1 == 0x1
 
 
 def _check_destructible_state(ctx: BfBBContext, obj_ptr: int):
     if not _is_ptr_valid(obj_ptr + 0xdc):
         return False
-    health = dolphin_memory_engine.read_word(obj_ptr + 0xdc)
+    health = _read_obj_state(ctx, obj_ptr + 0xdc, 0x4)
     return health == 0
 
 
@@ -1124,10 +1411,10 @@ def format_to_bitmask(val: bytes) -> str:
 
 
 def get_player_type(ctx: BfBBContext):
-    player_settings_ptr = dolphin_memory_engine.read_word(PLAYER_SETTINGS_PRT_ADDR)
+    player_settings_ptr = ctx.memory.read_word(PLAYER_SETTINGS_PRT_ADDR)
     if not _is_ptr_valid(player_settings_ptr):
         return None
-    player_type = dolphin_memory_engine.read_word(player_settings_ptr)
+    player_type = ctx.memory.read_word(player_settings_ptr)
     return player_type
 
 def get_character_name(ctx: BfBBContext):
@@ -1144,86 +1431,155 @@ def get_character_name(ctx: BfBBContext):
 def _check_platform_state(ctx: BfBBContext, obj_ptr: int):
     if not _is_ptr_valid(obj_ptr + 0x18):
         return False
-    state = dolphin_memory_engine.read_byte(obj_ptr + 0x18)
+    state = _read_obj_state(ctx, obj_ptr + 0x18, 0x1)
     return state != 1
 
 
 def _check_counter(ctx: BfBBContext, obj_ptr: int, target_cb: Callable):
     if not _is_ptr_valid(obj_ptr + 0x14):
         return False
-    counter = int.from_bytes(dolphin_memory_engine.read_bytes(obj_ptr + 0x14, 0x2), "big")
+    counter = _read_obj_state(ctx, obj_ptr + 0x14, 0x2)
     return target_cb(counter)
 
 
 def _check_base_inactive(ctx: BfBBContext, obj_ptr: int):
     if not _is_ptr_valid(obj_ptr + 0x6):
         return False
-    state = dolphin_memory_engine.read_bytes(obj_ptr + 0x6, 0x2)
-    return state[1] & 0x1 == 0
+    state = _read_obj_state(ctx, obj_ptr + 0x6, 0x2)
+    return state & 0x1 == 0
 
 
 def _check_base_active(ctx: BfBBContext, obj_ptr: int):
     return not _check_base_inactive(ctx, obj_ptr)
 
 
-async def _check_objects_by_id(ctx: BfBBContext, locations_checked: set, id_table: dict, check_cb: Callable):
-    scene_ptr = dolphin_memory_engine.read_word(CUR_SCENE_PTR_ADDR)
-    if not _is_ptr_valid(scene_ptr):
-        return
-    scene = dolphin_memory_engine.read_bytes(scene_ptr, 0x4)
-    ptr = dolphin_memory_engine.read_word(SCENE_OBJ_LIST_PTR_ADDR)
-    if not _is_ptr_valid(ptr):
-        return
-    size = dolphin_memory_engine.read_word(SCENE_OBJ_LIST_SIZE_ADDR)
-    for k, v in id_table.items():
-        if k in locations_checked and (k != base_id + 83 or ctx.finished_game):  # we need to check base_id + 83 for goal
-            continue
-        if v[0] is not None and v[0] != scene:
-            continue
-        for i in range(1, len(v)):
-            obj_ptr = _find_obj_in_obj_table(v[i], ptr, size)
-            if obj_ptr is None: break
-            if obj_ptr == -1: continue
-            if check_cb(ctx, obj_ptr):
-                locations_checked.add(k)
-                if k == base_id + 83 and not ctx.finished_game:
-                    print("send done")
-                    await ctx.send_msgs([
-                        {"cmd": "StatusUpdate",
-                         "status": 30}
-                    ])
-                    ctx.finished_game = True
-                break
+def _check_spat_counter(ctx: BfBBContext, obj_ptr: int):
+    return _check_counter(ctx, obj_ptr, lambda cnt: cnt == 2)
+
+
+# (offset, size) of the obj state each check callback reads, so all of them can be prefetched at once
+CHECK_STATE_READS = {
+    _check_pickup_state: (0x16c, 0x4),
+    _check_button_state: (0x144, 0x4),
+    _check_destructible_state: (0xdc, 0x4),
+    _check_platform_state: (0x18, 0x1),
+    _check_spat_counter: (0x14, 0x2),
+    _check_base_inactive: (0x6, 0x2),
+    _check_base_active: (0x6, 0x2),
+}
 
 
-async def _check_spats(ctx: BfBBContext, locations_checked: set):
-    await _check_objects_by_id(ctx, locations_checked, SPAT_COUNTER_IDS,
-                               lambda ctx, ptr: _check_counter(ctx, ptr, lambda cnt: cnt == 2))
-    await _check_objects_by_id(ctx, locations_checked, SPAT_PICKUP_IDS, _check_pickup_state)
+# (check type, id table, check callback) in the order they get checked
+LOCATION_CHECK_TABLES = [
+    (CheckTypes.SPAT, SPAT_COUNTER_IDS, _check_spat_counter),
+    (CheckTypes.SPAT, SPAT_PICKUP_IDS, _check_pickup_state),
+    (CheckTypes.SOCK, SOCK_PICKUP_IDS, _check_pickup_state),
+    (CheckTypes.GOLDEN_UNDERWEAR, GOLDEN_UNDERWEAR_IDS, _check_pickup_state),
+    (CheckTypes.LEVEL_ITEMS, KING_JF_DISP_ID, _check_base_active),
+    (CheckTypes.LEVEL_ITEMS, STEERING_WHEEL_PICKUP_IDS, _check_pickup_state),
+    (CheckTypes.LEVEL_ITEMS, BALLOON_KID_PLAT_IDS, _check_platform_state),
+    (CheckTypes.LEVEL_ITEMS, ART_WORK_IDS, _check_pickup_state),
+    (CheckTypes.LEVEL_ITEMS, OVERRIDE_BUTTON_IDS, _check_button_state),
+    (CheckTypes.LEVEL_ITEMS, SANDMAN_DSTR_IDS, _check_destructible_state),
+    (CheckTypes.LEVEL_ITEMS, LOST_CAMPER_TRIG_IDS, _check_base_inactive),
+    (CheckTypes.LEVEL_ITEMS, POWERCRYSTAL_PICKUP_IDS, _check_pickup_state),
+    (CheckTypes.LEVEL_ITEMS, CANNON_BUTTON_IDS, _check_button_state),
+    (CheckTypes.PURPLE_SO, PURPLE_SO_IDS, _check_pickup_state),
+]
 
 
-async def _check_socks(ctx: BfBBContext, locations_checked: set):
-    await _check_objects_by_id(ctx, locations_checked, SOCK_PICKUP_IDS, _check_pickup_state)
+class LocationCheck(NamedTuple):
+    location_id: int
+    obj_ids: Tuple[int, ...]
+    check_cb: Callable
+    check_type: CheckTypes
+    state_read: Tuple[int, int]
 
 
-async def _check_golden_underwear(ctx: BfBBContext, locations_checked: set):
-    await _check_objects_by_id(ctx, locations_checked, GOLDEN_UNDERWEAR_IDS, _check_pickup_state)
+def _build_location_check_index(tables: list) -> Dict[Optional[bytes], List[LocationCheck]]:
+    """Group all location checks by scene, checks which aren't bound to a scene end up under None."""
+    index: Dict[Optional[bytes], List[LocationCheck]] = {}
+    for check_type, id_table, check_cb in tables:
+        for location_id, info in id_table.items():
+            index.setdefault(info[0], []).append(
+                LocationCheck(location_id, info[1:], check_cb, check_type, CHECK_STATE_READS[check_cb]))
+    return index
 
 
-async def _check_level_pickups(ctx: BfBBContext, locations_checked: set):
-    await _check_objects_by_id(ctx, locations_checked, KING_JF_DISP_ID, _check_base_active)
-    await _check_objects_by_id(ctx, locations_checked, STEERING_WHEEL_PICKUP_IDS, _check_pickup_state)
-    await _check_objects_by_id(ctx, locations_checked, BALLOON_KID_PLAT_IDS, _check_platform_state)
-    await _check_objects_by_id(ctx, locations_checked, ART_WORK_IDS, _check_pickup_state)
-    await _check_objects_by_id(ctx, locations_checked, OVERRIDE_BUTTON_IDS, _check_button_state)
-    await _check_objects_by_id(ctx, locations_checked, SANDMAN_DSTR_IDS, _check_destructible_state)
-    await _check_objects_by_id(ctx, locations_checked, LOST_CAMPER_TRIG_IDS, _check_base_inactive)
-    await _check_objects_by_id(ctx, locations_checked, POWERCRYSTAL_PICKUP_IDS, _check_pickup_state)
-    await _check_objects_by_id(ctx, locations_checked, CANNON_BUTTON_IDS, _check_button_state)
+LOCATION_CHECKS_BY_SCENE = _build_location_check_index(LOCATION_CHECK_TABLES)
 
 
-async def _check_purple_so(ctx: BfBBContext, locations_checked: set):
-    await _check_objects_by_id(ctx, locations_checked, PURPLE_SO_IDS, _check_pickup_state)
+@lru_cache(maxsize=None)
+def _get_location_checks(scene: bytes, included_check_types: CheckTypes) -> Tuple[LocationCheck, ...]:
+    return tuple(check for check in LOCATION_CHECKS_BY_SCENE.get(None, []) + LOCATION_CHECKS_BY_SCENE.get(scene, [])
+                 if check.check_type in included_check_types)
+
+
+async def _check_objects_by_id(ctx: BfBBContext, locations_checked: set):
+    if ctx.use_obj_cache and ctx.obj_cache.key is not None:
+        scene, scene_ptr, ptr = ctx.obj_cache.key
+    else:
+        scene_ptr = ctx.memory.read_word(CUR_SCENE_PTR_ADDR)
+        if not _is_ptr_valid(scene_ptr):
+            return
+        scene = ctx.memory.read_bytes(scene_ptr, 0x4)
+        ptr = ctx.memory.read_word(SCENE_OBJ_LIST_PTR_ADDR)
+        if not _is_ptr_valid(ptr):
+            return
+    state_cache = ctx.location_state_cache
+    state_cache.set_key((scene, scene_ptr, ptr))
+    size = ctx.memory.read_word(SCENE_OBJ_LIST_SIZE_ADDR)
+    # resolve all objs first, so every state read of this tick can be fetched in as few reads as possible
+    reader = CoalescedReader(ctx.memory.read_bytes)
+    # only the requested ranges go into the fingerprint, the merged reads also contain the gaps between them
+    # the totals go in as well, they change along with most pickups
+    state_reads = [(SHINY_COUNT_ADDR, 0x8), (SOCK_COUNT_ADDR, 0x4)]
+    to_check = []
+    for check in _get_location_checks(scene, ctx.included_check_types):
+        k = check.location_id
+        if k in locations_checked and (k != base_id + 83 or ctx.finished_game):  # we need to check base_id + 83 for goal
+            continue
+        obj_ptrs = []
+        for obj_id in check.obj_ids:
+            obj_ptr = _get_obj_ptr(ctx, obj_id, ptr, size)
+            if obj_ptr is None: break
+            if obj_ptr == -1: continue
+            obj_ptrs.append(obj_ptr)
+            offset, read_size = check.state_read
+            if _is_ptr_valid(obj_ptr + offset):
+                state_reads.append((obj_ptr + offset, read_size))
+        to_check.append((check, obj_ptrs))
+    for addr, read_size in state_reads:
+        reader.request(addr, read_size)
+    reader.execute()
+    fingerprint = (ctx.included_check_types, len(locations_checked), ctx.finished_game, state_cache.key,
+                   tuple(bytes(reader.read(addr, read_size)) for addr, read_size in state_reads))
+    if fingerprint == state_cache.fingerprint:
+        return
+    state_cache.fingerprint = fingerprint
+    ctx.state_reader = reader
+    try:
+        for check, obj_ptrs in to_check:
+            k = check.location_id
+            offset, read_size = check.state_read
+            for obj_ptr in obj_ptrs:
+                state = reader.read(obj_ptr + offset, read_size)
+                state = bytes(state) if state is not None else None
+                if (k, obj_ptr) in state_cache.states and state_cache.states[(k, obj_ptr)] == state:
+                    continue
+                state_cache.states[(k, obj_ptr)] = state
+                if check.check_cb(ctx, obj_ptr):
+                    locations_checked.add(k)
+                    if k == base_id + 83 and not ctx.finished_game:
+                        print("send done")
+                        await ctx.send_msgs([
+                            {"cmd": "StatusUpdate",
+                             "status": 30}
+                        ])
+                        ctx.finished_game = True
+                    break
+    finally:
+        ctx.state_reader = None
 
 
 def _check_skills(ctx: BfBBContext, locations_checked: set):
@@ -1235,28 +1591,21 @@ def _check_skills(ctx: BfBBContext, locations_checked: set):
 
 
 async def check_locations(ctx: BfBBContext):
-    await _check_spats(ctx, ctx.locations_checked)
-    if CheckTypes.SOCK in ctx.included_check_types:
-        await _check_socks(ctx, ctx.locations_checked)
+    # only visits the locations of the loaded scene (and the ones not bound to a scene)
+    await _check_objects_by_id(ctx, ctx.locations_checked)
     if CheckTypes.SKILLS in ctx.included_check_types:
         _check_skills(ctx, ctx.locations_checked)
-    if CheckTypes.GOLDEN_UNDERWEAR in ctx.included_check_types:
-        await _check_golden_underwear(ctx, ctx.locations_checked)
-    if CheckTypes.LEVEL_ITEMS in ctx.included_check_types:
-        await _check_level_pickups(ctx, ctx.locations_checked)
-    if CheckTypes.PURPLE_SO in ctx.included_check_types:
-        await _check_purple_so(ctx, ctx.locations_checked)
     # ignore already in server state
     send_locations = await ctx.check_locations(ctx.locations_checked)
     # print([ctx.location_names[location] for location in send_locations])
 
 
 async def check_alive(ctx: BfBBContext):
-    cur_health = dolphin_memory_engine.read_word(HEALTH_ADDR)
+    cur_health = ctx.memory.read_word(HEALTH_ADDR)
     return not (cur_health <= 0 or check_control_owner(ctx, lambda owner: owner & 0x4))
 
 async def check_death(ctx: BfBBContext):
-    cur_health = dolphin_memory_engine.read_word(HEALTH_ADDR)
+    cur_health = ctx.memory.read_word(HEALTH_ADDR)
     grabbed_by_hans = check_control_owner(ctx, lambda owner: owner & 0x4)
     if cur_health <= 0 or grabbed_by_hans:
         if not ctx.has_send_death and time.time() >= ctx.last_death_link + 3:
@@ -1274,10 +1623,10 @@ async def check_death(ctx: BfBBContext):
 
 
 def check_ingame(ctx: BfBBContext, ignore_control_owner: bool = False) -> bool:
-    scene_ptr = dolphin_memory_engine.read_word(CUR_SCENE_PTR_ADDR)
+    scene_ptr = ctx.memory.read_word(CUR_SCENE_PTR_ADDR)
     if not _is_ptr_valid(scene_ptr):
         return False
-    scene = dolphin_memory_engine.read_bytes(scene_ptr, 0x4)
+    scene = ctx.memory.read_bytes(scene_ptr, 0x4)
     if scene not in valid_scenes:
         return False
     update_current_scene(ctx, scene.decode('ascii'))
@@ -1304,20 +1653,20 @@ def update_current_scene(ctx: BfBBContext, scene: str):
 
 
 def check_control_owner(ctx: BfBBContext, check_cb: Callable[[int], bool]) -> bool:
-    owner = dolphin_memory_engine.read_word(PLAYER_CONTROL_OWNER)
+    owner = ctx.memory.read_word(PLAYER_CONTROL_OWNER)
     return check_cb(owner)
 
 
 def validate_save(ctx: BfBBContext) -> bool:
-    saved_slot_bytes = dolphin_memory_engine.read_bytes(SAVED_SLOT_NAME_ADDR, 0x40).strip(b'\0')
-    slot_bytes = dolphin_memory_engine.read_bytes(SLOT_NAME_ADDR, 0x40).strip(b'\0')
-    saved_seed_bytes = dolphin_memory_engine.read_bytes(SAVED_SEED_ADDR, 0x10).strip(b'\0')
-    seed_bytes = dolphin_memory_engine.read_bytes(SEED_ADDR, 0x10).strip(b'\0')
+    saved_slot_bytes = ctx.memory.read_bytes(SAVED_SLOT_NAME_ADDR, 0x40).strip(b'\0')
+    slot_bytes = ctx.memory.read_bytes(SLOT_NAME_ADDR, 0x40).strip(b'\0')
+    saved_seed_bytes = ctx.memory.read_bytes(SAVED_SEED_ADDR, 0x10).strip(b'\0')
+    seed_bytes = ctx.memory.read_bytes(SEED_ADDR, 0x10).strip(b'\0')
     if len(slot_bytes) > 0 and len(seed_bytes) > 0:
         if len(saved_slot_bytes) == 0 and len(saved_seed_bytes) == 0:
             # write info to save
-            dolphin_memory_engine.write_bytes(SAVED_SLOT_NAME_ADDR, slot_bytes)
-            dolphin_memory_engine.write_bytes(SAVED_SEED_ADDR, seed_bytes)
+            ctx.memory.write_bytes(SAVED_SLOT_NAME_ADDR, slot_bytes)
+            ctx.memory.write_bytes(SAVED_SEED_ADDR, seed_bytes)
             logger.debug("saved slot/seed info")
             return True
         elif slot_bytes == saved_slot_bytes and seed_bytes == saved_seed_bytes:
@@ -1341,7 +1690,7 @@ async def handle_ring_link(ctx: BfBBContext):
         return
 
 
-    current_shiny_objects = dolphin_memory_engine.read_word(SHINY_COUNT_ADDR)
+    current_shiny_objects = ctx.memory.read_word(SHINY_COUNT_ADDR)
     previous = ctx.previous_shiny_objects
 
     if ctx.previous_shiny_objects is None:
@@ -1371,81 +1720,118 @@ async def dolphin_sync_task(ctx: BfBBContext):
     logger.info("Starting Dolphin connector. Use /dolphin for status information")
     while not ctx.exit_event.is_set():
         try:
-            if dolphin_memory_engine.is_hooked() and ctx.dolphin_status == CONNECTION_CONNECTED_STATUS:
-                if not check_ingame(ctx):
+            if ctx.memory.is_hooked() and ctx.dolphin_status == CONNECTION_CONNECTED_STATUS:
+                ctx.profiler.begin_tick()
+                with ctx.profiler.phase("check_ingame"):
+                    ingame = check_ingame(ctx)
+                if not ingame:
                     # reset AP values when on main menu
                     # ToDo: this should be done via patch when other globals are reset
                     if _check_cur_scene(ctx, b'MNU3'):
+                        ctx.obj_cache.clear()
                         for i in range(0, 0x80, 0x4):
-                            cur_val = dolphin_memory_engine.read_word(EXPECTED_INDEX_ADDR + i)
+                            cur_val = ctx.memory.read_word(EXPECTED_INDEX_ADDR + i)
                             if cur_val != 0:
-                                dolphin_memory_engine.write_word(EXPECTED_INDEX_ADDR + i, 0)
-                    await asyncio.sleep(.1)
+                                ctx.memory.write_word(EXPECTED_INDEX_ADDR + i, 0)
+                    ctx.profiler.end_tick("menu")
+                    await ctx.sync_scheduler.sleep(ctx.sync_scheduler.menu_interval())
                     continue
                 # _print_player_info(ctx)
                 if ctx.slot:
-                    if not validate_save(ctx):
+                    with ctx.profiler.phase("validate_save"):
+                        save_valid = validate_save(ctx)
+                    if not save_valid:
+                        ctx.profiler.end_tick("refused")
                         logger.info(CONNECTION_REFUSED_SAVE_STATUS)
                         ctx.dolphin_status = CONNECTION_REFUSED_SAVE_STATUS
-                        dolphin_memory_engine.un_hook()
+                        ctx.memory.un_hook()
                         await ctx.disconnect()
-                        await asyncio.sleep(5)
+                        await asyncio.sleep(ctx.sync_scheduler.refused_interval())
                         continue
+                    ctx.sync_scheduler.connected()
                     ctx.current_scene_key = f"bfbb_current_scene_T{ctx.team}_P{ctx.slot}"
                     ctx.set_notify(ctx.current_scene_key)
-                    if ctx.death_link and not ctx.disable_death_link:
-                        await check_death(ctx)
-                    await give_items(ctx)
-                    await check_locations(ctx)
-                    if ctx.ring_link and not ctx.disable_ring_link:
-                        await handle_ring_link(ctx)
+                    _update_obj_cache_key(ctx)
+                    ctx.use_obj_cache = True
+                    checked_count = len(ctx.locations_checked)
+                    try:
+                        if ctx.death_link and not ctx.disable_death_link:
+                            with ctx.profiler.phase("check_death"):
+                                await check_death(ctx)
+                        with ctx.profiler.phase("give_items"):
+                            items_pending = await give_items(ctx)
+                        with ctx.profiler.phase("check_locations"):
+                            await check_locations(ctx)
+                        if ctx.ring_link and not ctx.disable_ring_link:
+                            with ctx.profiler.phase("handle_ring_link"):
+                                await handle_ring_link(ctx)
+                    finally:
+                        # the obj table can change between ticks, never reuse a snapshot
+                        ctx.use_obj_cache = False
+                        ctx.obj_cache.table = None
+                    ctx.profiler.end_tick()
                     # await set_locations(ctx)
+                    await ctx.sync_scheduler.sleep(ctx.sync_scheduler.tick_interval(
+                        ctx.obj_cache.key,
+                        items_pending,
+                        check_control_owner(ctx, lambda owner: owner == 0),
+                        len(ctx.locations_checked) != checked_count
+                    ))
+                    continue
                 else:
                     if not ctx.auth:
-                        ctx.auth = dolphin_memory_engine.read_bytes(SLOT_NAME_ADDR, 0x40).decode('utf-8').strip(
+                        ctx.auth = ctx.memory.read_bytes(SLOT_NAME_ADDR, 0x40).decode('utf-8').strip(
                             '\0')
                         if ctx.auth == '\x02\x00\x00\x00\x04\x00\x00\x00\x02\x00\x00\x00\x04\x00\x00\x00\x02\x00\x00' \
                                        '\x00\x02\x00\x00\x00\x04\x00\x00\x00\x04':
+                            ctx.profiler.end_tick("refused")
                             logger.info(CONNECTION_REFUSED_VANILLA_GAME_STATUS)
                             ctx.dolphin_status = CONNECTION_REFUSED_VANILLA_GAME_STATUS
                             ctx.awaiting_rom = False
-                            dolphin_memory_engine.un_hook()
+                            ctx.memory.un_hook()
                             await ctx.disconnect()
-                            await asyncio.sleep(5)
+                            await asyncio.sleep(ctx.sync_scheduler.refused_interval())
                     if ctx.awaiting_rom:
                         await ctx.server_auth(ctx.password_requested)
-                await asyncio.sleep(.5)
+                    ctx.profiler.end_tick("auth")
+                await ctx.sync_scheduler.sleep(SyncScheduler.ACTIVE_INTERVAL)
             else:
                 if ctx.dolphin_status == CONNECTION_CONNECTED_STATUS:
                     logger.info("Connection to Dolphin lost, reconnecting...")
                     ctx.dolphin_status = CONNECTION_LOST_STATUS
                 logger.info("Attempting to connect to Dolphin")
-                dolphin_memory_engine.hook()
-                if dolphin_memory_engine.is_hooked():
-                    cur_game_id = dolphin_memory_engine.read_bytes(0x80000000, 6)
-                    if dolphin_memory_engine.read_bytes(0x80000000, 6) == GAME_ID:
+                ctx.memory.hook()
+                if ctx.memory.is_hooked():
+                    cur_game_id = ctx.memory.read_bytes(0x80000000, 6)
+                    if ctx.memory.read_bytes(0x80000000, 6) == GAME_ID:
                         logger.info(CONNECTION_CONNECTED_STATUS)
                         ctx.dolphin_status = CONNECTION_CONNECTED_STATUS
                         ctx.locations_checked = set()
+                        ctx.obj_cache.clear()
+                        ctx.location_state_cache.clear()
                     else:
                         logger.debug(f"got GAME_ID {cur_game_id} instead of {GAME_ID}")
                         logger.info(CONNECTION_REFUSED_GAME_STATUS)
                         ctx.dolphin_status = CONNECTION_REFUSED_GAME_STATUS
-                        dolphin_memory_engine.un_hook()
-                        await asyncio.sleep(1)
+                        ctx.memory.un_hook()
+                        await asyncio.sleep(ctx.sync_scheduler.refused_interval())
                 else:
-                    logger.info("Connection to Dolphin failed, attempting again in 5 seconds...")
+                    delay = ctx.sync_scheduler.backoff_interval()
+                    logger.info(f"Connection to Dolphin failed, attempting again in {delay:.1f} seconds...")
                     ctx.dolphin_status = CONNECTION_LOST_STATUS
                     await ctx.disconnect()
-                    await asyncio.sleep(5)
+                    await asyncio.sleep(delay)
                     continue
         except Exception:
-            dolphin_memory_engine.un_hook()
-            logger.info("Connection to Dolphin failed, attempting again in 5 seconds...")
+            # a tick that raised is still a tick
+            ctx.profiler.end_tick("error")
+            ctx.memory.un_hook()
+            delay = ctx.sync_scheduler.backoff_interval()
+            logger.info(f"Connection to Dolphin failed, attempting again in {delay:.1f} seconds...")
             logger.error(traceback.format_exc())
             ctx.dolphin_status = CONNECTION_LOST_STATUS
             await ctx.disconnect()
-            await asyncio.sleep(5)
+            await asyncio.sleep(delay)
             continue
 
 
@@ -1462,13 +1848,8 @@ async def patch_and_run_game(ctx: BfBBContext, patch_file):
                                     "Make sure your generator and client are the same.")
 
             # BfBBContainer.check_hash()
-            shutil.copy(rom_path, result_path)
-            BfBBContainer.apply_hiphop_changes(
-                zipfile.ZipFile(patch_file, 'r'), rom_path, result_path
-            )
-            BfBBContainer.apply_binary_changes(
-                zipfile.ZipFile(patch_file, 'r'), result_path
-            )
+            with zipfile.ZipFile(patch_file, 'r') as patch_archive:
+                BfBBContainer.patch(patch_archive, rom_path, result_path)
             return result_path
 
         loop = asyncio.get_running_loop()
@@ -1499,7 +1880,11 @@ def run_game(gcm_file):
     )
 
 async def main(args):
-    ctx = BfBBContext(args.connect, args.password)
+    memory = None
+    if get_settings().bfbb_options.profile_memory:
+        logger.info("Memory profiling enabled, use /perf memory for a report")
+        memory = ProfilingMemoryBackend(DolphinMemoryBackend())
+    ctx = BfBBContext(args.connect, args.password, memory=memory)
     ctx.server_task = asyncio.create_task(server_loop(ctx), name="ServerLoop")
     if tracker_loaded:
         ctx.run_generator()
@@ -1579,4 +1964,6 @@ def launch(*args):
 
 
 if __name__ == '__main__':
+    # the patch workers are spawned processes
+    multiprocessing.freeze_support()
     launch(*sys.argv[1:])
@@ -0,0 +1,101 @@
+"""
+Patched games stored as the writes against the base ISO instead of a full disc image.
+Apply one with `python -m worlds.bfbb.Delta <delta file> <output .gcm>`.
+
+A delta is the magic, the MD5 of the base ISO, the number of writes and then every write
+as (ISO offset, size, data), all big endian.
+"""
+import argparse
+import hashlib
+import logging
+import os
+import shutil
+import struct
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger("BfBBPatch")
+
+DELTA_MAGIC = b'BFBBDLT1'
+DELTA_FILE_ENDING = ".bfbbdelta"
+# FICLONE from linux/fs.h
+_FICLONE = 0x40049409
+
+Writes = List[Tuple[int, bytes]]
+
+
+def write_delta(path: str, base_md5: str, writes: Writes):
+    with open(path, "wb") as f:
+        f.write(DELTA_MAGIC)
+        f.write(bytes.fromhex(base_md5))
+        f.write(struct.pack(">I", len(writes)))
+        for offset, data in writes:
+            f.write(struct.pack(">QI", offset, len(data)))
+            f.write(data)
+
+
+def read_delta(path: str) -> Tuple[str, Writes]:
+    """Returns the MD5 of the base ISO and the writes."""
+    with open(path, "rb") as f:
+        if f.read(len(DELTA_MAGIC)) != DELTA_MAGIC:
+            raise ValueError(f"{path} is not a BfBB delta")
+        base_md5 = f.read(0x10).hex()
+        count, = struct.unpack(">I", f.read(0x4))
+        writes = []
+        for _ in range(count):
+            offset, size = struct.unpack(">QI", f.read(0xC))
+            writes.append((offset, f.read(size)))
+    return base_md5, writes
+
+
+def clone_file(source: str, dest: str) -> bool:
+    """Copy a file, sharing its extents with the source where the file system supports it. Returns if it did."""
+    try:
+        import fcntl
+        with open(source, "rb") as src, open(dest, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        return True
+    except (ImportError, OSError):
+        pass
+    shutil.copyfile(source, dest)
+    return False
+
+
+def write_changes(path: str, writes: Writes):
+    with open(path, "rb+") as stream:
+        for offset, data in writes:
+            stream.seek(offset)
+            stream.write(data)
+
+
+def clone_with_changes(base_iso: str, dest: str, writes: Writes):
+    """Clone the base ISO and write only the changed bytes, unchanged extents stay shared with the base."""
+    cloned = clone_file(base_iso, dest)
+    logger.debug(f"{'cloned' if cloned else 'copied'} {base_iso} to {dest}")
+    write_changes(dest, writes)
+
+
+def apply_delta(path: str, base_iso: str, dest: str):
+    from .PatchCache import file_md5
+    base_md5, writes = read_delta(path)
+    if file_md5(base_iso) != base_md5:
+        raise ValueError(f"{path} was made for a different base ISO")
+    clone_with_changes(base_iso, dest, writes)
+
+
+def main(args: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Make a patched BfBB game from a delta.")
+    parser.add_argument("delta", help=f"the {DELTA_FILE_ENDING} file")
+    parser.add_argument("output", nargs="?", help="patched game, next to the delta if not given")
+    parser.add_argument("--rom", help="base ISO, the one from the host settings if not given")
+    parsed = parser.parse_args(args)
+    base_iso = parsed.rom
+    if base_iso is None:
+        from .Rom import get_base_rom_path
+        base_iso = get_base_rom_path()
+    output = parsed.output or os.path.splitext(parsed.delta)[0] + ".gcm"
+    apply_delta(parsed.delta, base_iso, output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
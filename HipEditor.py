@@ -0,0 +1,326 @@
+"""
+Edits single HIPs with IndustrialPark.
+Patch worker processes run `worker_main`, this module only imports the standard library so the workers
+don't load anything besides what spawning them already does.
+"""
+import logging
+import os
+import tempfile
+from enum import Enum
+from typing import Any
+
+logger = logging.getLogger("BfBBPatch")
+
+
+class EventIDs(Enum):
+    Increment = 0x000B
+    Decrement = 0x000C
+    GivePowerUp = 0x0101
+    GiveCollectables = 0x01C2
+
+
+class LinkData:
+    event = 0
+    target = 0
+
+    def __init__(self, event: EventIDs, target):
+        self.event = event.value
+        self.target = target
+
+    def compare(self, link) -> bool:
+        return link.EventSendID == self.event and link.TargetAsset.op_Implicit(link.TargetAsset) == self.target
+
+
+FILES_TO_CHECK_LVL_ITEMS: dict[str, dict[int, list[LinkData]]] = {
+    'jf04': {
+        # CUTSCENE_KJ_END
+        0xbd99ade0: [
+            LinkData(EventIDs.GiveCollectables, 0xBD7097e3)
+        ]
+    },
+    'gl01': {
+        # BALLOON_A_PLAT
+        0x3db4fe59: [
+            LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
+            LinkData(EventIDs.Decrement, 0xa6662680),
+        ],
+        # BALLOON_B_PLAT
+        0x393949cc: [
+            LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
+            LinkData(EventIDs.Decrement, 0xa6662680),
+        ],
+        # BALLOON_C_PLAT
+        0x34bd953f: [
+            LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
+            LinkData(EventIDs.Decrement, 0xa6662680),
+        ],
+        # BALLOON_D_PLAT
+        0x3041e0b2: [
+            LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
+            LinkData(EventIDs.Decrement, 0xa6662680),
+        ],
+        # BALLOON_E_PLAT
+        0x2bc62c25: [
+            LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
+            LinkData(EventIDs.Decrement, 0xa6662680),
+        ],
+        # BALLOON_A_COUNT_DISP
+        0x078dc464: [
+            LinkData(EventIDs.Decrement, 0xa6662680),
+        ],
+        # BALLOON_B_COUNT_DISP
+        0xa65659df: [
+            LinkData(EventIDs.Decrement, 0xa6662680),
+        ],
+        # BALLOON_C_COUNT_DISP
+        0x451eef5a: [
+            LinkData(EventIDs.Decrement, 0xa6662680),
+        ],
+        # BALLOON_D_COUNT_DISP
+        0xe3e784d5: [
+            LinkData(EventIDs.Decrement, 0xa6662680),
+        ],
+        # BALLOON_E_COUNT_DISP
+        0x82b01a50: [
+            LinkData(EventIDs.Decrement, 0xa6662680),
+        ],
+    },
+    'bc02': {
+        0x5e64831b: [
+            LinkData(EventIDs.GiveCollectables, 0xBD7097e3)
+        ],
+        0x5e64831c: [
+            LinkData(EventIDs.GiveCollectables, 0xBD7097e3)
+        ]
+    },
+    'bc03': {
+        0x91f2a6cf: [
+            LinkData(EventIDs.GiveCollectables, 0xBD7097e3)
+        ],
+    },
+    'bc04': {
+        0xc1841225: [
+            LinkData(EventIDs.GiveCollectables, 0xBD7097e3)
+        ],
+    },
+    'sm03': {
+        0xd4d3bec2: [
+            LinkData(EventIDs.Decrement, 0xc4e703d6)
+        ],
+        0xd4d3bec3: [
+            LinkData(EventIDs.Decrement, 0xc4e703d6)
+        ],
+        0xd4d3bec4: [
+            LinkData(EventIDs.Decrement, 0xc4e703d6)
+        ],
+        0xd4d3bec5: [
+            LinkData(EventIDs.Decrement, 0xc4e703d6)
+        ],
+        0xd4d3bec6: [
+            LinkData(EventIDs.Decrement, 0xc4e703d6)
+        ],
+        0xd4d3bec7: [
+            LinkData(EventIDs.Decrement, 0xc4e703d6)
+        ],
+        0xd4d3bec8: [
+            LinkData(EventIDs.Decrement, 0xc4e703d6)
+        ],
+        0xd4d3bec9: [
+            LinkData(EventIDs.Decrement, 0xc4e703d6)
+        ],
+    },
+    'kf01': {
+        0x153CCF73: [
+            LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
+        ],
+        0x153CCF74: [
+            LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
+        ],
+        0x153CCF75: [
+            LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
+        ],
+    },
+    'kf02': {
+        0x9c2d8bb3: [
+            LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
+        ],
+        0x9c2d8bb4: [
+            LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
+        ],
+    },
+    'kf04': {
+        0x609203fd: [
+            LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
+        ],
+        0x96017696: [
+            LinkData(EventIDs.Increment, 0xed81694f)
+        ],
+        0x96017697: [
+            LinkData(EventIDs.Increment, 0xed81694f)
+        ],
+        0x96017698: [
+            LinkData(EventIDs.Increment, 0xed81694f)
+        ],
+        0x96017699: [
+            LinkData(EventIDs.Increment, 0xed81694f)
+        ],
+        0x9601769a: [
+            LinkData(EventIDs.Increment, 0xed81694f)
+        ],
+        0x9601769b: [
+            LinkData(EventIDs.Increment, 0xed81694f)
+        ],
+    },
+    'gy03': {
+        0x1344a38c: [
+            LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
+            LinkData(EventIDs.Decrement, 0x9a101de7),
+        ],
+        0x1344a38d: [
+            LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
+            LinkData(EventIDs.Decrement, 0x9a101de7),
+        ],
+        0x1344a38e: [
+            LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
+            LinkData(EventIDs.Decrement, 0x9a101de7),
+        ],
+        0x1344a38f: [
+            LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
+            LinkData(EventIDs.Decrement, 0x9a101de7),
+        ],
+        0x46d4fa25: [
+            LinkData(EventIDs.Decrement, 0x9a101de7),
+        ],
+        0x46d4fa26: [
+            LinkData(EventIDs.Decrement, 0x9a101de7),
+        ],
+        0x46d4fa27: [
+            LinkData(EventIDs.Decrement, 0x9a101de7),
+        ],
+        0x46d4fa28: [
+            LinkData(EventIDs.Decrement, 0x9a101de7),
+        ],
+    },
+}
+FILES_TO_CHECK_SKILLS: dict[str, dict[int, list[LinkData]]] = {
+    'b101': {
+        0xcc4ea457: [
+            LinkData(EventIDs.GivePowerUp, 0xBD7097e3)
+        ]
+    },
+    'b201': {
+        0xeb3aada0: [
+            LinkData(EventIDs.GivePowerUp, 0x00002abb)
+        ]
+    },
+}
+
+
+def setup_industrial_park(lib_path: str):
+    """Load pythonnet and IP, returns a configured RandomizableArchive and IP's Platform enum."""
+    # print(sys.path)
+    logger.debug('--before pythonnet.load--')
+    # setup pythonnet
+    from pythonnet import load, set_runtime, get_runtime_info
+    set_runtime('netfx')
+    logger.debug(f"runtime info: {get_runtime_info()}")
+    load()
+    import clr
+    from System import Environment
+    from System.Runtime.InteropServices  import RuntimeInformation
+    from System.Reflection import Assembly
+
+    # some version logging
+    clr_version = Assembly.Load("System.Runtime").GetName().Version
+    logger.debug(f"CLR Version: {clr_version}")
+    logger.debug(f"Environment.Version: {Environment.Version}")
+    logger.debug(f"RuntimeInformation.FrameworkDescription: {RuntimeInformation.FrameworkDescription}")
+    # load and setup IP libs
+    clr.AddReference(os.path.abspath(lib_path + '/IP/IndustrialPark.dll'))
+    clr.AddReference(os.path.abspath(lib_path + '/IP/HipHopFile.dll'))
+    clr.AddReference(os.path.abspath(lib_path + '/IP/Randomizer.dll'))
+    from HipHopFile import Platform, Game
+    from IndustrialPark import ArchiveEditorFunctions, Link, HexUIntTypeConverter, AutomaticUpdater
+    from IndustrialPark.Randomizer import RandomizableArchive
+
+    HexUIntTypeConverter.Legacy = True
+    editor_funcs = RandomizableArchive()
+    editor_funcs.SkipTextureDisplay = True
+    editor_funcs.Platform = Platform.GameCube
+    editor_funcs.Game = Game.BFBB
+    editor_funcs.standalone = True
+    editor_funcs.NoLayers = True
+    editor_funcs.editorFilesFolder = f'{lib_path}/IP/Resources/IndustrialPark-EditorFiles/IndustrialPark-EditorFiles-master/'
+    return editor_funcs, Platform
+
+def edit_hip(editor_funcs, platform, name: str, params: Any, path: str):
+    """Make the changes of `BfBBContainer.get_hip_edits` to the HIP at `path` with IP, saving it in place."""
+    editor_funcs.OpenFile(path, False, platform.Unknown)
+    if name == 'hb01':
+        if editor_funcs.ShuffleSpatulaGatesHB01(*params):
+            editor_funcs.ImportNumbers()
+    elif name == 'hb08':
+        if editor_funcs.ShuffleSpatulaGatesHB08(*params):
+            editor_funcs.ImportNumbers()
+    else:
+        assets_to_check = FILES_TO_CHECK_SKILLS.get(name) or FILES_TO_CHECK_LVL_ITEMS[name]
+        for id, links_to_check in assets_to_check.items():
+            assert id in editor_funcs.assetDictionary, f"{id} is not a valid id in {name}.HIP"
+            links = editor_funcs.assetDictionary[id].Links
+            links_to_remove = []
+            for data in links_to_check:
+                found = False
+                for link in links:
+                    if data.compare(link):
+                        # logger.debug(f"removing link {link.ToString()} from 0x{id:x} in {name}.HIP")
+                        links_to_remove.append(link)
+                        found = True
+                if not found:
+                    assert False, f"link not found {data.event} => 0x{data.target:x} on 0x{id:x} in {name}.HIP"
+            editor_funcs.assetDictionary[id].Links = [link for link in links if link not in links_to_remove]
+    editor_funcs.Save()
+
+
+class HipEditor:
+    """Edits single HIPs with IndustrialPark, pythonnet and IP are loaded on the first edit and kept."""
+
+    def __init__(self, lib_path: str):
+        self.lib_path = lib_path
+        self.editor_funcs = None
+        self.platform = None
+        self.work_dir = tempfile.TemporaryDirectory()
+
+    def edit(self, name: str, params: Any, data: bytes) -> bytes:
+        if self.editor_funcs is None:
+            self.editor_funcs, self.platform = setup_industrial_park(self.lib_path)
+        path = os.path.join(self.work_dir.name, f'{name}.HIP')
+        with open(path, "wb") as f:
+            f.write(data)
+        edit_hip(self.editor_funcs, self.platform, name, params, path)
+        with open(path, "rb") as f:
+            return f.read()
+
+    def close(self):
+        try:
+            self.work_dir.cleanup()
+        except Exception:
+            logger.warning("Couldn't clean up temp folder")
+
+
+def worker_main(conn, lib_path: str, editor_class=HipEditor):
+    """Loop of a patch worker process, takes (name, params, data) jobs from `conn` until it gets None."""
+    editor = editor_class(lib_path)
+    try:
+        while True:
+            job = conn.recv()
+            if job is None:
+                break
+            try:
+                conn.send((True, editor.edit(*job)))
+            except Exception as e:
+                conn.send((False, repr(e)))
+    except EOFError:
+        # the patcher went away
+        pass
+    finally:
+        editor.close()
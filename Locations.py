@@ -1,6 +1,6 @@
 import typing
 from BaseClasses import Location
-from .constants import LocationNames, game_name
+from .constants import LevelNames, LocationNames, RegionNames, game_name
 
 
 class BfBBLocation(Location):
@@ -334,3 +334,78 @@ location_table: typing.Dict[str, typing.Optional[int]] = {
 }
 
 lookup_id_to_name: typing.Dict[int, str] = {_id: name for name, _id in location_table.items()}
+
+
+def index_by_region(table: typing.Iterable[str]) -> typing.Dict[str, typing.List[str]]:
+    # location names are prefixed with their region: "<region>: <name>"
+    index: typing.Dict[str, typing.List[str]] = {}
+    for k in table:
+        index.setdefault(k.split(":", 1)[0], []).append(k)
+    return index
+
+
+hub_regions = [RegionNames.hub1, RegionNames.hub2, RegionNames.hub3, RegionNames.pineapple, RegionNames.squid,
+               RegionNames.tree, RegionNames.shoals, RegionNames.police, RegionNames.kk, RegionNames.cb]
+level_regions: typing.Dict[str, typing.List[str]] = {
+    LevelNames.bb: [RegionNames.bb01, RegionNames.bb02, RegionNames.bb03, RegionNames.bb04],
+    LevelNames.kf: [RegionNames.kf01, RegionNames.kf02, RegionNames.kf04, RegionNames.kf05],
+    LevelNames.jf: [RegionNames.jf01, RegionNames.jf02, RegionNames.jf03, RegionNames.jf04],
+    LevelNames.gl: [RegionNames.gl01, RegionNames.gl02, RegionNames.gl03],
+    LevelNames.bc: [RegionNames.bc01, RegionNames.bc02, RegionNames.bc03, RegionNames.bc04, RegionNames.bc05],
+    LevelNames.rb: [RegionNames.rb01, RegionNames.rb02, RegionNames.rb03],
+    LevelNames.sm: [RegionNames.sm01, RegionNames.sm02, RegionNames.sm03, RegionNames.sm04],
+    LevelNames.gy: [RegionNames.gy01, RegionNames.gy02, RegionNames.gy03, RegionNames.gy04],
+    LevelNames.db: [RegionNames.db01, RegionNames.db02, RegionNames.db03, RegionNames.db04, RegionNames.db05],
+}
+# boss rooms with a single location are grouped with the room leading to them
+merged_region_groups = {
+    RegionNames.bc05: RegionNames.bc02,
+    RegionNames.gy04: RegionNames.gy03,
+    RegionNames.db05: RegionNames.db01,
+}
+boss_locations = [
+    LocationNames.lvl_itm_jf_01,
+    LocationNames.bubble_bowl,
+    LocationNames.spat_b1_01,
+    LocationNames.spat_bc_08,
+    LocationNames.cruise_bubble,
+    LocationNames.spat_b2_01,
+    LocationNames.spat_gy_08,
+    LocationNames.spat_b3_01,
+    LocationNames.spat_b3_02,
+]
+level_item_reward_locations = [
+    LocationNames.spat_jf_08,
+    LocationNames.spat_bb_01,
+    LocationNames.spat_gl_03,
+    LocationNames.spat_bc_03,
+    LocationNames.spat_bc_08,
+    LocationNames.spat_rb_03,
+    LocationNames.sock_sm03_01,
+    LocationNames.spat_kf_02,
+    LocationNames.spat_kf_06,
+    LocationNames.spat_gy_06,
+    LocationNames.spat_gy_07,
+    LocationNames.purple_so_gy03_01,
+    LocationNames.spat_gy_08,
+]
+
+
+def build_location_name_groups() -> typing.Dict[str, typing.Set[str]]:
+    by_region = index_by_region(location_table)
+    groups: typing.Dict[str, typing.Set[str]] = {
+        "Hub": {k for region in hub_regions for k in by_region.get(region, []) if k not in patrick_location_table},
+        "Bosses": set(boss_locations),
+        "Mr. Krabs": set(by_region[LevelNames.hub]),
+        "Patrick": set(patrick_location_table),
+    }
+    for level, regions in level_regions.items():
+        groups[level] = {k for region in regions for k in by_region.get(region, [])}
+        for region in regions:
+            group = merged_region_groups.get(region, region)
+            groups.setdefault(group, set()).update(by_region.get(region, []))
+    groups["Level Item Rewards"] = set(level_item_reward_locations)
+    return groups
+
+
+location_name_groups = build_location_name_groups()
@@ -0,0 +1,223 @@
+import struct
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from typing import Callable, Dict, List, Optional, Tuple
+
+MEM1_START = 0x80000000
+MEM1_END = 0x81800000
+
+
+class MemoryBackend(ABC):
+    """Access to the emulated memory of the game, mirrors the module functions of dolphin_memory_engine."""
+
+    @abstractmethod
+    def hook(self):
+        ...
+
+    @abstractmethod
+    def un_hook(self):
+        ...
+
+    @abstractmethod
+    def is_hooked(self) -> bool:
+        ...
+
+    @abstractmethod
+    def read_bytes(self, addr: int, size: int) -> bytes:
+        ...
+
+    @abstractmethod
+    def write_bytes(self, addr: int, data: bytes):
+        ...
+
+    def read_byte(self, addr: int) -> int:
+        return self.read_bytes(addr, 0x1)[0]
+
+    def read_word(self, addr: int) -> int:
+        return int.from_bytes(self.read_bytes(addr, 0x4), "big")
+
+    def write_byte(self, addr: int, val: int):
+        self.write_bytes(addr, val.to_bytes(0x1, "big"))
+
+    def write_word(self, addr: int, val: int):
+        self.write_bytes(addr, val.to_bytes(0x4, "big"))
+
+
+class DolphinMemoryBackend(MemoryBackend):
+    """Talks to a running Dolphin through dolphin_memory_engine."""
+
+    def __init__(self):
+        import dolphin_memory_engine
+        self.dme = dolphin_memory_engine
+
+    def hook(self):
+        self.dme.hook()
+
+    def un_hook(self):
+        self.dme.un_hook()
+
+    def is_hooked(self) -> bool:
+        return self.dme.is_hooked()
+
+    def read_bytes(self, addr: int, size: int) -> bytes:
+        return self.dme.read_bytes(addr, size)
+
+    def write_bytes(self, addr: int, data: bytes):
+        self.dme.write_bytes(addr, data)
+
+    def read_byte(self, addr: int) -> int:
+        return self.dme.read_byte(addr)
+
+    def read_word(self, addr: int) -> int:
+        return self.dme.read_word(addr)
+
+    def write_byte(self, addr: int, val: int):
+        self.dme.write_byte(addr, val)
+
+    def write_word(self, addr: int, val: int):
+        self.dme.write_word(addr, val)
+
+
+class FakeDolphinMemory(MemoryBackend):
+    """
+    In-process stand-in for Dolphin, backed by a bytearray image of MEM1.
+    Used to test and benchmark the client without a running emulator.
+    """
+
+    def __init__(self, game_id: Optional[bytes] = None):
+        self.mem = bytearray(MEM1_END - MEM1_START)
+        self.hooked = False
+        # start of free memory handed out by alloc, well past the game globals
+        self.heap_ptr = 0x80400000
+        if game_id is not None:
+            self.write_bytes(MEM1_START, game_id)
+
+    def hook(self):
+        self.hooked = True
+
+    def un_hook(self):
+        self.hooked = False
+
+    def is_hooked(self) -> bool:
+        return self.hooked
+
+    def _offset(self, addr: int, size: int) -> int:
+        if not MEM1_START <= addr or addr + size > MEM1_END:
+            raise RuntimeError(f"Could not access memory at 0x{addr:x} (size 0x{size:x})")
+        return addr - MEM1_START
+
+    def read_bytes(self, addr: int, size: int) -> bytes:
+        offset = self._offset(addr, size)
+        return bytes(self.mem[offset:offset + size])
+
+    def write_bytes(self, addr: int, data: bytes):
+        offset = self._offset(addr, len(data))
+        self.mem[offset:offset + len(data)] = data
+
+    def alloc(self, size: int, align: int = 0x20) -> int:
+        addr = (self.heap_ptr + align - 1) & ~(align - 1)
+        self._offset(addr, size)
+        self.heap_ptr = addr + size
+        return addr
+
+
+class FakeScene:
+    """
+    Lays out a loaded scene in a FakeDolphinMemory:
+    the scene struct (starting with the scene id) and the obj hash table (id, obj ptr) with linear probing.
+    """
+
+    def __init__(self, memory: FakeDolphinMemory, scene_id: bytes, cur_scene_ptr_addr: int,
+                 obj_table_ptr_addr: int, obj_table_size_addr: int, table_size: int = 0x400):
+        assert table_size & (table_size - 1) == 0, "obj table size has to be a power of 2"
+        self.memory = memory
+        self.scene_id = scene_id
+        self.table_size = table_size
+        self.scene_ptr = memory.alloc(0x100)
+        self.table_ptr = memory.alloc(table_size * 0x8)
+        self.objs: Dict[int, int] = {}
+        memory.write_bytes(self.scene_ptr, scene_id)
+        memory.write_word(cur_scene_ptr_addr, self.scene_ptr)
+        memory.write_word(obj_table_ptr_addr, self.table_ptr)
+        memory.write_word(obj_table_size_addr, table_size)
+
+    def add_obj(self, obj_id: int, size: int = 0x300) -> int:
+        assert obj_id != 0 and obj_id not in self.objs, f"invalid or duplicate obj id 0x{obj_id:x}"
+        assert len(self.objs) < self.table_size - 1, "obj table is full"
+        obj_ptr = self.memory.alloc(size)
+        idx = obj_id & (self.table_size - 1)
+        while self.memory.read_word(self.table_ptr + idx * 0x8) != 0:
+            idx = (idx + 1) % self.table_size
+        self.memory.write_bytes(self.table_ptr + idx * 0x8, struct.pack(">II", obj_id, obj_ptr))
+        self.objs[obj_id] = obj_ptr
+        return obj_ptr
+
+
+class CoalescedReader:
+    """
+    Collects all the (address, size) reads needed for a tick, merges ranges that are close together
+    and fetches them with as few read_bytes calls as possible.
+    Results are served from a single buffer through memoryviews.
+    """
+
+    def __init__(self, read_bytes: Callable[[int, int], bytes], max_gap: int = 0x1000, max_size: int = 0x10000):
+        self._read_bytes = read_bytes
+        # ranges that are at most max_gap bytes apart are fetched with a single read of up to max_size bytes
+        self.max_gap = max_gap
+        self.max_size = max_size
+        self.requests: List[Tuple[int, int]] = []
+        # sorted (start, end, buffer offset) of every range that has been read
+        self.ranges: List[Tuple[int, int, int]] = []
+        self._starts: List[int] = []
+        self.buffer = bytearray()
+        self.view = memoryview(self.buffer)
+
+    def request(self, addr: int, size: int):
+        self.requests.append((addr, size))
+
+    def _coalesce(self) -> List[Tuple[int, int]]:
+        merged: List[Tuple[int, int]] = []
+        for addr, size in sorted(self.requests):
+            end = addr + size
+            if merged and addr <= merged[-1][1] + self.max_gap and end - merged[-1][0] <= self.max_size:
+                if end > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((addr, end))
+        return merged
+
+    def execute(self) -> int:
+        """Read all requested ranges, returns the number of reads issued."""
+        merged = self._coalesce()
+        self.requests.clear()
+        self.ranges = []
+        self.buffer = bytearray()
+        for start, end in merged:
+            self.ranges.append((start, end, len(self.buffer)))
+            self.buffer += self._read_bytes(start, end - start)
+        self._starts = [start for start, _, _ in self.ranges]
+        self.view = memoryview(self.buffer)
+        return len(merged)
+
+    def read(self, addr: int, size: int) -> Optional[memoryview]:
+        """Get previously fetched data, None if the range wasn't part of any read."""
+        i = bisect_right(self._starts, addr) - 1
+        if i < 0:
+            return None
+        start, end, offset = self.ranges[i]
+        if addr + size > end:
+            return None
+        return self.view[offset + addr - start:offset + addr - start + size]
+
+    def read_int(self, addr: int, size: int) -> Optional[int]:
+        data = self.read(addr, size)
+        if data is None:
+            return None
+        return int.from_bytes(data, "big")
+
+    def reset(self):
+        self.requests.clear()
+        self.ranges = []
+        self._starts = []
+        self.buffer = bytearray()
+        self.view = memoryview(self.buffer)
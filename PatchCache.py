@@ -0,0 +1,109 @@
+import hashlib
+import json
+import logging
+import os
+import pkgutil
+import tempfile
+from typing import Dict, Optional
+
+import Utils
+
+logger = logging.getLogger("BfBBPatch")
+
+# bump this whenever the way the HIPs are edited changes without an apworld version bump
+CACHE_VERSION = 1
+
+
+def get_world_version() -> str:
+    # pkgutil also works from inside the zipped apworld
+    manifest = json.loads(pkgutil.get_data(__package__, "archipelago.json"))
+    return manifest.get("world_version", "0")
+
+
+def make_key(*parts) -> str:
+    return hashlib.sha256(json.dumps([CACHE_VERSION, *parts], sort_keys=True).encode()).hexdigest()
+
+
+def file_md5(path: str) -> str:
+    """MD5 of a file, remembered by path, size and mtime so a ROM is only hashed once."""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    index_path = Utils.cache_path("bfbb", "rom_hashes.json")
+    index: Dict[str, dict] = {}
+    try:
+        with open(index_path, encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        pass
+    if not isinstance(index, dict):
+        # unreadable, start over
+        index = {}
+    entry = index.get(path)
+    if isinstance(entry, dict) and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns \
+            and isinstance(entry.get("md5"), str):
+        return entry["md5"]
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(0x100000), b""):
+            md5.update(chunk)
+    index[path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "md5": md5.hexdigest()}
+    try:
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        # batch patches hash at the same time, write next to it first so nobody reads a half written index
+        fd, temp_file = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(index_path))
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(index, f)
+            os.replace(temp_file, index_path)
+        except BaseException:
+            os.remove(temp_file)
+            raise
+    except OSError:
+        logger.warning("Couldn't write the ROM hash cache")
+    return index[path]["md5"]
+
+
+class PatchCache:
+    """
+    Patched HIP files on disk, by a key of everything the result depends on.
+    Only the `max_entries` most recently used files are kept.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 64):
+        self.path = path or Utils.cache_path("bfbb", "hips")
+        self.max_entries = max_entries
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.HIP")
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._file(key), "rb") as f:
+                data = f.read()
+            os.utime(self._file(key))
+        except OSError:
+            return None
+        return data
+
+    def put(self, key: str, data: bytes):
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            # write next to it first, so an interrupted patch never leaves a broken entry
+            temp_file = f"{self._file(key)}.tmp"
+            with open(temp_file, "wb") as f:
+                f.write(data)
+            os.replace(temp_file, self._file(key))
+            self.prune()
+        except OSError:
+            logger.warning(f"Couldn't write {key} to the HIP cache")
+
+    def prune(self):
+        files = [entry for entry in os.scandir(self.path) if entry.name.endswith(".HIP")]
+        if len(files) <= self.max_entries:
+            return
+        files.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+        for entry in files[self.max_entries:]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
@@ -0,0 +1,120 @@
+import atexit
+import logging
+import multiprocessing
+import threading
+from multiprocessing.connection import Connection, wait
+from typing import Any, Dict, List, Tuple, Type
+
+from .HipEditor import HipEditor, worker_main
+
+logger = logging.getLogger("BfBBPatch")
+
+
+class PatchWorker:
+    """
+    A separate process keeping the CLR and the IP assemblies loaded between patches.
+    Jobs are (HIP name, edit parameters, HIP data) and sent over a pipe, the edited HIP is sent back.
+
+    The worker is a spawned process running `HipEditor.worker_main`. Like every spawned process it imports the
+    parent's `__main__` (without running its main guard) and the worlds package to get to HipEditor,
+    that's paid once per worker. What the parent avoids is loading pythonnet and IP itself.
+    """
+
+    def __init__(self, lib_path: str, editor_class: Type[HipEditor] = HipEditor):
+        # always spawn, pythonnet doesn't survive a fork of a process which already loaded it
+        context = multiprocessing.get_context("spawn")
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=worker_main, name="BfBBPatchWorker", daemon=True,
+                                       args=(child_conn, lib_path, editor_class))
+        self.process.start()
+        child_conn.close()
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    def submit(self, name: str, params: Any, data: bytes):
+        self.conn.send((name, params, data))
+
+    def result(self, name: str) -> bytes:
+        ok, result = self.conn.recv()
+        if not ok:
+            raise RuntimeError(f"patch worker failed to edit {name}.HIP: {result}")
+        return result
+
+    def edit(self, name: str, params: Any, data: bytes) -> bytes:
+        self.submit(name, params, data)
+        return self.result(name)
+
+    def close(self):
+        if self.process.is_alive():
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+            self.process.join(5)
+            if self.process.is_alive():
+                self.process.kill()
+        self.conn.close()
+
+
+# idle workers kept for the next patch, a worker is only ever used by the patch that checked it out
+_idle_workers: List[PatchWorker] = []
+_workers_lock = threading.Lock()
+
+
+def checkout_patch_workers(count: int, lib_path: str) -> List[PatchWorker]:
+    """Take `count` workers from the pool for a patch, starting new ones if there aren't enough."""
+    with _workers_lock:
+        for worker in [worker for worker in _idle_workers if not worker.is_alive()]:
+            worker.close()
+            _idle_workers.remove(worker)
+        workers = _idle_workers[:count]
+        del _idle_workers[:count]
+    if len(workers) < count:
+        logger.info(f"starting {count - len(workers)} patch worker(s)")
+    workers += [PatchWorker(lib_path) for _ in range(count - len(workers))]
+    return workers
+
+
+def return_patch_workers(workers: List[PatchWorker], keep: bool):
+    """Put workers back into the pool for the next patch, or close them if they aren't kept."""
+    with _workers_lock:
+        for worker in workers:
+            if keep and worker.is_alive():
+                _idle_workers.append(worker)
+            else:
+                worker.close()
+
+
+@atexit.register
+def close_patch_workers():
+    with _workers_lock:
+        for worker in _idle_workers:
+            worker.close()
+        _idle_workers.clear()
+
+
+def edit_in_parallel(workers: List[PatchWorker], jobs: Dict[str, Tuple[str, Any, bytes]]) -> Dict[str, bytes]:
+    """Spread HIP edits (job id -> HIP name, edit parameters, data) over the workers, returns the edited HIPs by id."""
+    # biggest first, so a big HIP doesn't start last and hold up everything
+    pending = sorted(jobs.items(), key=lambda job: len(job[1][2]), reverse=True)
+    idle = list(workers)
+    busy: Dict[Connection, Tuple[PatchWorker, str, str]] = {}
+    results = {}
+    try:
+        while pending or busy:
+            while pending and idle:
+                worker = idle.pop()
+                job_id, (name, params, data) = pending.pop(0)
+                worker.submit(name, params, data)
+                busy[worker.conn] = (worker, job_id, name)
+            for conn in wait(list(busy)):
+                worker, job_id, name = busy.pop(conn)
+                results[job_id] = worker.result(name)
+                idle.append(worker)
+    except BaseException:
+        # results still underway would be taken as the answer to the next job, these workers can't be reused
+        for worker, _, _ in busy.values():
+            worker.close()
+        raise
+    return results
@@ -0,0 +1,277 @@
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .Memory import MemoryBackend
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+# files which only pass memory calls through, they never count as the caller
+_PASS_THROUGH_FILES = {os.path.join(_PACKAGE_DIR, "Memory.py"), os.path.join(_PACKAGE_DIR, "Profiling.py")}
+
+TICK_PHASES = ("check_ingame", "validate_save", "check_death", "give_items", "check_locations", "handle_ring_link")
+
+
+class CountingMemoryBackend(MemoryBackend):
+    """Wraps another backend and counts the calls and bytes going through it."""
+
+    def __init__(self, inner: MemoryBackend):
+        self.inner = inner
+        self.calls = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def take(self) -> Dict[str, int]:
+        """Get the counts since the last call and reset them."""
+        counts = {"calls": self.calls, "bytes_read": self.bytes_read, "bytes_written": self.bytes_written}
+        self.calls = self.bytes_read = self.bytes_written = 0
+        return counts
+
+    def hook(self):
+        self.calls += 1
+        self.inner.hook()
+
+    def un_hook(self):
+        self.calls += 1
+        self.inner.un_hook()
+
+    def is_hooked(self) -> bool:
+        self.calls += 1
+        return self.inner.is_hooked()
+
+    def read_bytes(self, addr: int, size: int) -> bytes:
+        self.calls += 1
+        self.bytes_read += size
+        return self.inner.read_bytes(addr, size)
+
+    def write_bytes(self, addr: int, data: bytes):
+        self.calls += 1
+        self.bytes_written += len(data)
+        self.inner.write_bytes(addr, data)
+
+    def read_byte(self, addr: int) -> int:
+        self.calls += 1
+        self.bytes_read += 0x1
+        return self.inner.read_byte(addr)
+
+    def read_word(self, addr: int) -> int:
+        self.calls += 1
+        self.bytes_read += 0x4
+        return self.inner.read_word(addr)
+
+    def write_byte(self, addr: int, val: int):
+        self.calls += 1
+        self.bytes_written += 0x1
+        self.inner.write_byte(addr, val)
+
+    def write_word(self, addr: int, val: int):
+        self.calls += 1
+        self.bytes_written += 0x4
+        self.inner.write_word(addr, val)
+
+
+def percentiles(values: Iterable[float], ps: Iterable[int] = (50, 95, 99)) -> Dict[int, float]:
+    """Nearest-rank percentiles, 0 for every percentile if there are no values."""
+    ordered = sorted(values)
+    if not ordered:
+        return {p: 0. for p in ps}
+    return {p: ordered[min(len(ordered) - 1, max(0, -(-p * len(ordered) // 100) - 1))] for p in ps}
+
+
+class TickProfiler:
+    """
+    Records per-phase timings and memory access counts of the last `window` sync ticks.
+    Phases are timed with `phase`, a tick is closed with `end_tick` and the way it ended,
+    ticks that stopped early count towards the percentiles too.
+    """
+
+    def __init__(self, memory: Optional[CountingMemoryBackend] = None, window: int = 1000):
+        self.memory = memory
+        self.ticks: Deque[dict] = deque(maxlen=window)
+        self.total_ticks = 0
+        self._phases: Dict[str, float] = {}
+        self._tick_start: Optional[float] = None
+
+    def begin_tick(self):
+        self._phases = {}
+        self._tick_start = time.perf_counter()
+        if self.memory is not None:
+            self.memory.take()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._phases[name] = self._phases.get(name, 0.) + (time.perf_counter() - start) * 1000
+
+    def end_tick(self, status: str = "ok"):
+        if self._tick_start is None:
+            return
+        tick = {
+            "time": time.time(),
+            "status": status,
+            "total_ms": (time.perf_counter() - self._tick_start) * 1000,
+            "phases_ms": self._phases,
+        }
+        if self.memory is not None:
+            tick.update(self.memory.take())
+        self.ticks.append(tick)
+        self.total_ticks += 1
+        self._tick_start = None
+
+    def summary(self) -> List[str]:
+        if not self.ticks:
+            return ["No sync ticks recorded yet"]
+        lines = [f"Last {len(self.ticks)} of {self.total_ticks} ticks (p50 / p95 / p99):"]
+        statuses = Counter(tick["status"] for tick in self.ticks)
+        lines.append("  " + ", ".join(f"{count} {status}" for status, count in statuses.most_common()))
+
+        def fmt(name: str, values: List[float], unit: str = "", digits: int = 0):
+            p = percentiles(values)
+            lines.append(f"  {name}: {p[50]:.{digits}f} / {p[95]:.{digits}f} / {p[99]:.{digits}f}{unit}")
+
+        fmt("tick", [tick["total_ms"] for tick in self.ticks], " ms", 2)
+        for name in TICK_PHASES:
+            values = [tick["phases_ms"][name] for tick in self.ticks if name in tick["phases_ms"]]
+            if values:
+                fmt(name, values, " ms", 2)
+        if self.memory is not None:
+            fmt("memory calls", [tick["calls"] for tick in self.ticks])
+            fmt("bytes read", [tick["bytes_read"] for tick in self.ticks])
+            fmt("bytes written", [tick["bytes_written"] for tick in self.ticks])
+        return lines
+
+    def dump(self, path: str) -> int:
+        """Write the recorded ticks as json lines, returns the number of ticks written."""
+        with open(path, "w", encoding="utf-8") as f:
+            for tick in self.ticks:
+                f.write(json.dumps(tick))
+                f.write("\n")
+        return len(self.ticks)
+
+    def reset(self):
+        self.ticks.clear()
+        self.total_ticks = 0
+
+
+class MemoryCall(NamedTuple):
+    func: str
+    addr: Optional[int]
+    size: int
+    duration: float
+    caller: str
+    stack: Tuple[str, ...]
+
+
+class ProfilingMemoryBackend(MemoryBackend):
+    """
+    Wraps another backend and records every call with its address, size, duration and calling client function.
+    Walking the stack makes every call noticeably slower, so this is only used if enabled in the settings.
+    """
+
+    def __init__(self, inner: MemoryBackend, max_records: int = 100000, max_depth: int = 12):
+        self.inner = inner
+        self.max_depth = max_depth
+        self.records: Deque[MemoryCall] = deque(maxlen=max_records)
+        # stack -> [calls, bytes, seconds], kept for all calls, not just the recorded ones
+        self.stacks: Dict[Tuple[str, ...], List[float]] = {}
+
+    def _stack(self) -> Tuple[str, ...]:
+        frame = sys._getframe(2)
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            file = frame.f_code.co_filename
+            if file not in _PASS_THROUGH_FILES and os.path.dirname(file) == _PACKAGE_DIR:
+                stack.append(frame.f_code.co_name)
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    def _record(self, func: str, addr: Optional[int], size: int, start: float):
+        duration = time.perf_counter() - start
+        stack = self._stack()
+        self.records.append(MemoryCall(func, addr, size, duration, stack[-1] if stack else "<unknown>", stack))
+        totals = self.stacks.setdefault(stack + (func,), [0, 0, 0.])
+        totals[0] += 1
+        totals[1] += size
+        totals[2] += duration
+
+    def report(self, top: int = 15) -> List[str]:
+        """Calls, bytes and time per calling function, most calls first."""
+        by_caller: Dict[str, List[float]] = {}
+        for stack, (calls, size, duration) in self.stacks.items():
+            totals = by_caller.setdefault(stack[-2] if len(stack) > 1 else "<unknown>", [0, 0, 0.])
+            totals[0] += calls
+            totals[1] += size
+            totals[2] += duration
+        if not by_caller:
+            return ["No memory calls recorded yet"]
+        lines = ["Memory calls by caller (calls, bytes, ms):"]
+        for caller, (calls, size, duration) in sorted(by_caller.items(), key=lambda v: v[1][0], reverse=True)[:top]:
+            lines.append(f"  {caller}: {calls}, {size}, {duration * 1000:.2f}")
+        return lines
+
+    def dump_folded(self, path: str) -> int:
+        """Write the call counts per stack in the folded format flame graph tools take, returns the number of stacks."""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, (calls, _, _) in self.stacks.items():
+                f.write(f"{';'.join(stack)} {calls}\n")
+        return len(self.stacks)
+
+    def reset(self):
+        self.records.clear()
+        self.stacks.clear()
+
+    def hook(self):
+        start = time.perf_counter()
+        self.inner.hook()
+        self._record("hook", None, 0, start)
+
+    def un_hook(self):
+        start = time.perf_counter()
+        self.inner.un_hook()
+        self._record("un_hook", None, 0, start)
+
+    def is_hooked(self) -> bool:
+        start = time.perf_counter()
+        result = self.inner.is_hooked()
+        self._record("is_hooked", None, 0, start)
+        return result
+
+    def read_bytes(self, addr: int, size: int) -> bytes:
+        start = time.perf_counter()
+        result = self.inner.read_bytes(addr, size)
+        self._record("read_bytes", addr, size, start)
+        return result
+
+    def write_bytes(self, addr: int, data: bytes):
+        start = time.perf_counter()
+        self.inner.write_bytes(addr, data)
+        self._record("write_bytes", addr, len(data), start)
+
+    def read_byte(self, addr: int) -> int:
+        start = time.perf_counter()
+        result = self.inner.read_byte(addr)
+        self._record("read_byte", addr, 0x1, start)
+        return result
+
+    def read_word(self, addr: int) -> int:
+        start = time.perf_counter()
+        result = self.inner.read_word(addr)
+        self._record("read_word", addr, 0x4, start)
+        return result
+
+    def write_byte(self, addr: int, val: int):
+        start = time.perf_counter()
+        self.inner.write_byte(addr, val)
+        self._record("write_byte", addr, 0x1, start)
+
+    def write_word(self, addr: int, val: int):
+        start = time.perf_counter()
+        self.inner.write_word(addr, val)
+        self._record("write_word", addr, 0x4, start)
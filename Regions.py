@@ -3,7 +3,7 @@ from typing import List, Dict
 from . import BfBBOptions
 from .Locations import BfBBLocation, location_table, \
     sock_location_table, spat_location_table, level_item_location_table, golden_underwear_location_table, \
-    skill_location_table, purple_so_location_table
+    skill_location_table, purple_so_location_table, index_by_region
 from .constants import ConnectionNames, LevelNames, RegionNames, LocationNames
 
 from BaseClasses import MultiWorld, Region, Entrance
@@ -22,22 +22,30 @@ def create_region(world: MultiWorld, player: int, name: str, locations=None, exi
     return ret
 
 
+spat_locations_by_region = index_by_region(spat_location_table)
+sock_locations_by_region = index_by_region(sock_location_table)
+skill_locations_by_region = index_by_region(skill_location_table)
+golden_underwear_locations_by_region = index_by_region(golden_underwear_location_table)
+level_item_locations_by_region = index_by_region(level_item_location_table)
+purple_so_locations_by_region = index_by_region(purple_so_location_table)
+
+
 def _get_locations_for_region(options: BfBBOptions, name: str) -> List[str]:
-    result = [k for k in spat_location_table if f"{name}:" in k]
+    result = spat_locations_by_region.get(name, []).copy()
     if name == RegionNames.hub1:
-        result += [k for k in spat_location_table if f"{LevelNames.hub}:" in k]
+        result += spat_locations_by_region.get(LevelNames.hub, [])
     if name == RegionNames.b3:
         result += [LocationNames.credits]
     if options.include_socks.value:
-        result += [k for k in sock_location_table if f"{name}:" in k]
+        result += sock_locations_by_region.get(name, [])
     if options.include_skills.value:
-        result += [k for k in skill_location_table if f"{name}:" in k]
+        result += skill_locations_by_region.get(name, [])
     if options.include_golden_underwear.value and "Hub" in name:
-        result += [k for k in golden_underwear_location_table if f"{name}:" in k]
+        result += golden_underwear_locations_by_region.get(name, [])
     if options.include_level_items.value:
-        result += [k for k in level_item_location_table if f"{name}:" in k]
+        result += level_item_locations_by_region.get(name, [])
     if options.include_purple_so.value:
-        result += [k for k in purple_so_location_table if f"{name}:" in k]
+        result += purple_so_locations_by_region.get(name, [])
     return result
 
 
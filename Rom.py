@@ -2,19 +2,18 @@ import hashlib
 import json
 import logging
 import os
-import tempfile
 import zipfile
-from enum import Enum
-from typing import Any
+from io import BytesIO
+from typing import Any, Optional
 
 from settings import get_settings
 from worlds.Files import APPlayerContainer
 from . import Patches
 from .constants import ConnectionNames, game_name
-from .inc.wwrando.wwlib.gcm import GCM
 
 BFBB_HASH = "9e18f9a0032c4f3092945dc38a6517d3"
 
+
 class BfBBContainer(APPlayerContainer):
     game = game_name
     hash: str = BFBB_HASH
@@ -98,14 +97,160 @@ class BfBBContainer(APPlayerContainer):
         return opened_zipfile.read("seed")
 
     @classmethod
-    def apply_hiphop_changes(cls, opened_zipfile: zipfile.ZipFile, source_iso, dest_iso):
+    def get_hip_edits(cls, include_skills: bool, include_level_items: bool, randomize_gate_cost: int,
+                      gate_costs: dict[str, int]) -> dict[str, Any]:
+        """The HIPs to change, each with the parameters of its change, everything the patched HIP depends on."""
+        from .HipEditor import FILES_TO_CHECK_LVL_ITEMS, FILES_TO_CHECK_SKILLS
+        edits: dict[str, Any] = {}
+        if include_skills:
+            edits.update({name: "links" for name in FILES_TO_CHECK_SKILLS})
+        if include_level_items:
+            edits.update({name: "links" for name in FILES_TO_CHECK_LVL_ITEMS})
+        if randomize_gate_cost > 0:
+            edits['hb01'] = [gate_costs[ConnectionNames.hub1_bb01], gate_costs[ConnectionNames.hub1_gl01],
+                             gate_costs[ConnectionNames.hub1_b1], gate_costs[ConnectionNames.hub2_rb01],
+                             gate_costs[ConnectionNames.hub2_sm01], gate_costs[ConnectionNames.hub2_b2],
+                             gate_costs[ConnectionNames.hub3_kf01], gate_costs[ConnectionNames.hub3_gy01]]
+        edits['hb08'] = [gate_costs[ConnectionNames.cb_b3]]
+        return edits
+
+    @classmethod
+    def get_patch_hip_edits(cls, opened_zipfile: zipfile.ZipFile) -> dict[str, Any]:
+        """The HIP edits of a patch file, empty if it doesn't need any."""
         randomize_gate_cost = BfBBContainer.get_int(opened_zipfile, "randomize_gate_cost")
         gate_costs = BfBBContainer.get_json_obj(opened_zipfile, "gate_costs.json")
         include_skills = BfBBContainer.get_bool(opened_zipfile, "include_skills")
         include_level_items = BfBBContainer.get_bool(opened_zipfile, "include_level_items")
         if not include_skills and not include_level_items and randomize_gate_cost == 0:
+            return {}
+        return cls.get_hip_edits(include_skills, include_level_items, randomize_gate_cost, gate_costs)
+
+    @classmethod
+    def apply_hiphop_changes(cls, opened_zipfile: zipfile.ZipFile, source_iso, dest_iso):
+        edits = cls.get_patch_hip_edits(opened_zipfile)
+        if not edits:
             return
         cls.logger.debug('--setting up--')
+        # only needed for patching, don't load it with the world
+        from .inc.wwrando.wwlib.gcm import GCM
+        # only read the file system, the HIPs we change are extracted one by one below
+        gcm = GCM(source_iso)
+        gcm.read_entire_disc()
+        hips = cls.edit_hips(gcm, source_iso, list(edits.items()))
+        cls.export_iso_with_hips(gcm, dict(zip(edits, hips)), dest_iso)
+
+    @classmethod
+    def patch(cls, opened_zipfile: zipfile.ZipFile, source_iso, dest_iso):
+        """Make the patched game from the source ISO."""
+        gcm = None
+        hips = {}
+        edits = cls.get_patch_hip_edits(opened_zipfile)
+        if edits:
+            # only needed for patching, don't load it with the world
+            from .inc.wwrando.wwlib.gcm import GCM
+            gcm = GCM(source_iso)
+            gcm.read_entire_disc()
+            hips = dict(zip(edits, cls.edit_hips(gcm, source_iso, list(edits.items()))))
+        cls.write_patched_iso(opened_zipfile, gcm, source_iso, dest_iso, hips)
+
+    @classmethod
+    def write_patched_iso(cls, opened_zipfile: zipfile.ZipFile, gcm, source_iso, dest_iso, hips: dict[str, bytes]):
+        """
+        Write the patched game with the edited HIPs.
+        If they fit over the original ones the source is cloned and only the changed bytes are written,
+        otherwise the disc is rebuilt.
+        """
+        from .Delta import clone_with_changes
+        changes = cls.get_in_place_hip_changes(gcm, source_iso, hips) if hips else []
+        if changes is None:
+            cls.export_iso_with_hips(gcm, hips, dest_iso)
+            cls.apply_binary_changes(opened_zipfile, dest_iso)
+            return
+        cls.logger.info('--writing changes--')
+        clone_with_changes(source_iso, dest_iso, changes + cls.get_binary_changes(opened_zipfile))
+        cls.logger.info('--writing changes done--')
+
+    @classmethod
+    def export_iso_with_hips(cls, gcm, hips: dict[str, bytes], dest_iso):
+        gcm.changed_files.clear()
+        for name, data in hips.items():
+            gcm.changed_files[cls.get_hip_path(gcm, name)] = BytesIO(data)
+        cls.export_iso(gcm, dest_iso)
+
+    @classmethod
+    def export_iso(cls, gcm, dest_iso):
+        # repack ISO (as gcm for better distinction)
+        # only the changed HIPs come from memory, everything else is copied straight from the source ISO
+        cls.logger.info('--repacking--')
+        generator = gcm.export_disc_to_iso_with_changed_files(dest_iso)
+        while True:
+            file_path, files_done = next(generator)
+            # cls.logger.debug((file_path, files_done))
+            if files_done == -1:
+                break
+        cls.logger.info('--repacking done--')
+
+    @classmethod
+    def edit_hips(cls, gcm, source_iso, edits: list[tuple[str, Any]], processes: Optional[int] = None,
+                  keep_workers: Optional[bool] = None) -> list[bytes]:
+        """
+        The edited HIP for every (name, edit parameters), taken from the cache where possible.
+        Identical edits are only made once. The worker settings default to the host settings.
+        """
+        # only needed for patching, don't load them with the world
+        from .PatchCache import PatchCache, file_md5, get_world_version, make_key
+        from .HipEditor import HipEditor
+        from .PatchWorker import checkout_patch_workers, edit_in_parallel, return_patch_workers
+        options = get_settings().bfbb_options
+        processes = max(1, options.patch_processes if processes is None else processes)
+        keep_workers = options.patch_worker if keep_workers is None else keep_workers
+        edit_ids = [json.dumps([name, params]) for name, params in edits]
+        unique_edits = dict(zip(edit_ids, edits))
+        cache = PatchCache() if options.hip_cache else None
+        keys = {}
+        if cache is not None:
+            rom_md5 = file_md5(source_iso)
+            world_version = get_world_version()
+            keys = {edit_id: make_key(rom_md5, world_version, name, params)
+                    for edit_id, (name, params) in unique_edits.items()}
+        results: dict[str, bytes] = {}
+        to_edit = {}
+        for edit_id, (name, params) in unique_edits.items():
+            data = cache.get(keys[edit_id]) if cache is not None else None
+            if data is None:
+                to_edit[edit_id] = (name, params)
+            else:
+                results[edit_id] = data
+        cls.logger.info(f'--{len(results)} of {len(unique_edits)} changed HIPs found in cache--')
+        if to_edit:
+            cls.logger.info('--making changes--')
+            lib_path = cls.prepare_industrial_park()
+            if processes > 1 or keep_workers:
+                # every worker process has its own IP archive editor
+                workers = checkout_patch_workers(min(processes, len(to_edit)), lib_path)
+                try:
+                    edited = edit_in_parallel(workers, {edit_id: (name, params, cls.read_hip(gcm, name))
+                                                        for edit_id, (name, params) in to_edit.items()})
+                finally:
+                    # kept workers stay up for the next patch
+                    return_patch_workers(workers, keep_workers)
+            else:
+                editor = HipEditor(lib_path)
+                try:
+                    edited = {edit_id: editor.edit(name, params, cls.read_hip(gcm, name))
+                              for edit_id, (name, params) in to_edit.items()}
+                finally:
+                    editor.close()
+            for edit_id, data in edited.items():
+                results[edit_id] = data
+                if cache is not None:
+                    cache.put(keys[edit_id], data)
+            cls.logger.info('--done making changes--')
+        return [results[edit_id] for edit_id in edit_ids]
+
+    @classmethod
+    def prepare_industrial_park(cls) -> str:
+        """Make sure IP and its editor files are on disk, returns the folder containing IP."""
         # extract dependencies need to patch with IP
         worlds_folder = 'custom_worlds' if 'custom_worlds' in __file__ else 'worlds'
         world_path = os.path.join(__file__[:__file__.find(worlds_folder) + len(worlds_folder)], 'bfbb.apworld')
@@ -122,338 +267,44 @@ class BfBBContainer(APPlayerContainer):
                         except:
                             cls.logger.warning(f"warning: couldn't overwrite dependency: {file}")
             lib_path = lib_path + 'bfbb/inc/'
-        # print(sys.path)
-        cls.logger.debug('--before pythonnet.load--')
-        extraction_temp_dir = tempfile.TemporaryDirectory()
-        try:
-            # setup pythonnet
-            from pythonnet import load, set_runtime, get_runtime_info
-            set_runtime('netfx')
-            cls.logger.debug(f"runtime info: {get_runtime_info()}")
-            load()
-            import clr
-            from System import Environment
-            from System.Runtime.InteropServices  import RuntimeInformation
-            from System.Reflection import Assembly
-
-            # some version logging
-            clr_version = Assembly.Load("System.Runtime").GetName().Version
-            cls.logger.debug(f"CLR Version: {clr_version}")
-            cls.logger.debug(f"Environment.Version: {Environment.Version}")
-            cls.logger.debug(f"RuntimeInformation.FrameworkDescription: {RuntimeInformation.FrameworkDescription}")
-            # extract ISO content
-            extraction_path = extraction_temp_dir.name
-            gcm = GCM(source_iso)
-            gcm.read_entire_disc()
-            generator = gcm.export_disc_to_folder_with_changed_files(output_folder_path=extraction_path,
-                                                                     only_changed_files=False)
-            cls.logger.info('--extracting--')
-            while True:
-                file_path, files_done = next(generator)
-                # cls.logger.debug((file_path, files_done))
-                if files_done == -1:
-                    break
-            cls.logger.info('--extraction done--')
-            cls.logger.info('--making changes--')
-            # load and setup IP libs
-            clr.AddReference(os.path.abspath(lib_path + '/IP/IndustrialPark.dll'))
-            clr.AddReference(os.path.abspath(lib_path + '/IP/HipHopFile.dll'))
-            clr.AddReference(os.path.abspath(lib_path + '/IP/Randomizer.dll'))
-            from HipHopFile import Platform, Game
-            from IndustrialPark import ArchiveEditorFunctions, Link, HexUIntTypeConverter, AutomaticUpdater
-            from IndustrialPark.Randomizer import RandomizableArchive
-
-            if not os.path.exists(f'{lib_path}/IP/Resources/IndustrialPark-EditorFiles/IndustrialPark-EditorFiles-master/'):
-                import requests
-                import io
-                editor_files_url = "https://github.com/igorseabra4/IndustrialPark-EditorFiles/archive/66a918fe76dbc7f7a39d39aa1f9991587d8f0bde.zip"
-                response = requests.get(editor_files_url)
-                # Check if the request was successful
-                if response.status_code == 200:
-                    # Read the content of the response
-                    assert hashlib.sha256(response.content).hexdigest() == "3ac4f52d9361195482d361b53b3893eb7dd460198118d00a776a5af2130bbec0", "failed to download editor-files: doesn't match expected hash"
-                    zip_content = io.BytesIO(response.content)
-
-                    # Open the zip file
-                    with zipfile.ZipFile(zip_content, 'r') as zip_ref:
-                        # Extract all files to a directory (change the path accordingly)
-                        zip_ref.extractall(f'{lib_path}/IP/Resources/IndustrialPark-EditorFiles/')
-                    os.rename(f'{lib_path}/IP/Resources/IndustrialPark-EditorFiles/IndustrialPark-EditorFiles-66a918fe76dbc7f7a39d39aa1f9991587d8f0bde',f'{lib_path}/IP/Resources/IndustrialPark-EditorFiles/IndustrialPark-EditorFiles-master')
-
-                    cls.logger.info("File successfully downloaded and extracted editor files.")
-                else:
-                    cls.logger.warning("Failed to download editor file.")
-
-            class EventIDs(Enum):
-                Increment = 0x000B
-                Decrement = 0x000C
-                GivePowerUp = 0x0101
-                GiveCollectables = 0x01C2
-
-            class LinkData:
-                event = 0
-                target = 0
-
-                def __init__(self, event: EventIDs, target):
-                    self.event = event.value
-                    self.target = target
-
-                def compare(self, link: Link):
-                    return link.EventSendID == self.event and link.TargetAsset.op_Implicit(link.TargetAsset) == self.target
-
-            files_to_check_lvl_items = {
-                'jf04': {
-                    # CUTSCENE_KJ_END
-                    0xbd99ade0: [
-                        LinkData(EventIDs.GiveCollectables, 0xBD7097e3)
-                    ]
-                },
-                'gl01': {
-                    # BALLOON_A_PLAT
-                    0x3db4fe59: [
-                        LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
-                        LinkData(EventIDs.Decrement, 0xa6662680),
-                    ],
-                    # BALLOON_B_PLAT
-                    0x393949cc: [
-                        LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
-                        LinkData(EventIDs.Decrement, 0xa6662680),
-                    ],
-                    # BALLOON_C_PLAT
-                    0x34bd953f: [
-                        LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
-                        LinkData(EventIDs.Decrement, 0xa6662680),
-                    ],
-                    # BALLOON_D_PLAT
-                    0x3041e0b2: [
-                        LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
-                        LinkData(EventIDs.Decrement, 0xa6662680),
-                    ],
-                    # BALLOON_E_PLAT
-                    0x2bc62c25: [
-                        LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
-                        LinkData(EventIDs.Decrement, 0xa6662680),
-                    ],
-                    # BALLOON_A_COUNT_DISP
-                    0x078dc464: [
-                        LinkData(EventIDs.Decrement, 0xa6662680),
-                    ],
-                    # BALLOON_B_COUNT_DISP
-                    0xa65659df: [
-                        LinkData(EventIDs.Decrement, 0xa6662680),
-                    ],
-                    # BALLOON_C_COUNT_DISP
-                    0x451eef5a: [
-                        LinkData(EventIDs.Decrement, 0xa6662680),
-                    ],
-                    # BALLOON_D_COUNT_DISP
-                    0xe3e784d5: [
-                        LinkData(EventIDs.Decrement, 0xa6662680),
-                    ],
-                    # BALLOON_E_COUNT_DISP
-                    0x82b01a50: [
-                        LinkData(EventIDs.Decrement, 0xa6662680),
-                    ],
-                },
-                'bc02': {
-                    0x5e64831b: [
-                        LinkData(EventIDs.GiveCollectables, 0xBD7097e3)
-                    ],
-                    0x5e64831c: [
-                        LinkData(EventIDs.GiveCollectables, 0xBD7097e3)
-                    ]
-                },
-                'bc03': {
-                    0x91f2a6cf: [
-                        LinkData(EventIDs.GiveCollectables, 0xBD7097e3)
-                    ],
-                },
-                'bc04': {
-                    0xc1841225: [
-                        LinkData(EventIDs.GiveCollectables, 0xBD7097e3)
-                    ],
-                },
-                'sm03': {
-                    0xd4d3bec2: [
-                        LinkData(EventIDs.Decrement, 0xc4e703d6)
-                    ],
-                    0xd4d3bec3: [
-                        LinkData(EventIDs.Decrement, 0xc4e703d6)
-                    ],
-                    0xd4d3bec4: [
-                        LinkData(EventIDs.Decrement, 0xc4e703d6)
-                    ],
-                    0xd4d3bec5: [
-                        LinkData(EventIDs.Decrement, 0xc4e703d6)
-                    ],
-                    0xd4d3bec6: [
-                        LinkData(EventIDs.Decrement, 0xc4e703d6)
-                    ],
-                    0xd4d3bec7: [
-                        LinkData(EventIDs.Decrement, 0xc4e703d6)
-                    ],
-                    0xd4d3bec8: [
-                        LinkData(EventIDs.Decrement, 0xc4e703d6)
-                    ],
-                    0xd4d3bec9: [
-                        LinkData(EventIDs.Decrement, 0xc4e703d6)
-                    ],
-                },
-                'kf01': {
-                    0x153CCF73: [
-                        LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
-                    ],
-                    0x153CCF74: [
-                        LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
-                    ],
-                    0x153CCF75: [
-                        LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
-                    ],
-                },
-                'kf02': {
-                    0x9c2d8bb3: [
-                        LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
-                    ],
-                    0x9c2d8bb4: [
-                        LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
-                    ],
-                },
-                'kf04': {
-                    0x609203fd: [
-                        LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
-                    ],
-                    0x96017696: [
-                        LinkData(EventIDs.Increment, 0xed81694f)
-                    ],
-                    0x96017697: [
-                        LinkData(EventIDs.Increment, 0xed81694f)
-                    ],
-                    0x96017698: [
-                        LinkData(EventIDs.Increment, 0xed81694f)
-                    ],
-                    0x96017699: [
-                        LinkData(EventIDs.Increment, 0xed81694f)
-                    ],
-                    0x9601769a: [
-                        LinkData(EventIDs.Increment, 0xed81694f)
-                    ],
-                    0x9601769b: [
-                        LinkData(EventIDs.Increment, 0xed81694f)
-                    ],
-                },
-                'gy03': {
-                    0x1344a38c: [
-                        LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
-                        LinkData(EventIDs.Decrement, 0x9a101de7),
-                    ],
-                    0x1344a38d: [
-                        LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
-                        LinkData(EventIDs.Decrement, 0x9a101de7),
-                    ],
-                    0x1344a38e: [
-                        LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
-                        LinkData(EventIDs.Decrement, 0x9a101de7),
-                    ],
-                    0x1344a38f: [
-                        LinkData(EventIDs.GiveCollectables, 0xBD7097e3),
-                        LinkData(EventIDs.Decrement, 0x9a101de7),
-                    ],
-                    0x46d4fa25: [
-                        LinkData(EventIDs.Decrement, 0x9a101de7),
-                    ],
-                    0x46d4fa26: [
-                        LinkData(EventIDs.Decrement, 0x9a101de7),
-                    ],
-                    0x46d4fa27: [
-                        LinkData(EventIDs.Decrement, 0x9a101de7),
-                    ],
-                    0x46d4fa28: [
-                        LinkData(EventIDs.Decrement, 0x9a101de7),
-                    ],
-                },
-            }
-            files_to_check_skills = {
-                'b101': {
-                    0xcc4ea457: [
-                        LinkData(EventIDs.GivePowerUp, 0xBD7097e3)
-                    ]
-                },
-                'b201': {
-                    0xeb3aada0: [
-                        LinkData(EventIDs.GivePowerUp, 0x00002abb)
-                    ]
-                },
-            }
-            files_to_check: dict[str, dict[int, list[LinkData]]] = {}
-            if include_skills:
-                files_to_check.update(files_to_check_skills)
-            if include_level_items:
-                files_to_check.update(files_to_check_lvl_items)
-            HexUIntTypeConverter.Legacy = True
-            editor_funcs = RandomizableArchive()
-            editor_funcs.SkipTextureDisplay = True
-            editor_funcs.Platform = Platform.GameCube
-            editor_funcs.Game = Game.BFBB
-            editor_funcs.standalone = True
-            editor_funcs.NoLayers = True
-            editor_funcs.editorFilesFolder = f'{lib_path}/IP/Resources/IndustrialPark-EditorFiles/IndustrialPark-EditorFiles-master/'
-            # make changes with IP
-            for name, assets_to_check in files_to_check.items():
-                editor_funcs.OpenFile(extraction_path + f'/files/{name[:-2]}/{name}.HIP', False, Platform.Unknown)
-                for id, links_to_check in assets_to_check.items():
-                    assert id in editor_funcs.assetDictionary, f"{id} is not a valid id in {name}.HIP"
-                    links = editor_funcs.assetDictionary[id].Links
-                    links_to_remove = []
-                    for data in links_to_check:
-                        found = False
-                        for link in links:
-                            if data.compare(link):
-                                # cls.logger.debug(f"removing link {link.ToString()} from 0x{id:x} in {name}.HIP")
-                                links_to_remove.append(link)
-                                found = True
-                        if not found:
-                            assert False, f"link not found {data.event} => 0x{data.target:x} on 0x{id:x} in {name}.HIP"
-                    editor_funcs.assetDictionary[id].Links = [link for link in links if link not in links_to_remove]
-                editor_funcs.Save()
-
-            if randomize_gate_cost > 0:
-                editor_funcs.OpenFile(extraction_path + f'/files/hb/hb01.HIP', False, Platform.Unknown)
-                if editor_funcs.ShuffleSpatulaGatesHB01(gate_costs[ConnectionNames.hub1_bb01],
-                                                        gate_costs[ConnectionNames.hub1_gl01],
-                                                        gate_costs[ConnectionNames.hub1_b1],
-                                                        gate_costs[ConnectionNames.hub2_rb01],
-                                                        gate_costs[ConnectionNames.hub2_sm01],
-                                                        gate_costs[ConnectionNames.hub2_b2],
-                                                        gate_costs[ConnectionNames.hub3_kf01],
-                                                        gate_costs[ConnectionNames.hub3_gy01]):
-                    editor_funcs.ImportNumbers()
-                editor_funcs.Save()
-            editor_funcs.OpenFile(extraction_path + f'/files/hb/hb08.HIP', False, Platform.Unknown)
-            if editor_funcs.ShuffleSpatulaGatesHB08(gate_costs[ConnectionNames.cb_b3]):
-                editor_funcs.ImportNumbers()
-            editor_funcs.Save()
-            cls.logger.info('--done making changes--')
-            # repack ISO (as gcm for better distinction)
-            cls.logger.info('--repacking--')
-            num = gcm.import_all_files_from_disk(input_directory=extraction_path)
-            generator = gcm.export_disc_to_iso_with_changed_files(dest_iso)
-            while True:
-                file_path, files_done = next(generator)
-                # cls.logger.debug((file_path, files_done))
-                if files_done == -1:
-                    break
-            cls.logger.info('--repacking done--')
-        finally:
-            try:
-                # clean up
-                extraction_temp_dir.cleanup()
-            except Exception:
-                cls.logger.warning("Couldn't clean up temp folder")
+        if not os.path.exists(f'{lib_path}/IP/Resources/IndustrialPark-EditorFiles/IndustrialPark-EditorFiles-master/'):
+            import requests
+            import io
+            editor_files_url = "https://github.com/igorseabra4/IndustrialPark-EditorFiles/archive/66a918fe76dbc7f7a39d39aa1f9991587d8f0bde.zip"
+            response = requests.get(editor_files_url)
+            # Check if the request was successful
+            if response.status_code == 200:
+                # Read the content of the response
+                assert hashlib.sha256(response.content).hexdigest() == "3ac4f52d9361195482d361b53b3893eb7dd460198118d00a776a5af2130bbec0", "failed to download editor-files: doesn't match expected hash"
+                zip_content = io.BytesIO(response.content)
+
+                # Open the zip file
+                with zipfile.ZipFile(zip_content, 'r') as zip_ref:
+                    # Extract all files to a directory (change the path accordingly)
+                    zip_ref.extractall(f'{lib_path}/IP/Resources/IndustrialPark-EditorFiles/')
+                os.rename(f'{lib_path}/IP/Resources/IndustrialPark-EditorFiles/IndustrialPark-EditorFiles-66a918fe76dbc7f7a39d39aa1f9991587d8f0bde',f'{lib_path}/IP/Resources/IndustrialPark-EditorFiles/IndustrialPark-EditorFiles-master')
 
+                cls.logger.info("File successfully downloaded and extracted editor files.")
+            else:
+                cls.logger.warning("Failed to download editor file.")
+        return lib_path
 
     @classmethod
-    def apply_binary_changes(cls, opened_zipfile: zipfile.ZipFile, iso):
-        cls.logger.info('--binary patching--')
+    def get_hip_path(cls, gcm, name: str) -> str:
+        """Path of a level's HIP on the disc, looked up case-insensitively like the extracted files were on Windows."""
+        hip_path = f'files/{name[:-2]}/{name}.HIP'.lower()
+        for file_path in gcm.files_by_path:
+            if file_path.lower() == hip_path:
+                return file_path
+        raise FileNotFoundError(f"{name}.HIP not found on the disc")
+
+    @classmethod
+    def read_hip(cls, gcm, name: str) -> bytes:
+        return gcm.read_file_data(cls.get_hip_path(gcm, name)).getvalue()
+
+    @classmethod
+    def get_binary_changes(cls, opened_zipfile: zipfile.ZipFile) -> list[tuple[int, bytes]]:
+        """The (ISO offset, data) writes of the DOL patches, slot name and seed hash."""
         # get slot name and seed hash
         manifest = BfBBContainer.get_json_obj(opened_zipfile, "archipelago.json")
         slot_name = manifest["player_name"]
@@ -473,25 +324,61 @@ class BfBBContainer(APPlayerContainer):
             patches += [Patches.GOLDEN_UNDERWEAR_REWARD_FIX]
         if include_level_items:
             patches += [Patches.LVL_ITEM_REWARD_FIX]
+        changes = []
+        for patch in patches:
+            for addr, val in patch.items():
+                changes.append((addr, val if isinstance(val, bytes) else val.to_bytes(0x4, "big")))
+        cls.logger.debug(f"writing slot_name {slot_name} to 0x{slot_name_offset:x} ({slot_name_bytes})")
+        changes.append((slot_name_offset, slot_name_bytes))
+        cls.logger.debug(f"writing seed_hash {seed_hash} to 0x{seed_hash_offset:x}")
+        changes.append((seed_hash_offset, seed_hash))
+        return changes
+
+    @classmethod
+    def apply_binary_changes(cls, opened_zipfile: zipfile.ZipFile, iso):
+        cls.logger.info('--binary patching--')
+        changes = cls.get_binary_changes(opened_zipfile)
         with open(iso, "rb+") as stream:
-            # write patches
-            for patch in patches:
-                cls.logger.info(f"applying patch {patches.index(patch) + 1}/{len(patches)}")
-                for addr, val in patch.items():
-                    stream.seek(addr, 0)
-                    if isinstance(val, bytes):
-                        stream.write(val)
-                    else:
-                        stream.write(val.to_bytes(0x4, "big"))
-            # write slot name
-            cls.logger.debug(f"writing slot_name {slot_name} to 0x{slot_name_offset:x} ({slot_name_bytes})")
-            stream.seek(slot_name_offset, 0)
-            stream.write(slot_name_bytes)
-            cls.logger.debug(f"writing seed_hash {seed_hash} to 0x{seed_hash_offset:x}")
-            stream.seek(seed_hash_offset, 0)
-            stream.write(seed_hash)
+            for addr, data in changes:
+                stream.seek(addr, 0)
+                stream.write(data)
         cls.logger.info('--binary patching done--')
 
+    @classmethod
+    def get_in_place_hip_changes(cls, gcm, source_iso, hips: dict[str, bytes]) -> Optional[list[tuple[int, bytes]]]:
+        """
+        The (ISO offset, data) writes putting the edited HIPs over the original ones and fixing their sizes in the FST.
+        None if a HIP got bigger than the original, then the disc has to be rebuilt.
+        """
+        changes = []
+        sizes = {}
+        for name, data in hips.items():
+            file_entry = gcm.files_by_path[cls.get_hip_path(gcm, name)]
+            if len(data) > file_entry.file_size:
+                cls.logger.info(f"{name}.HIP grew by {len(data) - file_entry.file_size} bytes, can't patch in place")
+                return None
+            changes.append((file_entry.file_data_offset, data))
+            sizes[file_entry.file_data_offset] = len(data)
+        with open(source_iso, "rb") as stream:
+            stream.seek(0x424)
+            fst_offset = int.from_bytes(stream.read(0x4), "big")
+            stream.seek(fst_offset)
+            # the root entry holds the number of entries, every entry is (flags + name offset, data offset, size)
+            root = stream.read(0xC)
+            fst = root + stream.read((int.from_bytes(root[0x8:0xC], "big") - 1) * 0xC)
+        for entry in range(len(fst) // 0xC):
+            entry_offset = entry * 0xC
+            # skip directories
+            if fst[entry_offset] != 0:
+                continue
+            data_offset = int.from_bytes(fst[entry_offset + 0x4:entry_offset + 0x8], "big")
+            if data_offset in sizes:
+                changes.append((fst_offset + entry_offset + 0x8, sizes.pop(data_offset).to_bytes(0x4, "big")))
+        if sizes:
+            # writing the data without its size would make a broken disc
+            raise ValueError(f"changed HIPs at {', '.join(f'0x{offset:x}' for offset in sizes)} missing in the FST")
+        return changes
+
     @classmethod
     def get_rom_path(cls) -> str:
         return get_base_rom_path()
@@ -518,9 +405,6 @@ def get_base_rom_path() -> str:
 
 
 def validate_hash(file_name: str = ""):
+    from .PatchCache import file_md5
     file_name = get_base_rom_path()
-    with open(file_name, "rb") as file:
-        base_rom_bytes = file.read()
-    basemd5 = hashlib.md5()
-    basemd5.update(base_rom_bytes)
-    return BFBB_HASH == basemd5.hexdigest()
+    return BFBB_HASH == file_md5(file_name)
@@ -1,5 +1,5 @@
 import typing
-from typing import Dict, List
+from typing import Callable, Dict, List, NamedTuple, Tuple, Union
 
 from BaseClasses import MultiWorld, CollectionState, Entrance
 from worlds.generic.Rules import set_rule, add_rule
@@ -22,41 +22,122 @@ so_values = {
     ItemNames.so_1000: 1000,
 }
 
+# counters kept in state.prog_items by BattleForBikiniBottom.collect/remove
+# summed value of the collected shiny object items
+SO_VALUE = "Shiny Object Value"
+# set once shiny objects can be farmed, only reset on remove since collecting more can't make it unreachable again
+SO_FARMABLE = "Shiny Objects Farmable"
+
+
 def has_so_amount(state: CollectionState, player: int, amount: int):
     return get_so_amount(state, player) >= amount
 
 def get_so_amount(state: CollectionState, player: int):
+    prog_items = state.prog_items[player]
+    if prog_items[SO_FARMABLE]:
+        return 999999
     if can_farm_so(state, player):
+        prog_items[SO_FARMABLE] = 1
         # ToDo: maybe return some lower number?
         return 999999
-    return sum(state.count(item_name, player) * amount for item_name, amount in so_values.items())
+    return prog_items[SO_VALUE]
+
+
+def _count_so(state: CollectionState, player: int):
+    return state.prog_items[player][SO_VALUE]
+
+
+# rule requirements, turned into access rules by _RuleCompiler once the options are known
+class Has(NamedTuple):
+    item: str
+    # either a fixed count or a function of the options
+    count: Union[int, Callable[[BfBBOptions], int]] = 1
+
+
+class HasAny(NamedTuple):
+    items: Tuple[str, ...]
+
+
+class HasAll(NamedTuple):
+    items: Tuple[str, ...]
+
+
+class HasSOAmount(NamedTuple):
+    amount: float
+
+
+Requirement = Union[Has, HasAny, HasAll, HasSOAmount]
+
+
+def _at_most_required_spats(count: int) -> Callable[[BfBBOptions], int]:
+    return lambda options: min(count, options.required_spatulas.value)
+
+
+class _RuleCompiler:
+    """
+    Turns requirements into access rules for one player.
+    Option values are resolved here, so rules only look at the state, and equal requirements share one rule.
+    """
+
+    def __init__(self, player: int, options: BfBBOptions):
+        self.player = player
+        self.options = options
+        self.rules: Dict[Requirement, Callable[[CollectionState], bool]] = {}
+
+    def compile(self, requirement: Requirement) -> Callable[[CollectionState], bool]:
+        if isinstance(requirement, Has) and callable(requirement.count):
+            requirement = Has(requirement.item, requirement.count(self.options))
+        if requirement not in self.rules:
+            self.rules[requirement] = self._compile(requirement)
+        return self.rules[requirement]
+
+    def _compile(self, requirement: Requirement) -> Callable[[CollectionState], bool]:
+        player = self.player
+        if isinstance(requirement, Has):
+            item, count = requirement
+            if count == 1:
+                return lambda state: state.has(item, player)
+            return lambda state: state.has(item, player, count)
+        if isinstance(requirement, HasAny):
+            items = requirement.items
+            return lambda state: state.has_any(items, player)
+        if isinstance(requirement, HasAll):
+            items = requirement.items
+            return lambda state: state.has_all(items, player)
+        if isinstance(requirement, HasSOAmount):
+            amount = requirement.amount
+            if self.options.death_link:
+                # farming is never in logic with death link, skip can_farm_so
+                return lambda state: _count_so(state, player) >= amount
+            return lambda state: has_so_amount(state, player, amount)
+        raise ValueError(f"Unknown rule requirement {requirement}")
 
 
 spat_rules = [
     # connections
     {
-        ConnectionNames.pineapple_hub1: lambda player: lambda state: state.has(ItemNames.spat, player, 1),
-        # ConnectionNames.hub1_bb01: lambda player: lambda state: state.has(ItemNames.spat, player, 5),
-        # ConnectionNames.hub1_gl01: lambda player: lambda state: state.has(ItemNames.spat, player, 10),
-        # ConnectionNames.hub1_b1: lambda player: lambda state: state.has(ItemNames.spat, player, 15),
-        # ConnectionNames.hub2_rb01: lambda player: lambda state: state.has(ItemNames.spat, player, 25),
-        # ConnectionNames.hub2_sm01: lambda player: lambda state: state.has(ItemNames.spat, player, 30),
-        # ConnectionNames.hub2_b2: lambda player: lambda state: state.has(ItemNames.spat, player, 40),
-        # ConnectionNames.hub3_kf01: lambda player: lambda state: state.has(ItemNames.spat, player, 50),
-        # ConnectionNames.hub3_gy01: lambda player: lambda state: state.has(ItemNames.spat, player, 60),
-        # ConnectionNames.cb_b3: lambda player: lambda state: state.has(ItemNames.spat, player, 75),
+        ConnectionNames.pineapple_hub1: Has(ItemNames.spat, 1),
+        # ConnectionNames.hub1_bb01: Has(ItemNames.spat, 5),
+        # ConnectionNames.hub1_gl01: Has(ItemNames.spat, 10),
+        # ConnectionNames.hub1_b1: Has(ItemNames.spat, 15),
+        # ConnectionNames.hub2_rb01: Has(ItemNames.spat, 25),
+        # ConnectionNames.hub2_sm01: Has(ItemNames.spat, 30),
+        # ConnectionNames.hub2_b2: Has(ItemNames.spat, 40),
+        # ConnectionNames.hub3_kf01: Has(ItemNames.spat, 50),
+        # ConnectionNames.hub3_gy01: Has(ItemNames.spat, 60),
+        # ConnectionNames.cb_b3: Has(ItemNames.spat, 75),
     },
     # locations
     {
         ItemNames.spat: {
-            LocationNames.spat_ks_01: lambda player: lambda state: state.has(ItemNames.spat, player, min(5, state.multiworld.worlds[player].options.required_spatulas.value)),
-            LocationNames.spat_ks_02: lambda player: lambda state: state.has(ItemNames.spat, player, min(10, state.multiworld.worlds[player].options.required_spatulas.value)),
-            LocationNames.spat_ks_03: lambda player: lambda state: state.has(ItemNames.spat, player, min(15, state.multiworld.worlds[player].options.required_spatulas.value)),
-            LocationNames.spat_ks_04: lambda player: lambda state: state.has(ItemNames.spat, player, min(20, state.multiworld.worlds[player].options.required_spatulas.value)),
-            LocationNames.spat_ks_05: lambda player: lambda state: state.has(ItemNames.spat, player, min(25, state.multiworld.worlds[player].options.required_spatulas.value)),
-            LocationNames.spat_ks_06: lambda player: lambda state: state.has(ItemNames.spat, player, min(30, state.multiworld.worlds[player].options.required_spatulas.value)),
-            LocationNames.spat_ks_07: lambda player: lambda state: state.has(ItemNames.spat, player, min(35, state.multiworld.worlds[player].options.required_spatulas.value)),
-            LocationNames.spat_ks_08: lambda player: lambda state: state.has(ItemNames.spat, player, min(40, state.multiworld.worlds[player].options.required_spatulas.value)),
+            LocationNames.spat_ks_01: Has(ItemNames.spat, _at_most_required_spats(5)),
+            LocationNames.spat_ks_02: Has(ItemNames.spat, _at_most_required_spats(10)),
+            LocationNames.spat_ks_03: Has(ItemNames.spat, _at_most_required_spats(15)),
+            LocationNames.spat_ks_04: Has(ItemNames.spat, _at_most_required_spats(20)),
+            LocationNames.spat_ks_05: Has(ItemNames.spat, _at_most_required_spats(25)),
+            LocationNames.spat_ks_06: Has(ItemNames.spat, _at_most_required_spats(30)),
+            LocationNames.spat_ks_07: Has(ItemNames.spat, _at_most_required_spats(35)),
+            LocationNames.spat_ks_08: Has(ItemNames.spat, _at_most_required_spats(40)),
         }
     }
 ]
@@ -66,14 +147,14 @@ sock_rules = [
     # locations
     {
         ItemNames.spat: {
-            LocationNames.spat_ps_01: lambda player: lambda state: state.has(ItemNames.sock, player, 10),
-            LocationNames.spat_ps_02: lambda player: lambda state: state.has(ItemNames.sock, player, 20),
-            LocationNames.spat_ps_03: lambda player: lambda state: state.has(ItemNames.sock, player, 30),
-            LocationNames.spat_ps_04: lambda player: lambda state: state.has(ItemNames.sock, player, 40),
-            LocationNames.spat_ps_05: lambda player: lambda state: state.has(ItemNames.sock, player, 50),
-            LocationNames.spat_ps_06: lambda player: lambda state: state.has(ItemNames.sock, player, 60),
-            LocationNames.spat_ps_07: lambda player: lambda state: state.has(ItemNames.sock, player, 70),
-            LocationNames.spat_ps_08: lambda player: lambda state: state.has(ItemNames.sock, player, 80),
+            LocationNames.spat_ps_01: Has(ItemNames.sock, 10),
+            LocationNames.spat_ps_02: Has(ItemNames.sock, 20),
+            LocationNames.spat_ps_03: Has(ItemNames.sock, 30),
+            LocationNames.spat_ps_04: Has(ItemNames.sock, 40),
+            LocationNames.spat_ps_05: Has(ItemNames.sock, 50),
+            LocationNames.spat_ps_06: Has(ItemNames.sock, 60),
+            LocationNames.spat_ps_07: Has(ItemNames.sock, 70),
+            LocationNames.spat_ps_08: Has(ItemNames.sock, 80),
             # ToDo: we need rules for pat spatulas for if socks are disabled
         }
     }
@@ -82,61 +163,61 @@ sock_rules = [
 skill_rules = [
     # connections
     {
-        ConnectionNames.hub2_b2: lambda player: lambda state: state.has(ItemNames.bubble_bowl, player) or state.has(ItemNames.cruise_bubble, player),
-        ConnectionNames.cb_b3: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
-        ConnectionNames.bc01_bc02: lambda player: lambda state: state.has(ItemNames.bubble_bowl, player),
-        ConnectionNames.bc02_bc03: lambda player: lambda state: state.has(ItemNames.bubble_bowl, player),
-        ConnectionNames.bc02_bc05: lambda player: lambda state: state.has(ItemNames.bubble_bowl, player),
-        ConnectionNames.kf04_kf05: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
-        ConnectionNames.kf04_kf02: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
-        ConnectionNames.kf01_kf05: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
+        ConnectionNames.hub2_b2: HasAny((ItemNames.bubble_bowl, ItemNames.cruise_bubble)),
+        ConnectionNames.cb_b3: Has(ItemNames.cruise_bubble),
+        ConnectionNames.bc01_bc02: Has(ItemNames.bubble_bowl),
+        ConnectionNames.bc02_bc03: Has(ItemNames.bubble_bowl),
+        ConnectionNames.bc02_bc05: Has(ItemNames.bubble_bowl),
+        ConnectionNames.kf04_kf05: Has(ItemNames.cruise_bubble),
+        ConnectionNames.kf04_kf02: Has(ItemNames.cruise_bubble),
+        ConnectionNames.kf01_kf05: Has(ItemNames.cruise_bubble),
     },
     # locations
     {
         ItemNames.spat: {
-            LocationNames.spat_hb_02: lambda player: lambda state: state.has(ItemNames.bubble_bowl, player) or state.has(ItemNames.cruise_bubble, player),
-            LocationNames.spat_hb_03: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
-            LocationNames.spat_bb_08: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
-            LocationNames.spat_bc_01: lambda player: lambda state: state.has(ItemNames.bubble_bowl, player),
-            LocationNames.spat_kf_02: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
-            LocationNames.spat_kf_05: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
-            LocationNames.spat_kf_06: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
-            LocationNames.spat_gy_02: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
-            LocationNames.spat_gy_03: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
-            LocationNames.spat_db_02: lambda player: lambda state: state.has(ItemNames.bubble_bowl, player),
-            LocationNames.spat_b3_02: lambda player: lambda state: state.has(ItemNames.bubble_bowl, player) and state.has(ItemNames.cruise_bubble, player),
+            LocationNames.spat_hb_02: HasAny((ItemNames.bubble_bowl, ItemNames.cruise_bubble)),
+            LocationNames.spat_hb_03: Has(ItemNames.cruise_bubble),
+            LocationNames.spat_bb_08: Has(ItemNames.cruise_bubble),
+            LocationNames.spat_bc_01: Has(ItemNames.bubble_bowl),
+            LocationNames.spat_kf_02: Has(ItemNames.cruise_bubble),
+            LocationNames.spat_kf_05: Has(ItemNames.cruise_bubble),
+            LocationNames.spat_kf_06: Has(ItemNames.cruise_bubble),
+            LocationNames.spat_gy_02: Has(ItemNames.cruise_bubble),
+            LocationNames.spat_gy_03: Has(ItemNames.cruise_bubble),
+            LocationNames.spat_db_02: Has(ItemNames.bubble_bowl),
+            LocationNames.spat_b3_02: HasAll((ItemNames.bubble_bowl, ItemNames.cruise_bubble)),
         },
         ItemNames.sock: {
-            LocationNames.sock_jf01_06: lambda player: lambda state: state.has(ItemNames.bubble_bowl, player) or state.has(ItemNames.cruise_bubble, player),
-            LocationNames.sock_jf03_02: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
-            LocationNames.sock_bb04_01: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
-            LocationNames.sock_bc01_01: lambda player: lambda state: state.has(ItemNames.bubble_bowl, player),
-            LocationNames.sock_kf01_03: lambda player: lambda state: state.has(ItemNames.bubble_bowl, player),
-            LocationNames.sock_kf04_01: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
+            LocationNames.sock_jf01_06: HasAny((ItemNames.bubble_bowl, ItemNames.cruise_bubble)),
+            LocationNames.sock_jf03_02: Has(ItemNames.cruise_bubble),
+            LocationNames.sock_bb04_01: Has(ItemNames.cruise_bubble),
+            LocationNames.sock_bc01_01: Has(ItemNames.bubble_bowl),
+            LocationNames.sock_kf01_03: Has(ItemNames.bubble_bowl),
+            LocationNames.sock_kf04_01: Has(ItemNames.cruise_bubble),
         },
         ItemNames.golden_underwear: {
-            LocationNames.golden_under_02: lambda player: lambda state: state.has(ItemNames.bubble_bowl, player) or state.has(ItemNames.cruise_bubble, player),
-            LocationNames.golden_under_03: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
+            LocationNames.golden_under_02: HasAny((ItemNames.bubble_bowl, ItemNames.cruise_bubble)),
+            LocationNames.golden_under_03: Has(ItemNames.cruise_bubble),
         },
         ItemNames.lvl_itm: {
-            LocationNames.lvl_itm_kf1_01: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
-            LocationNames.lvl_itm_kf1_02: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
-            LocationNames.lvl_itm_kf1_03: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
-            LocationNames.lvl_itm_kf1_06: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
-            LocationNames.lvl_itm_kf2_01: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
-            LocationNames.lvl_itm_kf2_02: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
-            LocationNames.lvl_itm_kf2_03: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
-            LocationNames.lvl_itm_kf2_04: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
-            LocationNames.lvl_itm_kf2_05: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
-            LocationNames.lvl_itm_kf2_06: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
+            LocationNames.lvl_itm_kf1_01: Has(ItemNames.cruise_bubble),
+            LocationNames.lvl_itm_kf1_02: Has(ItemNames.cruise_bubble),
+            LocationNames.lvl_itm_kf1_03: Has(ItemNames.cruise_bubble),
+            LocationNames.lvl_itm_kf1_06: Has(ItemNames.cruise_bubble),
+            LocationNames.lvl_itm_kf2_01: Has(ItemNames.cruise_bubble),
+            LocationNames.lvl_itm_kf2_02: Has(ItemNames.cruise_bubble),
+            LocationNames.lvl_itm_kf2_03: Has(ItemNames.cruise_bubble),
+            LocationNames.lvl_itm_kf2_04: Has(ItemNames.cruise_bubble),
+            LocationNames.lvl_itm_kf2_05: Has(ItemNames.cruise_bubble),
+            LocationNames.lvl_itm_kf2_06: Has(ItemNames.cruise_bubble),
         },
         ItemNames.so_purple: {
-            LocationNames.purple_so_bb04_01: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
-            LocationNames.purple_so_bc01_01: lambda player: lambda state: state.has(ItemNames.bubble_bowl, player) or state.has(ItemNames.cruise_bubble, player),
-            LocationNames.purple_so_bc02_01: lambda player: lambda state: state.has(ItemNames.bubble_bowl, player),
-            LocationNames.purple_so_bc02_02: lambda player: lambda state: state.has(ItemNames.bubble_bowl, player),
-            LocationNames.purple_so_kf01_01: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
-            LocationNames.purple_so_kf04_01: lambda player: lambda state: state.has(ItemNames.cruise_bubble, player),
+            LocationNames.purple_so_bb04_01: Has(ItemNames.cruise_bubble),
+            LocationNames.purple_so_bc01_01: HasAny((ItemNames.bubble_bowl, ItemNames.cruise_bubble)),
+            LocationNames.purple_so_bc02_01: Has(ItemNames.bubble_bowl),
+            LocationNames.purple_so_bc02_02: Has(ItemNames.bubble_bowl),
+            LocationNames.purple_so_kf01_01: Has(ItemNames.cruise_bubble),
+            LocationNames.purple_so_kf04_01: Has(ItemNames.cruise_bubble),
         }
     }
 ]
@@ -151,27 +232,27 @@ golden_underwear_rules = [
 lvl_itm_rules = [
     # connections
     {
-        ConnectionNames.bc02_bc05: lambda player: lambda state: state.has(ItemNames.lvl_itm_bc, player, 4),
-        ConnectionNames.gy03_gy04: lambda player: lambda state: state.has(ItemNames.lvl_itm_gy, player, 4),
+        ConnectionNames.bc02_bc05: Has(ItemNames.lvl_itm_bc, 4),
+        ConnectionNames.gy03_gy04: Has(ItemNames.lvl_itm_gy, 4),
     },
     # locations
     {
         ItemNames.spat: {
-            LocationNames.spat_jf_08: lambda player: lambda state: state.has(ItemNames.lvl_itm_jf, player),
-            LocationNames.spat_bb_01: lambda player: lambda state: state.has(ItemNames.lvl_itm_bb, player, 11),
-            LocationNames.spat_gl_03: lambda player: lambda state: state.has(ItemNames.lvl_itm_gl, player, 5),
-            LocationNames.spat_rb_03: lambda player: lambda state: state.has(ItemNames.lvl_itm_rb, player, 6),
-            LocationNames.spat_bc_03: lambda player: lambda state: state.has(ItemNames.lvl_itm_bc, player, 4),
-            LocationNames.spat_kf_02: (lambda player: lambda state: state.has(ItemNames.lvl_itm_kf1, player, 6), True),
-            LocationNames.spat_kf_06: lambda player: lambda state: state.has(ItemNames.lvl_itm_kf2, player, 6),
-            LocationNames.spat_gy_06: lambda player: lambda state: state.has(ItemNames.lvl_itm_gy, player, 4),
-            LocationNames.spat_gy_07: lambda player: lambda state: state.has(ItemNames.lvl_itm_gy, player, 4),
+            LocationNames.spat_jf_08: Has(ItemNames.lvl_itm_jf),
+            LocationNames.spat_bb_01: Has(ItemNames.lvl_itm_bb, 11),
+            LocationNames.spat_gl_03: Has(ItemNames.lvl_itm_gl, 5),
+            LocationNames.spat_rb_03: Has(ItemNames.lvl_itm_rb, 6),
+            LocationNames.spat_bc_03: Has(ItemNames.lvl_itm_bc, 4),
+            LocationNames.spat_kf_02: (Has(ItemNames.lvl_itm_kf1, 6), True),
+            LocationNames.spat_kf_06: Has(ItemNames.lvl_itm_kf2, 6),
+            LocationNames.spat_gy_06: Has(ItemNames.lvl_itm_gy, 4),
+            LocationNames.spat_gy_07: Has(ItemNames.lvl_itm_gy, 4),
         },
         ItemNames.sock: {
-            LocationNames.sock_sm03_01: lambda player: lambda state: state.has(ItemNames.lvl_itm_sm, player, 8),
+            LocationNames.sock_sm03_01: Has(ItemNames.lvl_itm_sm, 8),
         },
         ItemNames.so_purple: {
-            LocationNames.purple_so_gy03_01: lambda player: lambda state: state.has(ItemNames.lvl_itm_gy, player, 4),
+            LocationNames.purple_so_gy03_01: Has(ItemNames.lvl_itm_gy, 4),
         }
     }
 ]
@@ -182,45 +263,47 @@ so_krabs_rules = [
     # locations
     {
         ItemNames.spat: {
-            LocationNames.spat_ks_01: lambda player: lambda state: has_so_amount(state, player, 3000 / 2),
-            LocationNames.spat_ks_02: lambda player: lambda state: has_so_amount(state, player, 6500 / 2),
-            LocationNames.spat_ks_03: lambda player: lambda state: has_so_amount(state, player, 10500 / 2),
-            LocationNames.spat_ks_04: lambda player: lambda state: has_so_amount(state, player, 15000 / 2),
-            LocationNames.spat_ks_05: lambda player: lambda state: has_so_amount(state, player, 20000 / 2),
-            LocationNames.spat_ks_06: lambda player: lambda state: has_so_amount(state, player, 25500 / 2),
-            LocationNames.spat_ks_07: lambda player: lambda state: has_so_amount(state, player, 32000 / 2),
-            LocationNames.spat_ks_08: lambda player: lambda state: has_so_amount(state, player, 39500 / 2),
+            LocationNames.spat_ks_01: HasSOAmount(3000 / 2),
+            LocationNames.spat_ks_02: HasSOAmount(6500 / 2),
+            LocationNames.spat_ks_03: HasSOAmount(10500 / 2),
+            LocationNames.spat_ks_04: HasSOAmount(15000 / 2),
+            LocationNames.spat_ks_05: HasSOAmount(20000 / 2),
+            LocationNames.spat_ks_06: HasSOAmount(25500 / 2),
+            LocationNames.spat_ks_07: HasSOAmount(32000 / 2),
+            LocationNames.spat_ks_08: HasSOAmount(39500 / 2),
         }
     }
 ]
 
 
-def _add_rules(world: MultiWorld, player: int, rules: List, allowed_loc_types: List[str]):
-    for name, rule_factory in rules[0].items():
-        if type(rule_factory) == tuple and len(rule_factory) > 1 and rule_factory[1]:  # force override
-            rule_factory = rule_factory[0]
-            set_rule(world.get_entrance(name, player), rule_factory(player))
+def _is_override(requirement) -> bool:
+    return type(requirement) == tuple and len(requirement) > 1 and requirement[1]
+
+
+def _add_rules(world: MultiWorld, player: int, rules: List, allowed_loc_types: List[str], compiler: _RuleCompiler):
+    for name, requirement in rules[0].items():
+        if _is_override(requirement):  # force override
+            set_rule(world.get_entrance(name, player), compiler.compile(requirement[0]))
         else:
-            add_rule(world.get_entrance(name, player), rule_factory(player))
+            add_rule(world.get_entrance(name, player), compiler.compile(requirement))
     for loc_type, type_rules in rules[1].items():
         if loc_type not in allowed_loc_types:
             continue
-        for name, rule_factory in type_rules.items():
-            if type(rule_factory) == tuple and len(rule_factory) > 1 and rule_factory[1]:  # force override
-                rule_factory = rule_factory[0]
-                set_rule(world.get_location(name, player), rule_factory(player))
+        for name, requirement in type_rules.items():
+            if _is_override(requirement):  # force override
+                set_rule(world.get_location(name, player), compiler.compile(requirement[0]))
             else:
-                add_rule(world.get_location(name, player), rule_factory(player))
+                add_rule(world.get_location(name, player), compiler.compile(requirement))
 
 
-def _set_rules(world: MultiWorld, player: int, rules: List, allowed_loc_types: List[str]):
-    for name, rule_factory in rules[0].items():
-        set_rule(world.get_entrance(name, player), rule_factory(player))
+def _set_rules(world: MultiWorld, player: int, rules: List, allowed_loc_types: List[str], compiler: _RuleCompiler):
+    for name, requirement in rules[0].items():
+        set_rule(world.get_entrance(name, player), compiler.compile(requirement))
     for loc_type, type_rules in rules[1].items():
         if loc_type not in allowed_loc_types:
             continue
-        for name, rule_factory in type_rules.items():
-            set_rule(world.get_location(name, player), rule_factory(player))
+        for name, requirement in type_rules.items():
+            set_rule(world.get_location(name, player), compiler.compile(requirement))
 
 
 def reset_gate_rules(old_rules: Dict[Entrance, any]):
@@ -228,11 +311,13 @@ def reset_gate_rules(old_rules: Dict[Entrance, any]):
         ent.access_rule = v
 
 
-def set_gate_rules(player: int, gate_costs: Dict[Entrance, int]):
+def set_gate_rules(player: int, gate_costs: Dict[Entrance, int], compiler: typing.Optional[_RuleCompiler] = None):
+    # gate costs are fixed counts, they don't need the options
+    compiler = compiler or _RuleCompiler(player, None)
     old_rules = {}
     for ent, v in gate_costs.items():
         old_rules[ent] = ent.access_rule
-        add_rule(ent, (lambda val=v: lambda state: state.has(ItemNames.spat, player, val))())
+        add_rule(ent, compiler.compile(Has(ItemNames.spat, v)))
     return old_rules
 
 
@@ -249,18 +334,19 @@ def set_rules(world: MultiWorld, options: BfBBOptions, player: int, gate_costs:
     if options.include_purple_so.value:
         allowed_loc_types += [ItemNames.so_purple]
 
-    _add_rules(world, player, spat_rules, allowed_loc_types)
+    compiler = _RuleCompiler(player, options)
+    _add_rules(world, player, spat_rules, allowed_loc_types, compiler)
     if options.include_socks.value:
-        _add_rules(world, player, sock_rules, allowed_loc_types)
+        _add_rules(world, player, sock_rules, allowed_loc_types, compiler)
     if options.include_skills.value:
-        _add_rules(world, player, skill_rules, allowed_loc_types)
+        _add_rules(world, player, skill_rules, allowed_loc_types, compiler)
     if options.include_golden_underwear.value:
-        _add_rules(world, player, golden_underwear_rules, allowed_loc_types)
+        _add_rules(world, player, golden_underwear_rules, allowed_loc_types, compiler)
     if options.include_level_items.value:
-        _add_rules(world, player, lvl_itm_rules, allowed_loc_types)
+        _add_rules(world, player, lvl_itm_rules, allowed_loc_types, compiler)
     if options.include_purple_so.value:
-        _set_rules(world, player, so_krabs_rules, allowed_loc_types)  # we override krabs requirements here
+        _set_rules(world, player, so_krabs_rules, allowed_loc_types, compiler)  # we override krabs requirements here
 
-    set_gate_rules(player, {world.get_entrance(k, player): v for k, v in gate_costs.items()})
+    set_gate_rules(player, {world.get_entrance(k, player): v for k, v in gate_costs.items()}, compiler)
 
     world.completion_condition[player] = lambda state: state.has("Victory", player)
@@ -31,6 +31,29 @@ class BattleForBikiniBottomSettings(Group):
         Set this to true to display UT Tracker and Map Page in the BfBB Client (if UT is installed)
         """
 
+    class ProfileMemory(Bool):
+        """
+        Set this to true to record every Dolphin memory access of the BfBB Client, for performance analysis only.
+        Use /perf memory in the client for a report.
+        """
+
+    class HipCache(Bool):
+        """
+        Set this to true to keep the level files changed while patching and reuse them for patches with the same settings.
+        Set this to false to always patch them with IndustrialPark.
+        """
+
+    class PatchWorker(Bool):
+        """
+        Set this to true to keep IndustrialPark loaded in separate processes after patching,
+        so patching again in the same session doesn't have to start it again.
+        """
+
+    class PatchProcesses(int):
+        """
+        Number of processes editing the level files in parallel while patching, 1 edits them one after another.
+        """
+
     class TrackerVariant(StrEnum):
         """
         overview: the tracker will only use one map to display all locations
@@ -44,4 +67,8 @@ class BattleForBikiniBottomSettings(Group):
     dolphin_path: DolphinPath = DolphinPath(None)
     rom_start: RomStart | bool = True
     use_tracker: UseTracker | bool = True
+    profile_memory: ProfileMemory | bool = False
+    hip_cache: HipCache | bool = True
+    patch_worker: PatchWorker | bool = False
+    patch_processes: PatchProcesses = PatchProcesses(1)
     tracker_variant: TrackerVariant | None = 'detailed'
\ No newline at end of file
@@ -4,19 +4,18 @@ import typing
 from typing import TextIO
 
 import settings
-from BaseClasses import Item, Tutorial, ItemClassification
+from BaseClasses import CollectionState, Item, Tutorial, ItemClassification
 from Options import Accessibility
 from worlds.AutoWorld import World, WebWorld
 from worlds.LauncherComponents import Component, components, Type, SuffixIdentifier, icon_paths
 from .Events import create_events
 from .Items import item_table, BfBBItem
-from .Locations import location_table, BfBBLocation, patrick_location_table
+from .Locations import location_table, BfBBLocation, patrick_location_table, location_name_groups
 from .Options import BfBBOptions, RandomizeGateCost
 from .Regions import create_regions
 from .Rom import BfBBContainer
-from .Rules import set_rules
+from .Rules import set_rules, so_values, SO_VALUE, SO_FARMABLE
 from .Settings import BattleForBikiniBottomSettings
-from .Tracker import tracker_world_overview, tracker_world_detailed
 from .constants import ItemNames, ConnectionNames, game_name
 
 
@@ -58,6 +57,15 @@ default_gate_costs: typing.Dict[str, int] = {
 }
 
 
+class TrackerWorld:
+    """Loads the tracker mappings the first time the Universal Tracker asks for them."""
+
+    def __get__(self, instance, owner) -> typing.Dict[str, typing.Any]:
+        from .Tracker import tracker_world_overview, tracker_world_detailed
+        tracker_variant = settings.get_settings().bfbb_options.tracker_variant or 'detailed'
+        return tracker_world_overview if tracker_variant == 'overview' else tracker_world_detailed
+
+
 class BattleForBikiniBottom(World):
     """
     SpongeBob SquarePants: Battle for Bikini Bottom
@@ -72,626 +80,11 @@ class BattleForBikiniBottom(World):
 
     item_name_to_id = {name: data.id for name, data in item_table.items()}
     location_name_to_id = location_table
-    location_name_groups = {
-      "Hub": {
-      "Hub1: On Top of the Pineapple",
-      "Hub1: Lost Sock (Patrick)",
-      "Hub1: Golden Underwear #1",
-      "Hub2: On Top of Shady Shoals",
-      "Hub2: Lost Sock (Fountain)",
-      "Hub2: Golden Underwear #2",
-      "Hub3: On Top of the Chum Bucket",
-      "Hub3: Lost Sock (Behind KK under trash)",
-      "Hub3: Golden Underwear #3",
-      "Pineapple: SpongeBob's Closet",
-      "Pineapple: Lost Sock (Library)",
-      "Squidward: Annoy Squidward",
-      "Squidward: Lost Sock (Destroy furniture)",
-      "Tree Dome: Ambush at the Tree Dome",
-      "Shoals: Lost Sock (Shoals)",
-      "Krusty Krab: Infestation at the Krusty Krab",
-      "Krusty Krab: Lost Sock (Destroy furniture)",
-      "Chum Bucket: A Wall Jump in the Bucket",
-      "Hub3: On Top of the Chum Bucket"
-      },
-      "Bosses": {
-      "JF04: King Jellyfish Jelly",
-      "Poseidome: Bubble Bowl",
-      "Poseidome: Defeat Robo-Sandy",
-      "Merm05: Defeat Prawn",
-      "IP: Cruise Bubble",
-      "IP: Defeat Robo-Patrick",
-      "GY04: Defeat the Flying Dutchman",
-      "CB Lab: KAH - RAH - TAE!",
-      "CB Lab: The Small Shall Rule... Or No"
-      },
-      "Mr. Krabs": {
-      "Hub: Pay Mr. Krabs 3000 Shiny Objects",
-      "Hub: Pay Mr. Krabs 3500 Shiny Objects",
-      "Hub: Pay Mr. Krabs 4000 Shiny Objects",
-      "Hub: Pay Mr. Krabs 4500 Shiny Objects",
-      "Hub: Pay Mr. Krabs 5000 Shiny Objects",
-      "Hub: Pay Mr. Krabs 5500 Shiny Objects",
-      "Hub: Pay Mr. Krabs 6500 Shiny Objects",
-      "Hub: Pay Mr. Krabs 7500 Shiny Objects"
-      },
-      "Patrick": {
-      "Hub1: Return 10 Socks To Patrick",
-      "Hub1: Return 20 Socks To Patrick",
-      "Hub1: Return 30 Socks To Patrick",
-      "Hub1: Return 40 Socks To Patrick",
-      "Hub1: Return 50 Socks To Patrick",
-      "Hub1: Return 60 Socks To Patrick",
-      "Hub1: Return 70 Socks To Patrick",
-      "Hub1: Return 80 Socks To Patrick"
-      },
-      "Downtown Bikini Bottom": {
-      "BB01: End of the Road",
-      "BB01: Learn Sandy's Moves",
-      "BB01: Lost Sock #1 (On broken house)",
-      "BB01: Lost Sock #2 (In broken house)",
-      "BB01: Lost Sock #3 (On floating platform)",
-      "BB01: Lost Sock #4 (On copper house)",
-      "BB01: Purple Shiny Object #1 (At fenced off glove near lighthouse)",
-      "BB01: Purple Shiny Object #2 (On platform near lighthouse)",
-      "BB01: Steering Wheel #1 (On tikis near start)",
-      "BB01: Steering Wheel #2 (On canopy)",
-      "BB01: Steering Wheel #3 (On house with cannon near rooftops exit)",
-      "BB01: Steering Wheel #4 (On crashed boat near sea needle)",
-      "BB01: Steering Wheel #5 (Above G-Love near hole)",
-      "BB01: Tikis Go Boom",
-      "BB02: Across the Rooftops",
-      "BB02: Lost Sock #1 (On windmill)",
-      "BB02: Lost Sock #2 (Under slide)",
-      "BB02: Lost Sock #3 (Behind lighthouse)",
-      "BB02: Purple Shiny Object #1 (On floating platforms)",
-      "BB02: Purple Shiny Object #2 (On top of windmill blades)",
-      "BB02: Steering Wheel #6 (On pipe near start)",
-      "BB02: Steering Wheel #7 (Under slide)",
-      "BB02: Steering Wheel #8 (On floating platforms)",
-      "BB02: Swingin' Sandy",
-      "BB03: Ambush in the Lighthouse",
-      "BB03: Lost Sock (On top)",
-      "BB03: Purple Shiny Object (In tiki stack)",
-      "BB03: Steering Wheel #9 (At bottom)",
-      "BB04: Come Back With the Cruise Bubble",
-      "BB04: Extreme Bungee",
-      "BB04: Lost Sock (South side)",
-      "BB04: Purple Shiny Object (South side)",
-      "BB04: Steering Wheel #10 (East side)",
-      "BB04: Steering Wheel #11 (North side)"
-      },
-      "BB01": {
-      "BB01: End of the Road",
-      "BB01: Learn Sandy's Moves",
-      "BB01: Lost Sock #1 (On broken house)",
-      "BB01: Lost Sock #2 (In broken house)",
-      "BB01: Lost Sock #3 (On floating platform)",
-      "BB01: Lost Sock #4 (On copper house)",
-      "BB01: Purple Shiny Object #1 (At fenced off glove near lighthouse)",
-      "BB01: Purple Shiny Object #2 (On platform near lighthouse)",
-      "BB01: Steering Wheel #1 (On tikis near start)",
-      "BB01: Steering Wheel #2 (On canopy)",
-      "BB01: Steering Wheel #3 (On house with cannon near rooftops exit)",
-      "BB01: Steering Wheel #4 (On crashed boat near sea needle)",
-      "BB01: Steering Wheel #5 (Above G-Love near hole)",
-      "BB01: Tikis Go Boom"
-      },
-      "BB02": {
-      "BB02: Across the Rooftops",
-      "BB02: Lost Sock #1 (On windmill)",
-      "BB02: Lost Sock #2 (Under slide)",
-      "BB02: Lost Sock #3 (Behind lighthouse)",
-      "BB02: Purple Shiny Object #1 (On floating platforms)",
-      "BB02: Purple Shiny Object #2 (On top of windmill blades)",
-      "BB02: Steering Wheel #6 (On pipe near start)",
-      "BB02: Steering Wheel #7 (Under slide)",
-      "BB02: Steering Wheel #8 (On floating platforms)",
-      "BB02: Swingin' Sandy"
-      },
-      "BB03": {
-      "BB03: Ambush in the Lighthouse",
-      "BB03: Lost Sock (On top)",
-      "BB03: Purple Shiny Object (In tiki stack)",
-      "BB03: Steering Wheel #9 (At bottom)",
-      },
-      "BB04": {
-      "BB04: Come Back With the Cruise Bubble",
-      "BB04: Extreme Bungee",
-      "BB04: Lost Sock (South side)",
-      "BB04: Purple Shiny Object (South side)",
-      "BB04: Steering Wheel #10 (East side)",
-      "BB04: Steering Wheel #11 (North side)"
-      },
-      "Kelp Forest": {
-      "KF01: Find All the Lost Campers",
-      "KF01: Lost Camper #1 (Near Ms Puff)",
-      "KF01: Lost Camper #2 (Near waterfall)",
-      "KF01: Lost Camper #3 (Near slide area exit)",
-      "KF01: Lost Sock #1 (On high platform near Ms. Puff)",
-      "KF01: Lost Sock #2 (At waterfall)",
-      "KF01: Lost Sock #3 (Tiki bowling)",
-      "KF01: Purple Shiny Object (Near waterfall)",
-      "KF01: Through the Woods",
-      "KF02: Down in the Swamp",
-      "KF02: Lost Camper #4",
-      "KF02: Lost Camper #5 (At gate)",
-      "KF02: Lost Sock #1 (On ledge)",
-      "KF02: Lost Sock #2 (On tiki stack)",
-      "KF02: Purple Shiny Object (Bungee near waterfall)",
-      "KF02: Tiki Roundup",
-      "KF04: Lost Camper #6 (Near exit)",
-      "KF04: Lost Sock (On ledge near entrance)",
-      "KF04: Power Crystal #1 (behind 1st gate)",
-      "KF04: Power Crystal #2 (water room top)",
-      "KF04: Power Crystal #3 (top near 3rd gate)",
-      "KF04: Power Crystal #4 (top big room)",
-      "KF04: Power Crystal #5 (top tall vine room)",
-      "KF04: Power Crystal #6 (top last room)",
-      "KF04: Power Crystal Crisis",
-      "KF04: Purple Shiny Object (Top of tall room)",
-      "KF04: Through the Kelp Caves",
-      "KF05: Beat Mermaid Man's Time",
-      "KF05: Kelp Vine Slide",
-      "KF05: Lost Sock (On slide)",
-      "KF05: Purple Shiny Object (On slide)"
-      },
-      "KF01": {
-      "KF01: Find All the Lost Campers",
-      "KF01: Lost Camper #1 (Near Ms Puff)",
-      "KF01: Lost Camper #2 (Near waterfall)",
-      "KF01: Lost Camper #3 (Near slide area exit)",
-      "KF01: Lost Sock #1 (On high platform near Ms. Puff)",
-      "KF01: Lost Sock #2 (At waterfall)",
-      "KF01: Lost Sock #3 (Tiki bowling)",
-      "KF01: Purple Shiny Object (Near waterfall)",
-      "KF01: Through the Woods"
-      },
-      "KF02": {
-      "KF02: Down in the Swamp",
-      "KF02: Lost Camper #4",
-      "KF02: Lost Camper #5 (At gate)",
-      "KF02: Lost Sock #1 (On ledge)",
-      "KF02: Lost Sock #2 (On tiki stack)",
-      "KF02: Purple Shiny Object (Bungee near waterfall)",
-      "KF02: Tiki Roundup"
-      },
-      "KF04": {
-      "KF04: Lost Camper #6 (Near exit)",
-      "KF04: Lost Sock (On ledge near entrance)",
-      "KF04: Power Crystal #1 (behind 1st gate)",
-      "KF04: Power Crystal #2 (water room top)",
-      "KF04: Power Crystal #3 (top near 3rd gate)",
-      "KF04: Power Crystal #4 (top big room)",
-      "KF04: Power Crystal #5 (top tall vine room)",
-      "KF04: Power Crystal #6 (top last room)",
-      "KF04: Power Crystal Crisis",
-      "KF04: Purple Shiny Object (Top of tall room)",
-      "KF04: Through the Kelp Caves"
-      },
-      "KF05": {
-      "KF05: Beat Mermaid Man's Time",
-      "KF05: Kelp Vine Slide",
-      "KF05: Lost Sock (On slide)",
-      "KF05: Purple Shiny Object (On slide)"
-      },
-      "Jellyfish Fields": {
-      "JF01: Cowa-Bungee!",
-      "JF01: Defeat King Jellyfish",
-      "JF01: Lost Sock #1 (On JF rock)",
-      "JF01: Lost Sock #2 (Bungee)",
-      "JF01: Lost Sock #3 (On island)",
-      "JF01: Lost Sock #4 (Fountain)",
-      "JF01: Lost Sock #5 (On goo)",
-      "JF01: Lost Sock #6 (Bowling minigame)",
-      "JF01: Purple Shiny Object (On island)",
-      "JF01: Top of the Hill",
-      "JF02: Lost Sock #1 (On slide)",
-      "JF02: Lost Sock #2 (After slide)",
-      "JF02: Lost Sock #3 (In cave near slide)",
-      "JF02: Lost Sock #4 (On goo in cave)",
-      "JF02: Patrick's Dilemma",
-      "JF02: Purple Shiny Object (On goo near exit)",
-      "JF02: Spelunking",
-      "JF03: Drain the Lake",
-      "JF03: Lost Sock #1 (On Cliff near Clamp)",
-      "JF03: Lost Sock #2 (Tiki Minigame)",
-      "JF03: Lost Sock #3 (Near wall jumps)",
-      "JF03: Navigate the Canyons and Mesas",
-      "JF03: Purple Shiny Object (On goo under bridge)",
-      "JF04: King Jellyfish Jelly",
-      "JF04: Lost Sock (On Slide after King JF)",
-      "JF04: Purple Shiny Object (On slide)",
-      "JF04: Slide Leap"
-      },
-      "JF01": {
-      "JF01: Cowa-Bungee!",
-      "JF01: Defeat King Jellyfish",
-      "JF01: Lost Sock #1 (On JF rock)",
-      "JF01: Lost Sock #2 (Bungee)",
-      "JF01: Lost Sock #3 (On island)",
-      "JF01: Lost Sock #4 (Fountain)",
-      "JF01: Lost Sock #5 (On goo)",
-      "JF01: Lost Sock #6 (Bowling minigame)",
-      "JF01: Purple Shiny Object (On island)",
-      "JF01: Top of the Hill"
-      },
-      "JF02": {
-      "JF02: Lost Sock #1 (On slide)",
-      "JF02: Lost Sock #2 (After slide)",
-      "JF02: Lost Sock #3 (In cave near slide)",
-      "JF02: Lost Sock #4 (On goo in cave)",
-      "JF02: Patrick's Dilemma",
-      "JF02: Purple Shiny Object (On goo near exit)",
-      "JF02: Spelunking"
-      },
-      "JF03": {
-      "JF03: Drain the Lake",
-      "JF03: Lost Sock #1 (On Cliff near Clamp)",
-      "JF03: Lost Sock #2 (Tiki Minigame)",
-      "JF03: Lost Sock #3 (Near wall jumps)",
-      "JF03: Navigate the Canyons and Mesas",
-      "JF03: Purple Shiny Object (On goo under bridge)"
-      },
-      "JF04": {
-      "JF04: King Jellyfish Jelly",
-      "JF04: Lost Sock (On Slide after King JF)",
-      "JF04: Purple Shiny Object (On slide)",
-      "JF04: Slide Leap"
-      },
-      "Goo Lagoon": {
-      "GL01: Balloon Kid #1 (Near Ms. Puff)",
-      "GL01: Balloon Kid #2 (On beach near moving logs)",
-      "GL01: Balloon Kid #3 (On beach near sinking logs)",
-      "GL01: Balloon Kid #4 (On Water near moving logs)",
-      "GL01: Balloon Kid #5 (On Water near sinking logs)",
-      "GL01: Connect the Towers",
-      "GL01: King of the Castle",
-      "GL01: Lost Sock #1 (On watchtower)",
-      "GL01: Lost Sock #2 (In sand castle)",
-      "GL01: Lost Sock #3 (On juice bar)",
-      "GL01: Lost Sock #4 (On top of sand castle)",
-      "GL01: Lost Sock #5 (Sand castle entrance gate)",
-      "GL01: Over the Moat",
-      "GL01: Purple Shiny Object (End of log path near Ms. Puff)",
-      "GL01: Save the Children",
-      "GL02: Lost Sock #1 (Under ledge near entrance)",
-      "GL02: Lost Sock #2 (On goo)",
-      "GL02: Lost Sock #3 (On side ledge)",
-      "GL02: Purple Shiny Object (On ledge under checkpoint)",
-      "GL02: Through the Sea Caves",
-      "GL03: Clean out the Bumper Boats",
-      "GL03: Lost Sock #1 (Tiki minigame)",
-      "GL03: Lost Sock #2 (Sliding minigame)",
-      "GL03: Lost Sock #3 (On booth)",
-      "GL03: Purple Shiny Object (On tikis after slide)",
-      "GL03: Slip and Slide Under the Pier",
-      "GL03: Tower Bungee"
-      },
-      "GL01": {
-      "GL01: Balloon Kid #1 (Near Ms. Puff)",
-      "GL01: Balloon Kid #2 (On beach near moving logs)",
-      "GL01: Balloon Kid #3 (On beach near sinking logs)",
-      "GL01: Balloon Kid #4 (On Water near moving logs)",
-      "GL01: Balloon Kid #5 (On Water near sinking logs)",
-      "GL01: Connect the Towers",
-      "GL01: King of the Castle",
-      "GL01: Lost Sock #1 (On watchtower)",
-      "GL01: Lost Sock #2 (In sand castle)",
-      "GL01: Lost Sock #3 (On juice bar)",
-      "GL01: Lost Sock #4 (On top of sand castle)",
-      "GL01: Lost Sock #5 (Sand castle entrance gate)",
-      "GL01: Over the Moat",
-      "GL01: Purple Shiny Object (End of log path near Ms. Puff)",
-      "GL01: Save the Children"
-      },
-      "GL02": {
-      "GL02: Lost Sock #1 (Under ledge near entrance)",
-      "GL02: Lost Sock #2 (On goo)",
-      "GL02: Lost Sock #3 (On side ledge)",
-      "GL02: Purple Shiny Object (On ledge under checkpoint)",
-      "GL02: Through the Sea Caves"
-      },
-      "GL03": {
-      "GL03: Clean out the Bumper Boats",
-      "GL03: Lost Sock #1 (Tiki minigame)",
-      "GL03: Lost Sock #2 (Sliding minigame)",
-      "GL03: Lost Sock #3 (On booth)",
-      "GL03: Purple Shiny Object (On tikis after slide)",
-      "GL03: Slip and Slide Under the Pier",
-      "GL03: Tower Bungee"
-      },
-      "Mermalair": {
-      "Merm01: Lost Sock (Bungee)",
-      "Merm01: Purple Shiny Object (Duplicatotron bowling)",
-      "Merm01: Top of the Entrance Area",
-      "Merm02: Lost Sock (On light)",
-      "Merm02: Purple Shiny Object #1 (In hidden cave near entrance)",
-      "Merm02: Purple Shiny Object #2 (On slide)",
-      "Merm02: Security Override Button #1 (At Computer)",
-      "Merm02: Security Override Button #2 (At Lasers)",
-      "Merm02: Shut Down the Security System",
-      "Merm02: The Funnel Machines",
-      "Merm02: The Spinning Towers of Power",
-      "Merm02: Top of the Computer Area",
-      "Merm03: Lost Sock (Conveyor clamp)",
-      "Merm03: Purple Shiny Object (Above disco floor at 2nd tunnel entrance)",
-      "Merm03: Security Override Button #3 (At Top)",
-      "Merm03: Top of the Security Tunnel",
-      "Merm04: Complete the Rolling Ball Room",
-      "Merm04: Lost Sock (Behind tilting platform near end)",
-      "Merm04: Purple Shiny Object (In ball dispenser)",
-      "Merm04: Security Override Button #4 (Next to ramp)",
-      "Merm05: Defeat Prawn"
-      },
-      "Merm01": {
-      "Merm01: Lost Sock (Bungee)",
-      "Merm01: Purple Shiny Object (Duplicatotron bowling)",
-      "Merm01: Top of the Entrance Area"
-      },
-      "Merm02": {
-      "Merm02: Lost Sock (On light)",
-      "Merm02: Purple Shiny Object #1 (In hidden cave near entrance)",
-      "Merm02: Purple Shiny Object #2 (On slide)",
-      "Merm02: Security Override Button #1 (At Computer)",
-      "Merm02: Security Override Button #2 (At Lasers)",
-      "Merm02: Shut Down the Security System",
-      "Merm02: The Funnel Machines",
-      "Merm02: The Spinning Towers of Power",
-      "Merm02: Top of the Computer Area"
-      "Merm05: Defeat Prawn"
-      },
-      "Merm03": {
-      "Merm03: Lost Sock (Conveyor clamp)",
-      "Merm03: Purple Shiny Object (Above disco floor at 2nd tunnel entrance)",
-      "Merm03: Security Override Button #3 (At Top)",
-      "Merm03: Top of the Security Tunnel"
-      },
-      "Merm04": {
-      "Merm04: Complete the Rolling Ball Room",
-      "Merm04: Lost Sock (Behind tilting platform near end)",
-      "Merm04: Purple Shiny Object (In ball dispenser)",
-      "Merm04: Security Override Button #4 (Next to ramp)"
-      },
-      "Rock Bottom": {
-      "RB01: Get to the Museum",
-      "RB01: Lost Sock #1 (On roof near elevator)",
-      "RB01: Lost Sock #2 (On rock)",
-      "RB01: Lost Sock #3 (Near slide end)",
-      "RB01: Museum Art #1 (On ledge above bubble buddy)",
-      "RB01: Museum Art #2 (Near start)",
-      "RB01: Purple Shiny Object (Under Swingalong Spatula)",
-      "RB01: Return the Museum's Art",
-      "RB01: Slip Sliding Away",
-      "RB01: Swingalong Spatula",
-      "RB02: Lost Sock #1 (Ledge near exit)",
-      "RB02: Lost Sock #2 (Midway right ledge)",
-      "RB02: Lost Sock #3 (Under entrance)",
-      "RB02: Museum Art #3 (Bottom)",
-      "RB02: Museum Art #4 (Near exit)",
-      "RB02: Plundering Robots in the Museum",
-      "RB02: Purple Shiny Object (On roof)",
-      "RB03: Across the Trench of Darkness",
-      "RB03: How in Tarnation Do You Get There?",
-      "RB03: Lasers are Fun and Good for You",
-      "RB03: Lost Sock #1 (Bungee)",
-      "RB03: Lost Sock #2 (Near Duplicatotron)",
-      "RB03: Lost Sock #3 (At button under laser)",
-      "RB03: Museum Art #5 (Behind laser)",
-      "RB03: Museum Art #6 (On Sleepy-Time platform)",
-      "RB03: Purple Shiny Object (By floating tiki near exit)"
-      },
-      "RB01": {
-      "RB01: Get to the Museum",
-      "RB01: Lost Sock #1 (On roof near elevator)",
-      "RB01: Lost Sock #2 (On rock)",
-      "RB01: Lost Sock #3 (Near slide end)",
-      "RB01: Museum Art #1 (On ledge above bubble buddy)",
-      "RB01: Museum Art #2 (Near start)",
-      "RB01: Purple Shiny Object (Under Swingalong Spatula)",
-      "RB01: Return the Museum's Art",
-      "RB01: Slip Sliding Away",
-      "RB01: Swingalong Spatula"
-      },
-      "RB02": {
-      "RB02: Lost Sock #1 (Ledge near exit)",
-      "RB02: Lost Sock #2 (Midway right ledge)",
-      "RB02: Lost Sock #3 (Under entrance)",
-      "RB02: Museum Art #3 (Bottom)",
-      "RB02: Museum Art #4 (Near exit)",
-      "RB02: Plundering Robots in the Museum",
-      "RB02: Purple Shiny Object (On roof)"
-      },
-      "RB03": {
-      "RB03: Across the Trench of Darkness",
-      "RB03: How in Tarnation Do You Get There?",
-      "RB03: Lasers are Fun and Good for You",
-      "RB03: Lost Sock #1 (Bungee)",
-      "RB03: Lost Sock #2 (Near Duplicatotron)",
-      "RB03: Lost Sock #3 (At button under laser)",
-      "RB03: Museum Art #5 (Behind laser)",
-      "RB03: Museum Art #6 (On Sleepy-Time platform)",
-      "RB03: Purple Shiny Object (By floating tiki near exit)"
-      },
-      "Sand Mountain": {
-      "SM01: Frosty Bungee",
-      "SM01: Lost Sock #1 (Below bridge)",
-      "SM01: Lost Sock #2 (Snowman)",
-      "SM01: Purple Shiny Object (On ledge near entrance)",
-      "SM01: Top of the Lodge",
-      "SM02: Beat Mrs. Puff's Time",
-      "SM02: Defeat Robots on Guppy Mound",
-      "SM02: Lost Sock #1 (Ledge near start)",
-      "SM02: Lost Sock #2 (Underpass)",
-      "SM02: Lost Sock #3 (Ledge near end)",
-      "SM02: Purple Shiny Object #1 (On slide under tikis)",
-      "SM02: Purple Shiny Object #2 (On stone arch)",
-      "SM03: Beat Bubble Buddy's Time",
-      "SM03: Defeat Robots on Flounder Hill",
-      "SM03: Lost Sock #1 (At end after destroying all Sandmans)",
-      "SM03: Lost Sock #2 (On last tunnel near end)",
-      "SM03: Sandman #1 (At Start)",
-      "SM03: Sandman #2 (Lower path after first turn)",
-      "SM03: Sandman #3 (On shortcut)",
-      "SM03: Sandman #4 (On right spiral)",
-      "SM03: Sandman #5 (On left spiral)",
-      "SM03: Sandman #6 (Middle path of 1st 3-way split near end)",
-      "SM03: Sandman #7 (Left path of 1st 3-way split near end)",
-      "SM03: Sandman #8 (On turn after cave)",
-      "SM04: Beat Larry's Time",
-      "SM04: Defeat Robots on Sand Mountain",
-      "SM04: Lost Sock #1 (Top ledge near start)",
-      "SM04: Lost Sock #2 (In hidden cave)",
-      "SM04: Lost Sock #3 (On ice platforms)",
-      "SM04: Purple Shiny Object (In cave on drop to cave exit)"
-      },
-      "SM01": {
-      "SM01: Frosty Bungee",
-      "SM01: Lost Sock #1 (Below bridge)",
-      "SM01: Lost Sock #2 (Snowman)",
-      "SM01: Purple Shiny Object (On ledge near entrance)",
-      "SM01: Top of the Lodge"
-      },
-      "SM02": {
-      "SM02: Beat Mrs. Puff's Time",
-      "SM02: Defeat Robots on Guppy Mound",
-      "SM02: Lost Sock #1 (Ledge near start)",
-      "SM02: Lost Sock #2 (Underpass)",
-      "SM02: Lost Sock #3 (Ledge near end)",
-      "SM02: Purple Shiny Object #1 (On slide under tikis)",
-      "SM02: Purple Shiny Object #2 (On stone arch)"
-      },
-      "SM03": {
-      "SM03: Beat Bubble Buddy's Time",
-      "SM03: Defeat Robots on Flounder Hill",
-      "SM03: Lost Sock #1 (At end after destroying all Sandmans)",
-      "SM03: Lost Sock #2 (On last tunnel near end)",
-      "SM03: Sandman #1 (At Start)",
-      "SM03: Sandman #2 (Lower path after first turn)",
-      "SM03: Sandman #3 (On shortcut)",
-      "SM03: Sandman #4 (On right spiral)",
-      "SM03: Sandman #5 (On left spiral)",
-      "SM03: Sandman #6 (Middle path of 1st 3-way split near end)",
-      "SM03: Sandman #7 (Left path of 1st 3-way split near end)",
-      "SM03: Sandman #8 (On turn after cave)"
-      },
-      "SM04": {
-      "SM04: Beat Larry's Time",
-      "SM04: Defeat Robots on Sand Mountain",
-      "SM04: Lost Sock #1 (Top ledge near start)",
-      "SM04: Lost Sock #2 (In hidden cave)",
-      "SM04: Lost Sock #3 (On ice platforms)",
-      "SM04: Purple Shiny Object (In cave on drop to cave exit)"
-      },
-      "Flying Dutchman's Graveyard": {
-      "GY01: A Path Through the Goo",
-      "GY01: Goo Tanker Ahoy!",
-      "GY01: Lost Sock (On mast platform in goo)",
-      "GY01: Purple Shiny Object (On left wall near tubelet)",
-      "GY01: Top of the Entrance Area",
-      "GY02: Lost Sock (In shipwreck)",
-      "GY02: Purple Shiny Object (On mast under 1st ship wall jump section)",
-      "GY02: Shipwreck Bungee",
-      "GY02: Top of the Stack of Ships",
-      "GY03: Destroy the Robot Ship",
-      "GY03: Get Aloft There, Matey!",
-      "GY03: Lost Sock (On rope on robot ship)",
-      "GY03: Purple Shiny Object (On top of mast)",
-      "GY03: Ship Cannon #1 (On deck)",
-      "GY03: Ship Cannon #2 (On middle mast)",
-      "GY03: Ship Cannon #3 (On front mast)",
-      "GY03: Ship Cannon #4 (Near steering wheel)",
-      "GY04: Defeat the Flying Dutchman"
-      },
-      "GY01": {
-      "GY01: A Path Through the Goo",
-      "GY01: Goo Tanker Ahoy!",
-      "GY01: Lost Sock (On mast platform in goo)",
-      "GY01: Purple Shiny Object (On left wall near tubelet)",
-      "GY01: Top of the Entrance Area"
-      },
-      "GY02": {
-      "GY02: Lost Sock (In shipwreck)",
-      "GY02: Purple Shiny Object (On mast under 1st ship wall jump section)",
-      "GY02: Shipwreck Bungee",
-      "GY02: Top of the Stack of Ships"
-      },
-      "GY03": {
-      "GY03: Destroy the Robot Ship",
-      "GY03: Get Aloft There, Matey!",
-      "GY03: Lost Sock (On rope on robot ship)",
-      "GY03: Purple Shiny Object (On top of mast)",
-      "GY03: Ship Cannon #1 (On deck)",
-      "GY03: Ship Cannon #2 (On middle mast)",
-      "GY03: Ship Cannon #3 (On front mast)",
-      "GY03: Ship Cannon #4 (Near steering wheel)",
-      "GY04: Defeat the Flying Dutchman"
-      },
-      "Spongebob's Dream": {
-      "Dream01: Across the Dreamscape",
-      "Dream01: Follow the Bouncing Ball",
-      "Dream01: Purple Shiny Object (Behind Krusty Krab)",
-      "Dream01: Super Bounce",
-      "Dream02: Lost Sock #1 (On top slide near skull)",
-      "Dream02: Lost Sock #2 (Oil tower)",
-      "Dream02: Lost Sock #3 (Behind house on Swingers platform)",
-      "Dream02: Purple Shiny Object #1 (On tikis near start)",
-      "Dream02: Purple Shiny Object #2 (In flower)",
-      "Dream02: Slidin' Texas Style",
-      "Dream02: Swingers Ahoy",
-      "Dream03: Lost Sock (In air near trampoline)",
-      "Dream03: Music is in the Ear of the Beholder",
-      "Dream03: Purple Shiny Object (On clarinet)",
-      "Dream04: Krabby Patty Platforms",
-      "Dream04: Lost Sock (Behind grill)",
-      "Dream04: Purple Shiny Object (On floating tiki near start)",
-      "Dream05: Here You Go"
-      },
-      "Dream01": {
-      "Dream01: Across the Dreamscape",
-      "Dream01: Follow the Bouncing Ball",
-      "Dream01: Purple Shiny Object (Behind Krusty Krab)",
-      "Dream01: Super Bounce",
-      "Dream05: Here You Go"
-      },
-      "Dream02": {
-      "Dream02: Lost Sock #1 (On top slide near skull)",
-      "Dream02: Lost Sock #2 (Oil tower)",
-      "Dream02: Lost Sock #3 (Behind house on Swingers platform)",
-      "Dream02: Purple Shiny Object #1 (On tikis near start)",
-      "Dream02: Purple Shiny Object #2 (In flower)",
-      "Dream02: Slidin' Texas Style",
-      "Dream02: Swingers Ahoy"
-      },
-      "Dream03": {
-      "Dream03: Lost Sock (In air near trampoline)",
-      "Dream03: Music is in the Ear of the Beholder",
-      "Dream03: Purple Shiny Object (On clarinet)"
-      },
-      "Dream04": {
-      "Dream04: Krabby Patty Platforms",
-      "Dream04: Lost Sock (Behind grill)",
-      "Dream04: Purple Shiny Object (On floating tiki near start)"
-      },
-      "Level Item Rewards": {
-      "JF01: Defeat King Jellyfish",
-      "BB01: End of the Road",
-      "GL01: Save the Children",
-      "Merm02: Shut Down the Security System",
-      "Merm05: Defeat Prawn",
-      "RB01: Return the Museum's Art",
-      "SM03: Lost Sock #1 (At end after destroying all Sandmans)",
-      "KF01: Find All the Lost Campers",
-      "KF04: Power Crystal Crisis",
-      "GY03: Destroy the Robot Ship",
-      "GY03: Get Aloft There, Matey!",
-      "GY03: Purple Shiny Object (On top of mast)",
-      "GY04: Defeat the Flying Dutchman",
-      }
-    }
+    location_name_groups = location_name_groups
 
     web = BattleForBikiniBottomWeb()
     ut_can_gen_without_yaml = True
+    tracker_world = TrackerWorld()
 
     def __init__(self, multiworld: "MultiWorld", player: int):
         super().__init__(multiworld, player)
@@ -703,8 +96,6 @@ class BattleForBikiniBottom(World):
         self.sock_counter: int = 0
         self.required_socks: int = 80
         self.required_spats: int = 75
-        tracker_variant = settings.get_settings().bfbb_options.tracker_variant or 'detailed'
-        BattleForBikiniBottom.tracker_world = tracker_world_overview if tracker_variant == 'overview' else tracker_world_detailed
 
     def generate_early(self) -> None:
         if hasattr(self.multiworld, "re_gen_passthrough"):
@@ -854,6 +245,21 @@ class BattleForBikiniBottom(World):
                 if option.value != v:
                     option.value = v
 
+    def collect(self, state: CollectionState, item: Item) -> bool:
+        change = super().collect(state, item)
+        if change and item.name in so_values:
+            state.prog_items[self.player][SO_VALUE] += so_values[item.name]
+        return change
+
+    def remove(self, state: CollectionState, item: Item) -> bool:
+        change = super().remove(state, item)
+        if change:
+            # anything might be unreachable now
+            state.prog_items[self.player][SO_FARMABLE] = 0
+            if item.name in so_values:
+                state.prog_items[self.player][SO_VALUE] -= so_values[item.name]
+        return change
+
     def create_item(self, name: str, ) -> Item:
         item_data = item_table[name]
         classification = item_data.classification
@@ -0,0 +1,163 @@
+"""
+Benchmarks of the client sync loop against a synthetic emulator image (FakeDolphinMemory).
+Run from the Archipelago directory with `python -m worlds.bfbb.bench.ClientBench`.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Callable, Dict, List, Optional
+
+from NetUtils import NetworkItem
+
+from .. import BfBBClient
+from ..BfBBClient import BfBBContext, CheckTypes
+from ..Memory import FakeDolphinMemory, FakeScene
+from ..Profiling import percentiles
+
+SCENES = (b'HB01', b'JF01', b'GL01', b'SM03', b'KF04', b'GY03')
+BACKLOGS = (0, 50, 500)
+ALL_CHECK_TYPES = CheckTypes.SPAT | CheckTypes.SOCK | CheckTypes.SKILLS | CheckTypes.GOLDEN_UNDERWEAR | \
+                  CheckTypes.LEVEL_ITEMS | CheckTypes.PURPLE_SO
+# objs update_delayed_items touches besides the ones of the location checks
+DELAYED_ITEM_OBJS = [
+    BfBBClient.BALLOON_KID_COUNTER_ID,
+    BfBBClient.BALLOON_KID_TASKBOX_ID,
+    BfBBClient.SANDMAN_CNTR_ID,
+    BfBBClient.SANDMAN_SOCK_ID,
+    BfBBClient.POWERCRYSTAL_COUNTER_ID,
+    *BfBBClient.POWERCRYSTAL_TASKBOX_IDS,
+    BfBBClient.CANNON_BUTTON_SPAT_ID,
+    *BfBBClient.CANNON_BUTTON_PLAT_IDS,
+]
+
+
+def make_context(scene: bytes, backlog: int, seed: int = 0) -> BfBBContext:
+    """A connected, in game context with every obj a tick of `scene` looks at and `backlog` items not given yet."""
+    memory = FakeDolphinMemory(BfBBClient.GAME_ID)
+    fake_scene = FakeScene(memory, scene, BfBBClient.CUR_SCENE_PTR_ADDR, BfBBClient.SCENE_OBJ_LIST_PTR_ADDR,
+                           BfBBClient.SCENE_OBJ_LIST_SIZE_ADDR)
+    obj_ids = [obj_id for check in BfBBClient._get_location_checks(scene, ALL_CHECK_TYPES) for obj_id in check.obj_ids]
+    obj_ids += [info[1] for info in DELAYED_ITEM_OBJS if info[0] == scene]
+    for obj_id in obj_ids:
+        if obj_id not in fake_scene.objs:
+            fake_scene.add_obj(obj_id)
+    memory.write_word(BfBBClient.MAX_HEALTH_ADDR, 3)
+    memory.write_word(BfBBClient.HEALTH_ADDR, 3)
+    ctx = BfBBContext(None, None, memory=memory)
+    ctx.included_check_types = ALL_CHECK_TYPES
+    ctx.ring_link = True
+    rng = random.Random(seed)
+    item_ids = list(BfBBClient.ITEM_EFFECTS.keys())
+    ctx.items_received_2 = [(NetworkItem(rng.choice(item_ids), -1, 0, 0), idx) for idx in range(backlog)]
+    ctx.spat_count = ctx.sock_count = backlog
+    return ctx
+
+
+def reset_backlog(ctx: BfBBContext):
+    # let the game ask for every item again, so each run gives the whole backlog
+    ctx.memory.write_word(BfBBClient.EXPECTED_INDEX_ADDR, 0)
+
+
+async def run_tick(ctx: BfBBContext):
+    """One in game tick of dolphin_sync_task, without validate_save and the wait for the next tick."""
+    BfBBClient.check_ingame(ctx)
+    BfBBClient._update_obj_cache_key(ctx)
+    ctx.use_obj_cache = True
+    try:
+        await BfBBClient.give_items(ctx)
+        await BfBBClient.check_locations(ctx)
+        await BfBBClient.handle_ring_link(ctx)
+    finally:
+        ctx.use_obj_cache = False
+        ctx.obj_cache.table = None
+
+
+def _with_obj_cache(func: Callable) -> Callable:
+    # like in a real tick, obj ptrs are cached while the scene stays loaded
+    async def run_with_obj_cache(ctx: BfBBContext):
+        BfBBClient._update_obj_cache_key(ctx)
+        ctx.use_obj_cache = True
+        try:
+            await func(ctx)
+        finally:
+            ctx.use_obj_cache = False
+            ctx.obj_cache.table = None
+    return run_with_obj_cache
+
+
+BENCHMARKS: Dict[str, Callable] = {
+    "tick": run_tick,
+    "give_items": _with_obj_cache(BfBBClient.give_items),
+    "check_locations": _with_obj_cache(BfBBClient.check_locations),
+    "update_delayed_items": _with_obj_cache(BfBBClient.update_delayed_items),
+    "handle_ring_link": _with_obj_cache(BfBBClient.handle_ring_link),
+}
+
+
+async def bench(name: str, scene: bytes, backlog: int, ticks: int) -> dict:
+    ctx = make_context(scene, backlog)
+    func = BENCHMARKS[name]
+    durations: List[float] = []
+    calls = 0
+    for _ in range(ticks):
+        reset_backlog(ctx)
+        ctx.memory.take()
+        start = time.perf_counter()
+        await func(ctx)
+        durations.append(time.perf_counter() - start)
+        calls += ctx.memory.take()["calls"]
+    p = percentiles(durations)
+    return {
+        "benchmark": name,
+        "scene": scene.decode('ascii'),
+        "backlog": backlog,
+        "ticks": ticks,
+        "ops_per_sec": ticks / sum(durations),
+        "p50_ms": p[50] * 1000,
+        "p95_ms": p[95] * 1000,
+        "p99_ms": p[99] * 1000,
+        "memory_calls_per_tick": calls / ticks,
+    }
+
+
+async def run(benchmarks: List[str], scenes: List[bytes], backlogs: List[int], ticks: int) -> List[dict]:
+    # the real client gives the game a moment to pick up written items, that is waiting and not work
+    settle_delay = BfBBClient.ITEM_SETTLE_DELAY
+    BfBBClient.ITEM_SETTLE_DELAY = 0
+    try:
+        return [await bench(name, scene, backlog, ticks)
+                for name in benchmarks for scene in scenes for backlog in backlogs]
+    finally:
+        BfBBClient.ITEM_SETTLE_DELAY = settle_delay
+
+
+def print_results(results: List[dict]):
+    print(f"{'benchmark':<22}{'scene':<7}{'backlog':>8}{'ops/s':>11}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'calls':>8}")
+    for r in results:
+        print(f"{r['benchmark']:<22}{r['scene']:<7}{r['backlog']:>8}{r['ops_per_sec']:>11.0f}{r['p50_ms']:>9.3f}"
+              f"{r['p95_ms']:>9.3f}{r['p99_ms']:>9.3f}{r['memory_calls_per_tick']:>8.0f}")
+
+
+def main(args: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the BfBB client sync loop against a fake emulator.")
+    parser.add_argument("--benchmark", nargs="*", choices=list(BENCHMARKS.keys()), default=list(BENCHMARKS.keys()))
+    parser.add_argument("--scene", nargs="*", default=[scene.decode('ascii') for scene in SCENES])
+    parser.add_argument("--backlog", nargs="*", type=int, default=list(BACKLOGS))
+    parser.add_argument("--ticks", type=int, default=200, help="runs per benchmark")
+    parser.add_argument("--json", help="also write the results as json lines to this file")
+    parsed = parser.parse_args(args)
+    results = asyncio.run(run(parsed.benchmark, [scene.encode('ascii') for scene in parsed.scene],
+                              parsed.backlog, parsed.ticks))
+    print_results(results)
+    if parsed.json:
+        with open(parsed.json, "w", encoding="utf-8") as f:
+            for r in results:
+                f.write(json.dumps(r))
+                f.write("\n")
+
+
+if __name__ == '__main__':
+    main()
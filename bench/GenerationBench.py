@@ -0,0 +1,202 @@
+"""
+Generation benchmarks for Battle for Bikini Bottom over the option matrix.
+Run from the Archipelago directory with `python -m worlds.bfbb.bench.GenerationBench`.
+
+Use --save-baseline to store the results and --baseline to compare a later run against them.
+"""
+import argparse
+import itertools
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from argparse import Namespace
+from typing import Callable, Dict, List, Optional, Tuple
+
+from BaseClasses import CollectionState, MultiWorld
+from Fill import distribute_items_restrictive
+from worlds import AutoWorld
+from worlds.AutoWorld import call_all
+from test.general import gen_steps
+
+from ..constants import game_name
+
+INCLUDE_OPTIONS = ("include_socks", "include_skills", "include_golden_underwear", "include_level_items",
+                   "include_purple_so")
+GATE_COSTS = ("off", "low", "mid", "high")
+
+
+def option_matrix(full: bool) -> List[Dict[str, object]]:
+    """Every include_* combination if `full`, else all of them on or off, always with every gate cost setting."""
+    include_sets = itertools.product((True, False), repeat=len(INCLUDE_OPTIONS)) if full else \
+        [(True,) * len(INCLUDE_OPTIONS), (False,) * len(INCLUDE_OPTIONS)]
+    return [{**dict(zip(INCLUDE_OPTIONS, includes)), "randomize_gate_cost": gate_cost}
+            for includes in include_sets for gate_cost in GATE_COSTS]
+
+
+def config_name(options: Dict[str, object], players: int, mixed_with: Optional[str]) -> str:
+    includes = "".join("1" if options[name] else "0" for name in INCLUDE_OPTIONS)
+    mix = f"+{mixed_with}" if mixed_with else ""
+    return f"{players}p{mix} inc={includes} gate={options['randomize_gate_cost']}"
+
+
+class RuleCounter:
+    """Wraps the access rules of the BfBB locations and entrances to count how often they are evaluated."""
+
+    def __init__(self):
+        self.count = 0
+
+    def wrap(self, rule: Callable) -> Callable:
+        def counted(state: CollectionState) -> bool:
+            self.count += 1
+            return rule(state)
+        return counted
+
+    def install(self, multiworld: MultiWorld):
+        for player in multiworld.get_game_players(game_name):
+            for location in multiworld.get_locations(player):
+                location.access_rule = self.wrap(location.access_rule)
+            for entrance in multiworld.get_entrances(player):
+                entrance.access_rule = self.wrap(entrance.access_rule)
+
+
+def setup_multiworld(players: int, options: Dict[str, object], mixed_with: Optional[str], seed: int) -> MultiWorld:
+    # every other slot is of the mixed in game, if any
+    games = {player: mixed_with if mixed_with and player % 2 == 0 else game_name for player in range(1, players + 1)}
+    multiworld = MultiWorld(players)
+    multiworld.game = games
+    multiworld.player_name = {player: f"Player{player}" for player in games}
+    multiworld.set_seed(seed)
+    args = Namespace()
+    for game in set(games.values()):
+        for name, option in AutoWorld.AutoWorldRegister.world_types[game].options_dataclass.type_hints.items():
+            values = getattr(args, name, {})
+            for player, player_game in games.items():
+                if player_game == game:
+                    values[player] = option.from_any(options.get(name, option.default) if game == game_name
+                                                     else option.default)
+            setattr(args, name, values)
+    multiworld.set_options(args)
+    multiworld.state = CollectionState(multiworld)
+    return multiworld
+
+
+def generate(players: int, options: Dict[str, object], mixed_with: Optional[str], seed: int) -> Tuple[dict, int]:
+    """Run all generation steps, the fill and a beatability check, returns the time per stage and rule evaluations."""
+    times = {}
+    multiworld = setup_multiworld(players, options, mixed_with, seed)
+    for step in gen_steps:
+        start = time.perf_counter()
+        call_all(multiworld, step)
+        times[step] = time.perf_counter() - start
+    start = time.perf_counter()
+    distribute_items_restrictive(multiworld)
+    times["fill"] = time.perf_counter() - start
+    start = time.perf_counter()
+    multiworld.can_beat_game(CollectionState(multiworld))
+    times["access_check"] = time.perf_counter() - start
+    # count rule evaluations on a separate check, so the wrappers don't show up in the timings
+    counter = RuleCounter()
+    counter.install(multiworld)
+    multiworld.can_beat_game(CollectionState(multiworld))
+    return times, counter.count
+
+
+def peak_memory(players: int, options: Dict[str, object], mixed_with: Optional[str], seed: int) -> int:
+    # tracing slows everything down, so this is its own run
+    tracemalloc.start()
+    try:
+        generate(players, options, mixed_with, seed)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(players_list: List[int], mixed_with: Optional[str], full_matrix: bool, repeats: int, seed: int,
+        measure_memory: bool) -> Dict[str, dict]:
+    results = {}
+    for players in players_list:
+        for options in option_matrix(full_matrix):
+            name = config_name(options, players, mixed_with)
+            stage_times: Dict[str, List[float]] = {}
+            rule_evaluations = 0
+            failures = 0
+            for i in range(repeats):
+                try:
+                    times, rule_evaluations = generate(players, options, mixed_with, seed + i)
+                except Exception as e:
+                    # high gate costs are allowed to fail on small seeds
+                    failures += 1
+                    print(f"{name}: seed {seed + i} failed: {e!r}", file=sys.stderr)
+                    continue
+                for stage, duration in times.items():
+                    stage_times.setdefault(stage, []).append(duration)
+            result = {
+                "stages_ms": {stage: statistics.median(values) * 1000 for stage, values in stage_times.items()},
+                "rule_evaluations": rule_evaluations,
+                "failures": failures,
+            }
+            result["total_ms"] = sum(result["stages_ms"].values())
+            if measure_memory:
+                try:
+                    result["peak_memory_kib"] = peak_memory(players, options, mixed_with, seed) // 1024
+                except Exception:
+                    pass
+            results[name] = result
+            print(f"{name}: {result['total_ms']:.0f} ms, {rule_evaluations} rule evaluations"
+                  f"{f', {failures} failed' if failures else ''}")
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> int:
+    """Print the change of every config and stage against the baseline, returns the number of regressions."""
+    regressions = 0
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name}: not in baseline")
+            continue
+        base = baseline[name]
+        checks = [("total", result["total_ms"], base["total_ms"])]
+        checks += [(stage, duration, base["stages_ms"][stage])
+                   for stage, duration in result["stages_ms"].items() if stage in base["stages_ms"]]
+        checks.append(("rule_evaluations", result["rule_evaluations"], base["rule_evaluations"]))
+        if "peak_memory_kib" in result and "peak_memory_kib" in base:
+            checks.append(("peak_memory", result["peak_memory_kib"], base["peak_memory_kib"]))
+        for what, value, base_value in checks:
+            if not base_value:
+                continue
+            change = value / base_value - 1
+            if change > threshold:
+                regressions += 1
+                print(f"REGRESSION {name} {what}: {base_value:.1f} -> {value:.1f} ({change:+.1%})")
+            elif what == "total":
+                print(f"{name}: {base_value:.1f} -> {value:.1f} ms ({change:+.1%})")
+    return regressions
+
+
+def main(args: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark BfBB generation over the option matrix.")
+    parser.add_argument("--players", nargs="*", type=int, default=[1, 4], help="slots per multiworld")
+    parser.add_argument("--mixed-with", help="game to put in every other slot, BfBB only if not given")
+    parser.add_argument("--full-matrix", action="store_true", help="every include_* combination")
+    parser.add_argument("--repeats", type=int, default=3, help="seeds per config, the median time is reported")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--memory", action="store_true", help="measure peak memory in an extra traced run")
+    parser.add_argument("--save-baseline", help="write the results to this file")
+    parser.add_argument("--baseline", help="compare the results with this file")
+    parser.add_argument("--threshold", type=float, default=.1, help="relative increase reported as regression")
+    parsed = parser.parse_args(args)
+    results = run(parsed.players, parsed.mixed_with, parsed.full_matrix, parsed.repeats, parsed.seed, parsed.memory)
+    if parsed.save_baseline:
+        with open(parsed.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+    if parsed.baseline:
+        with open(parsed.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, parsed.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Import time benchmark for Battle for Bikini Bottom.
+Run from the Archipelago directory with `python -m worlds.bfbb.bench.ImportBench`.
+
+Every run imports the world in a fresh interpreter with `-X importtime`,
+so the numbers are what Archipelago pays for the world on startup.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+PACKAGE = "worlds.bfbb"
+# modules which are only needed for patching, the client or the tracker and shouldn't load with the world
+# Rom itself has to load, the patch container registers itself with it
+HEAVY_MODULES = (f"{PACKAGE}.inc.wwrando.wwlib.gcm", f"{PACKAGE}.PatchCache", f"{PACKAGE}.PatchWorker",
+                 f"{PACKAGE}.HipEditor", f"{PACKAGE}.Delta", f"{PACKAGE}.BatchPatch", f"{PACKAGE}.Tracker",
+                 f"{PACKAGE}.BfBBClient", "pythonnet")
+
+
+def import_times(module: str) -> Dict[str, int]:
+    """Import `module` in a new interpreter, returns the cumulative import time in us per loaded module."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def run(repeats: int, top: int) -> dict:
+    runs = [import_times(PACKAGE) for _ in range(repeats)]
+    own: Dict[str, List[int]] = {}
+    for times in runs:
+        for name, cumulative in times.items():
+            if name == PACKAGE or name.startswith(f"{PACKAGE}."):
+                own.setdefault(name, []).append(cumulative)
+    medians = {name: statistics.median(values) / 1000 for name, values in own.items()}
+    result = {
+        "total_ms": medians.get(PACKAGE, 0.),
+        "modules_ms": dict(sorted(medians.items(), key=lambda v: v[1], reverse=True)[:top]),
+        "heavy_loaded": [name for name in HEAVY_MODULES if any(name in times for times in runs)],
+    }
+    print(f"import {PACKAGE}: {result['total_ms']:.1f} ms (median of {repeats})")
+    for name, duration in result["modules_ms"].items():
+        print(f"  {name}: {duration:.1f} ms")
+    for name in result["heavy_loaded"]:
+        print(f"  WARNING {name} is loaded with the world")
+    return result
+
+
+def main(args: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the import time of the BfBB world.")
+    parser.add_argument("--repeats", type=int, default=5, help="fresh interpreters, the median time is reported")
+    parser.add_argument("--top", type=int, default=10, help="number of submodules to list")
+    parser.add_argument("--json", help="write the results to this file")
+    parsed = parser.parse_args(args)
+    result = run(parsed.repeats, parsed.top)
+    if parsed.json:
+        with open(parsed.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=1)
+    if result["heavy_loaded"]:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
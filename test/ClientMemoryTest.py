@@ -0,0 +1,168 @@
+import asyncio
+import random
+import struct
+import unittest
+from unittest import mock
+
+from .. import BfBBClient
+from ..Items import item_table
+from ..Memory import CoalescedReader, FakeDolphinMemory, FakeScene
+from ..Profiling import TickProfiler
+from ..constants import ItemNames
+
+
+class ObjTableTest(unittest.TestCase):
+    def setUp(self):
+        self.memory = FakeDolphinMemory(BfBBClient.GAME_ID)
+        self.scene = FakeScene(self.memory, b'JF01', BfBBClient.CUR_SCENE_PTR_ADDR,
+                               BfBBClient.SCENE_OBJ_LIST_PTR_ADDR, BfBBClient.SCENE_OBJ_LIST_SIZE_ADDR,
+                               table_size=0x40)
+        self.ctx = BfBBClient.BfBBContext(None, None, memory=self.memory)
+
+    def test_snapshot_matches_probing(self):
+        # ids colliding on the same slot to exercise linear probing and the rollover at the end of the table
+        ids = [0x39fe1ac4, 0x39fe1ac5, 0x7f, 0xbf, 0xff, 0x13f, 0x3e]
+        for obj_id in ids:
+            self.scene.add_obj(obj_id)
+        table = BfBBClient._read_obj_table(self.ctx)
+        for obj_id in ids:
+            self.assertEqual(self.scene.objs[obj_id], BfBBClient._find_obj_in_obj_table(self.ctx, obj_id))
+            self.assertEqual(self.scene.objs[obj_id], table[obj_id])
+        self.assertIsNone(BfBBClient._find_obj_in_obj_table(self.ctx, 0x1234))
+        self.assertNotIn(0x1234, table)
+
+    def test_snapshot_follows_probe_chains(self):
+        # 0x3f is in the last slot, the ids after it wrap around to the start of the table
+        for obj_id in (0x3f, 0x7f, 0xbf, 0x45):
+            self.scene.add_obj(obj_id)
+        # a stale copy of 0x45 before its own slot, the game never gets to it
+        self.memory.write_bytes(self.scene.table_ptr + 0x2 * 0x8, struct.pack(">II", 0x45, self.memory.alloc(0x300)))
+        table = BfBBClient._read_obj_table(self.ctx)
+        for obj_id in (0x3f, 0x7f, 0xbf, 0x45):
+            self.assertEqual(self.scene.objs[obj_id], BfBBClient._find_obj_in_obj_table(self.ctx, obj_id))
+            self.assertEqual(self.scene.objs[obj_id], table[obj_id])
+        # vacating the last slot cuts the wrapped ids off from their slot
+        self.memory.write_bytes(self.scene.table_ptr + 0x3f * 0x8, bytes(0x8))
+        table = BfBBClient._read_obj_table(self.ctx)
+        for obj_id in (0x3f, 0x7f, 0xbf):
+            self.assertIsNone(BfBBClient._find_obj_in_obj_table(self.ctx, obj_id))
+            self.assertNotIn(obj_id, table)
+        self.assertEqual(self.scene.objs[0x45], table[0x45])
+
+    def test_cache_dropped_on_scene_change(self):
+        obj_ptr = self.scene.add_obj(0x39fe1ac4)
+        self.ctx.use_obj_cache = True
+        BfBBClient._update_obj_cache_key(self.ctx)
+        self.assertEqual(obj_ptr, BfBBClient._get_obj_ptr(self.ctx, 0x39fe1ac4))
+        FakeScene(self.memory, b'JF02', BfBBClient.CUR_SCENE_PTR_ADDR,
+                  BfBBClient.SCENE_OBJ_LIST_PTR_ADDR, BfBBClient.SCENE_OBJ_LIST_SIZE_ADDR)
+        BfBBClient._update_obj_cache_key(self.ctx)
+        self.assertIsNone(BfBBClient._get_obj_ptr(self.ctx, 0x39fe1ac4))
+
+    def test_misses_are_cached(self):
+        obj_ptr = self.scene.add_obj(0x39fe1ac4)
+        self.ctx.use_obj_cache = True
+        BfBBClient._update_obj_cache_key(self.ctx)
+        self.assertEqual(obj_ptr, BfBBClient._get_obj_ptr(self.ctx, 0x39fe1ac4))
+        self.assertIsNone(BfBBClient._get_obj_ptr(self.ctx, 0x1234))
+        # next tick, neither the hit nor the miss reads the obj table again
+        BfBBClient._update_obj_cache_key(self.ctx)
+        with mock.patch.object(self.memory, "read_bytes", wraps=self.memory.read_bytes) as read_bytes:
+            self.assertEqual(obj_ptr, BfBBClient._get_obj_ptr(self.ctx, 0x39fe1ac4))
+            self.assertIsNone(BfBBClient._get_obj_ptr(self.ctx, 0x1234))
+        read_bytes.assert_not_called()
+        # a new scene can have the obj
+        scene = FakeScene(self.memory, b'JF02', BfBBClient.CUR_SCENE_PTR_ADDR,
+                          BfBBClient.SCENE_OBJ_LIST_PTR_ADDR, BfBBClient.SCENE_OBJ_LIST_SIZE_ADDR)
+        obj_ptr = scene.add_obj(0x1234)
+        BfBBClient._update_obj_cache_key(self.ctx)
+        self.assertEqual(obj_ptr, BfBBClient._get_obj_ptr(self.ctx, 0x1234))
+
+
+class CoalescedReaderTest(unittest.TestCase):
+    def test_ranges_are_merged(self):
+        memory = FakeDolphinMemory()
+        memory.write_bytes(0x80400000, bytes(range(0x10)))
+        memory.write_bytes(0x80480000, b'\xca\xfe')
+        reads = []
+
+        def read_bytes(addr: int, size: int) -> bytes:
+            reads.append((addr, size))
+            return memory.read_bytes(addr, size)
+
+        reader = CoalescedReader(read_bytes, max_gap=0x8)
+        reader.request(0x80400000, 0x4)
+        reader.request(0x80400008, 0x4)
+        reader.request(0x80480000, 0x2)
+        self.assertEqual(2, reader.execute())
+        self.assertEqual([(0x80400000, 0xc), (0x80480000, 0x2)], reads)
+        self.assertEqual(bytes([8, 9, 10, 11]), bytes(reader.read(0x80400008, 0x4)))
+        self.assertEqual(0xcafe, reader.read_int(0x80480000, 0x2))
+        self.assertIsNone(reader.read(0x80400010, 0x4))
+
+
+class ItemEffectTest(unittest.TestCase):
+    def test_batch_is_written_once_per_address(self):
+        memory = FakeDolphinMemory(BfBBClient.GAME_ID)
+        ctx = BfBBClient.BfBBContext(None, None, memory=memory)
+        ctx.spat_count = ctx.sock_count = 10
+        memory.write_word(BfBBClient.MAX_HEALTH_ADDR, 3)
+        memory.write_word(BfBBClient.SHINY_COUNT_ADDR, 99950)
+        names = [ItemNames.spat, ItemNames.spat, ItemNames.golden_underwear, ItemNames.so_100, ItemNames.lvl_itm_gl]
+        diff = BfBBClient._get_item_diff([item_table[name].id for name in names])
+        self.assertEqual(6, len(diff))
+        BfBBClient._apply_item_diff(ctx, diff)
+        self.assertEqual(2, memory.read_word(BfBBClient.SPAT_COUNT_ADDR))
+        self.assertEqual(4, memory.read_word(BfBBClient.MAX_HEALTH_ADDR))
+        self.assertEqual(4, memory.read_word(BfBBClient.HEALTH_ADDR))
+        self.assertEqual(99999, memory.read_word(BfBBClient.SHINY_COUNT_ADDR))
+        self.assertEqual(1, memory.read_word(BfBBClient.LEVEL_PICKUP_PER_LEVEL_ADDR + 0x4 * 3))
+        self.assertEqual(1, memory.read_byte(BfBBClient.BALLOON_KID_COUNT_ADDR))
+
+
+class LocationStateCacheTest(unittest.TestCase):
+    def test_only_state_reads_change_the_fingerprint(self):
+        memory = FakeDolphinMemory(BfBBClient.GAME_ID)
+        scene = FakeScene(memory, b'JF01', BfBBClient.CUR_SCENE_PTR_ADDR,
+                          BfBBClient.SCENE_OBJ_LIST_PTR_ADDR, BfBBClient.SCENE_OBJ_LIST_SIZE_ADDR)
+        obj_ptrs = [scene.add_obj(obj_id) for obj_id in (0xe5cc6afe, 0xe5cc6aff, 0xe5cc6b00)]
+        ctx = BfBBClient.BfBBContext(None, None, memory=memory)
+        asyncio.run(BfBBClient._check_objects_by_id(ctx, set()))
+        fingerprint = ctx.location_state_cache.fingerprint
+        self.assertIsNotNone(fingerprint)
+        # between the state words of two spats, not part of any check
+        memory.write_byte(obj_ptrs[0] + 0x200, 0xff)
+        asyncio.run(BfBBClient._check_objects_by_id(ctx, set()))
+        self.assertIs(fingerprint, ctx.location_state_cache.fingerprint)
+        offset, size = BfBBClient.CHECK_STATE_READS[BfBBClient._check_pickup_state]
+        memory.write_byte(obj_ptrs[1] + offset + size - 1, 0x1)
+        asyncio.run(BfBBClient._check_objects_by_id(ctx, set()))
+        self.assertIsNot(fingerprint, ctx.location_state_cache.fingerprint)
+
+
+class SyncSchedulerTest(unittest.TestCase):
+    def test_refusals_back_off_until_a_valid_tick(self):
+        scheduler = BfBBClient.SyncScheduler(random.Random(0))
+        jitter = 1 + scheduler.BACKOFF_JITTER
+        first = scheduler.refused_interval()
+        self.assertGreaterEqual(first * jitter, scheduler.REFUSED_BACKOFF_MIN)
+        for _ in range(5):
+            delay = scheduler.refused_interval()
+        self.assertGreaterEqual(delay * jitter, scheduler.BACKOFF_MAX)
+        scheduler.connected()
+        self.assertLessEqual(scheduler.backoff_interval(), scheduler.BACKOFF_MIN * jitter)
+
+
+class TickProfilerTest(unittest.TestCase):
+    def test_early_exits_are_recorded(self):
+        profiler = TickProfiler()
+        for status in ("ok", "menu", "ok", "error"):
+            profiler.begin_tick()
+            with profiler.phase("check_ingame"):
+                pass
+            profiler.end_tick(status)
+        # closing a tick twice doesn't record it again
+        profiler.end_tick("error")
+        self.assertEqual(["ok", "menu", "ok", "error"], [tick["status"] for tick in profiler.ticks])
+        self.assertIn("2 ok, 1 menu, 1 error", profiler.summary()[1])
+
@@ -0,0 +1,39 @@
+import hashlib
+import os
+import tempfile
+import unittest
+
+from ..Delta import apply_delta, read_delta, write_delta
+from ..Rom import BFBB_HASH
+
+
+class DeltaTest(unittest.TestCase):
+    def test_round_trip(self):
+        writes = [(0x2000, b'\x00' * 0x80), (0x1020, (0x80).to_bytes(0x4, "big")), (0x2AB980, b'Player1')]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "test.bfbbdelta")
+            write_delta(path, "9e18f9a0032c4f3092945dc38a6517d3", writes)
+            self.assertEqual(("9e18f9a0032c4f3092945dc38a6517d3", writes), read_delta(path))
+
+    def test_apply(self):
+        base = bytes(range(0x100)) * 0x40
+        writes = [(0x2000, b'\x00' * 0x80), (0x1020, (0x80).to_bytes(0x4, "big")), (0x3FFE, b'end')]
+        expected = bytearray(base)
+        for offset, data in writes:
+            expected[offset:offset + len(data)] = data
+        with tempfile.TemporaryDirectory() as temp_dir:
+            base_iso = os.path.join(temp_dir, "base.iso")
+            with open(base_iso, "wb") as f:
+                f.write(base)
+            path = os.path.join(temp_dir, "test.bfbbdelta")
+            write_delta(path, hashlib.md5(base).hexdigest(), writes)
+            dest = os.path.join(temp_dir, "patched.gcm")
+            apply_delta(path, base_iso, dest)
+            with open(dest, "rb") as f:
+                self.assertEqual(bytes(expected), f.read())
+            # the base stays untouched, even if the clone shares its extents
+            with open(base_iso, "rb") as f:
+                self.assertEqual(base, f.read())
+            write_delta(path, BFBB_HASH, writes)
+            with self.assertRaises(ValueError):
+                apply_delta(path, base_iso, dest)
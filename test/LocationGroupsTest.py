@@ -0,0 +1,16 @@
+import unittest
+
+from ..Locations import location_table, location_name_groups, level_regions
+
+
+class LocationGroupsTest(unittest.TestCase):
+    def test_groups_only_contain_locations(self):
+        for group, locations in location_name_groups.items():
+            self.assertTrue(locations, f"{group} is empty")
+            for location in locations:
+                self.assertIn(location, location_table, f"{location} in {group} is not a location")
+
+    def test_level_groups_are_split_into_region_groups(self):
+        for level, regions in level_regions.items():
+            region_locations = set().union(*[location_name_groups.get(region, set()) for region in regions])
+            self.assertEqual(location_name_groups[level], region_locations, level)
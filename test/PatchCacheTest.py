@@ -0,0 +1,52 @@
+import hashlib
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import Utils
+
+from ..PatchCache import PatchCache, file_md5, make_key
+
+
+class PatchCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = PatchCache(self.temp_dir.name, max_entries=2)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_keys_depend_on_all_parts(self):
+        self.assertEqual(make_key("md5", "1.0", "hb08", [40]), make_key("md5", "1.0", "hb08", [40]))
+        self.assertNotEqual(make_key("md5", "1.0", "hb08", [40]), make_key("md5", "1.0", "hb08", [45]))
+        self.assertNotEqual(make_key("md5", "1.0", "hb08", [40]), make_key("md5", "1.1", "hb08", [40]))
+
+    def test_least_recently_used_are_pruned(self):
+        self.assertIsNone(self.cache.get("a"))
+        self.cache.put("a", b'a')
+        self.cache.put("b", b'b')
+        # make "a" the oldest entry
+        os.utime(os.path.join(self.temp_dir.name, "a.HIP"), (0, 0))
+        self.cache.put("c", b'c')
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(b'b', self.cache.get("b"))
+        self.assertEqual(b'c', self.cache.get("c"))
+
+    def test_unreadable_md5_index(self):
+        rom = os.path.join(self.temp_dir.name, "rom.iso")
+        with open(rom, "wb") as f:
+            f.write(b'rom')
+        index_path = os.path.join(self.temp_dir.name, "bfbb", "rom_hashes.json")
+        os.makedirs(os.path.dirname(index_path))
+        with mock.patch.object(Utils, "cache_path", lambda *path: os.path.join(self.temp_dir.name, *path)):
+            for broken in ('{"truncated', '[]', '{"%s": {"size": 3}}' % rom.replace("\\", "\\\\")):
+                with open(index_path, "w", encoding="utf-8") as f:
+                    f.write(broken)
+                self.assertEqual(hashlib.md5(b'rom').hexdigest(), file_md5(rom))
+            # the index was written again in one piece and nothing was left next to it
+            with open(index_path, encoding="utf-8") as f:
+                self.assertEqual(hashlib.md5(b'rom').hexdigest(), json.load(f)[os.path.abspath(rom)]["md5"])
+            self.assertEqual(["rom_hashes.json"], os.listdir(os.path.dirname(index_path)))
+
@@ -0,0 +1,386 @@
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import types
+import unittest
+import zipfile
+from io import BytesIO
+from unittest import mock
+
+from .. import BatchPatch, HipEditor, PatchWorker as PatchWorkerModule, Rom
+from ..PatchCache import file_md5
+from ..PatchWorker import PatchWorker
+from ..Rom import BfBBContainer
+from ..constants import ConnectionNames
+
+GATE_COSTS = {ConnectionNames.hub1_bb01: 5, ConnectionNames.hub1_gl01: 10, ConnectionNames.hub1_b1: 15,
+              ConnectionNames.hub2_rb01: 25, ConnectionNames.hub2_sm01: 30, ConnectionNames.hub2_b2: 40,
+              ConnectionNames.hub3_kf01: 50, ConnectionNames.hub3_gy01: 60, ConnectionNames.cb_b3: 75}
+
+
+class FakeFileEntry:
+    def __init__(self, file_path: str, file_data_offset: int, file_size: int):
+        self.file_path = file_path
+        self.file_data_offset = file_data_offset
+        self.file_size = file_size
+
+
+class FakeGCM:
+    """
+    The parts of wwrando's GCM the patcher uses, on a disc with a header, a real FST and the file data.
+    Exports lay out all files again, so files changing size move everything after them.
+    """
+    FST_OFFSET = 0x440
+
+    def __init__(self, iso_path: str):
+        self.iso_path = iso_path
+        self.files_by_path = {}
+        self.changed_files = {}
+
+    @classmethod
+    def write_disc(cls, path: str, files: dict):
+        # FST entries are (flags + name offset, data offset or parent, size or next entry) after the root entry
+        tree = {}
+        for file_path, file_data in files.items():
+            *dirs, name = file_path.split("/")
+            node = tree
+            for directory in dirs:
+                node = node.setdefault(directory, {})
+            node[name] = file_data
+        entries = [[1, 0, 0, 0]]
+        names = b'\x00'
+        file_entries = []
+
+        def add(node: dict, parent: int):
+            nonlocal names
+            for name, value in node.items():
+                index = len(entries)
+                entries.append([int(isinstance(value, dict)), len(names), parent, 0])
+                names += name.encode() + b'\x00'
+                if isinstance(value, dict):
+                    add(value, index)
+                    entries[index][3] = len(entries)
+                else:
+                    file_entries.append((entries[index], value))
+
+        add(tree, 0)
+        entries[0][3] = len(entries)
+        data_offset = -(-(cls.FST_OFFSET + len(entries) * 0xC + len(names)) // 0x20) * 0x20
+        data = b''
+        for entry, file_data in file_entries:
+            entry[2] = data_offset + len(data)
+            entry[3] = len(file_data)
+            # padded like on the disc, so files can shrink in place
+            data += file_data + bytes(-len(file_data) % 0x20)
+        fst = b''.join(struct.pack(">III", flags << 24 | name_offset, offset, size)
+                       for flags, name_offset, offset, size in entries) + names
+        header = bytearray(cls.FST_OFFSET)
+        header[0x424:0x42C] = struct.pack(">II", cls.FST_OFFSET, len(fst))
+        with open(path, "wb") as f:
+            f.write(bytes(header) + fst + bytes(data_offset - cls.FST_OFFSET - len(fst)) + data)
+
+    def read_entire_disc(self):
+        with open(self.iso_path, "rb") as f:
+            f.seek(0x424)
+            fst_offset, fst_size = struct.unpack(">II", f.read(0x8))
+            f.seek(fst_offset)
+            fst = f.read(fst_size)
+        count, = struct.unpack_from(">I", fst, 0x8)
+        names = fst[count * 0xC:]
+        # (directory path, index of the entry after it)
+        directories = [("", count)]
+        for index in range(1, count):
+            while index >= directories[-1][1]:
+                directories.pop()
+            flags_name, offset, size = struct.unpack_from(">III", fst, index * 0xC)
+            name_offset = flags_name & 0xFFFFFF
+            name = names[name_offset:names.index(b'\x00', name_offset)].decode()
+            file_path = directories[-1][0] + name
+            if flags_name >> 24:
+                directories.append((file_path + "/", size))
+            else:
+                self.files_by_path[file_path] = FakeFileEntry(file_path, offset, size)
+
+    def read_file_data(self, file_path: str) -> BytesIO:
+        if file_path in self.changed_files:
+            return BytesIO(self.changed_files[file_path].getvalue())
+        entry = self.files_by_path[file_path]
+        with open(self.iso_path, "rb") as f:
+            f.seek(entry.file_data_offset)
+            return BytesIO(f.read(entry.file_size))
+
+    def export_disc_to_folder_with_changed_files(self, output_folder_path: str, only_changed_files: bool):
+        for i, file_path in enumerate(self.files_by_path):
+            path = os.path.join(output_folder_path, file_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(self.read_file_data(file_path).getvalue())
+            yield file_path, i
+        yield None, -1
+
+    def import_all_files_from_disk(self, input_directory: str) -> int:
+        for file_path in self.files_by_path:
+            with open(os.path.join(input_directory, file_path), "rb") as f:
+                self.changed_files[file_path] = BytesIO(f.read())
+        return len(self.files_by_path)
+
+    def export_disc_to_iso_with_changed_files(self, output_file_path: str):
+        self.write_disc(output_file_path, {file_path: self.read_file_data(file_path).getvalue()
+                                           for file_path in self.files_by_path})
+        yield output_file_path, len(self.files_by_path)
+        yield None, -1
+
+
+def fake_edit(name: str, params, data: bytes) -> bytes:
+    # changes the size too, so the files after it have to move
+    return data[::-1] + json.dumps([name, params]).encode()
+
+
+class FakeHipEditor:
+    def __init__(self, lib_path: str):
+        pass
+
+    def edit(self, name: str, params, data: bytes) -> bytes:
+        return fake_edit(name, params, data)
+
+    def close(self):
+        pass
+
+
+class FakePatchWorker:
+    """Answers jobs right away in-process, through a real pipe so edit_in_parallel can wait on it."""
+    started = 0
+
+    def __init__(self, lib_path: str):
+        FakePatchWorker.started += 1
+        self.conn, self._worker_conn = multiprocessing.Pipe()
+        self.alive = True
+
+    def is_alive(self) -> bool:
+        return self.alive
+
+    def submit(self, name: str, params, data: bytes):
+        self._worker_conn.send((True, fake_edit(name, params, data)))
+
+    def result(self, name: str) -> bytes:
+        return self.conn.recv()[1]
+
+    def close(self):
+        self.alive = False
+
+
+def make_patch(include_skills: bool, include_level_items: bool, randomize_gate_cost: int) -> zipfile.ZipFile:
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, "w") as patch:
+        patch.writestr("include_skills", include_skills.to_bytes(1, "little"))
+        patch.writestr("include_level_items", include_level_items.to_bytes(1, "little"))
+        patch.writestr("randomize_gate_cost", randomize_gate_cost.to_bytes(1, "little"))
+        patch.writestr("gate_costs.json", json.dumps(GATE_COSTS))
+        patch.writestr("include_socks", b'\x01')
+        patch.writestr("include_golden_underwear", b'\x00')
+        patch.writestr("seed", bytes(range(0x10)))
+        patch.writestr("archipelago.json", json.dumps({"player_name": "Player1"}))
+    return zipfile.ZipFile(data)
+
+
+class StreamingPatchTest(unittest.TestCase):
+    def setUp(self):
+        FakePatchWorker.started = 0
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.source_iso = os.path.join(self.temp_dir.name, "source.iso")
+        hips = list(HipEditor.FILES_TO_CHECK_SKILLS) + list(HipEditor.FILES_TO_CHECK_LVL_ITEMS) + ['hb01', 'hb08']
+        files = {"sys/main.dol": b'\x00' * 0x40}
+        for i, name in enumerate(hips):
+            # upper case like on the disc
+            files[f"files/{name[:-2].upper()}/{name.upper()}.HIP"] = bytes(range(i, i + 0x30))
+        files["files/mn/mnu3.HIP"] = b'menu' * 0x10
+        FakeGCM.write_disc(self.source_iso, files)
+        fake_gcm_module = types.ModuleType("gcm")
+        fake_gcm_module.GCM = FakeGCM
+        self.options = options = types.SimpleNamespace(hip_cache=False, patch_processes=1, patch_worker=False)
+        self.patches = [
+            mock.patch.dict(sys.modules, {f"{Rom.__package__}.inc.wwrando.wwlib.gcm": fake_gcm_module}),
+            mock.patch.object(Rom, "get_settings", lambda: types.SimpleNamespace(bfbb_options=options)),
+            mock.patch.object(HipEditor, "HipEditor", FakeHipEditor),
+            mock.patch.object(PatchWorkerModule, "PatchWorker", FakePatchWorker),
+            mock.patch.object(BfBBContainer, "prepare_industrial_park", classmethod(lambda cls: "")),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+        self.temp_dir.cleanup()
+
+    def whole_disc_patch(self, patch: zipfile.ZipFile, dest_iso: str):
+        """How patching worked before: extract every file, edit the HIPs on disk and import every file again."""
+        gcm = FakeGCM(self.source_iso)
+        gcm.read_entire_disc()
+        extraction_path = os.path.join(self.temp_dir.name, "extracted")
+        for _, files_done in gcm.export_disc_to_folder_with_changed_files(extraction_path, False):
+            pass
+        for name, params in BfBBContainer.get_patch_hip_edits(patch).items():
+            path = os.path.join(extraction_path, BfBBContainer.get_hip_path(gcm, name))
+            with open(path, "rb") as f:
+                data = f.read()
+            with open(path, "wb") as f:
+                f.write(fake_edit(name, params, data))
+        gcm.import_all_files_from_disk(extraction_path)
+        for _, files_done in gcm.export_disc_to_iso_with_changed_files(dest_iso):
+            pass
+
+    def test_matches_whole_disc_patch(self):
+        for options in ((True, True, 1), (False, True, 0), (True, False, 2)):
+            with self.subTest(options=options):
+                streamed = os.path.join(self.temp_dir.name, "streamed.gcm")
+                whole = os.path.join(self.temp_dir.name, "whole.gcm")
+                BfBBContainer.apply_hiphop_changes(make_patch(*options), self.source_iso, streamed)
+                self.whole_disc_patch(make_patch(*options), whole)
+                with open(streamed, "rb") as f, open(whole, "rb") as g:
+                    self.assertEqual(g.read(), f.read())
+
+    def test_parallel_matches_serial(self):
+        serial = os.path.join(self.temp_dir.name, "serial.gcm")
+        parallel = os.path.join(self.temp_dir.name, "parallel.gcm")
+        BfBBContainer.apply_hiphop_changes(make_patch(True, True, 1), self.source_iso, serial)
+        self.assertEqual(0, FakePatchWorker.started)
+        self.options.patch_processes = 4
+        BfBBContainer.apply_hiphop_changes(make_patch(True, True, 1), self.source_iso, parallel)
+        self.assertEqual(4, FakePatchWorker.started)
+        with open(serial, "rb") as f, open(parallel, "rb") as g:
+            self.assertEqual(f.read(), g.read())
+
+    def test_patch(self):
+        # the fake edits make the HIPs bigger, so the disc is rebuilt, no edits clone the source
+        for options in ((True, True, 1), (False, False, 0)):
+            with self.subTest(options=options):
+                patched = os.path.join(self.temp_dir.name, "patched.gcm")
+                expected = os.path.join(self.temp_dir.name, "expected.gcm")
+                BfBBContainer.patch(make_patch(*options), self.source_iso, patched)
+                shutil.copy(self.source_iso, expected)
+                BfBBContainer.apply_hiphop_changes(make_patch(*options), self.source_iso, expected)
+                BfBBContainer.apply_binary_changes(make_patch(*options), expected)
+                with open(patched, "rb") as f, open(expected, "rb") as g:
+                    self.assertEqual(g.read(), f.read())
+
+    def test_patch_in_place(self):
+        # edits which don't make the HIPs bigger are written over the originals in a clone of the source
+        def shrink(editor, name: str, params, data: bytes) -> bytes:
+            return data[::-1][:-0x4]
+
+        patched = os.path.join(self.temp_dir.name, "patched.gcm")
+        with mock.patch.object(FakeHipEditor, "edit", shrink), \
+                mock.patch.object(BfBBContainer, "export_iso", side_effect=AssertionError("rebuilt the disc")):
+            BfBBContainer.patch(make_patch(True, True, 1), self.source_iso, patched)
+        source = FakeGCM(self.source_iso)
+        source.read_entire_disc()
+        result = FakeGCM(patched)
+        result.read_entire_disc()
+        edits = {BfBBContainer.get_hip_path(source, name) for name in BfBBContainer.get_patch_hip_edits(
+            make_patch(True, True, 1))}
+        self.assertEqual(source.files_by_path.keys(), result.files_by_path.keys())
+        for file_path, entry in source.files_by_path.items():
+            data = source.read_file_data(file_path).getvalue()
+            # every file stays where it was, only the sizes of the edited ones change
+            self.assertEqual(entry.file_data_offset, result.files_by_path[file_path].file_data_offset)
+            self.assertEqual(data[::-1][:-0x4] if file_path in edits else data,
+                             result.read_file_data(file_path).getvalue())
+        with open(patched, "rb") as f:
+            patched_data = f.read()
+        # the DOL patches are there too, writing them again changes nothing
+        expected = bytearray(patched_data)
+        for offset, data in BfBBContainer.get_binary_changes(make_patch(True, True, 1)):
+            expected[offset:offset + len(data)] = data
+        self.assertEqual(bytes(expected), patched_data)
+
+    def test_in_place_hip_changes(self):
+        gcm = FakeGCM(self.source_iso)
+        gcm.read_entire_disc()
+        hb01 = gcm.files_by_path["files/HB/HB01.HIP"]
+        hb08 = gcm.files_by_path["files/HB/HB08.HIP"]
+        changes = BfBBContainer.get_in_place_hip_changes(gcm, self.source_iso, {"hb01": b'hb01', "hb08": b''})
+        # the data goes over the original, the size in the FST entry of that data offset is changed
+        fst_entries = {}
+        with open(self.source_iso, "rb") as f:
+            f.seek(FakeGCM.FST_OFFSET)
+            fst = f.read(0x1000)
+        for index in range(struct.unpack_from(">I", fst, 0x8)[0]):
+            flags_name, offset, size = struct.unpack_from(">III", fst, index * 0xC)
+            if not flags_name >> 24:
+                fst_entries[offset] = FakeGCM.FST_OFFSET + index * 0xC + 0x8
+        self.assertEqual([(hb01.file_data_offset, b'hb01'), (hb08.file_data_offset, b''),
+                          (fst_entries[hb01.file_data_offset], (0x4).to_bytes(0x4, "big")),
+                          (fst_entries[hb08.file_data_offset], (0x0).to_bytes(0x4, "big"))],
+                         sorted(changes[:2]) + sorted(changes[2:]))
+        # bigger than the original, the disc has to be rebuilt
+        self.assertIsNone(BfBBContainer.get_in_place_hip_changes(gcm, self.source_iso,
+                                                                 {"hb01": bytes(hb01.file_size + 1)}))
+        # a HIP the FST doesn't know
+        hb01.file_data_offset += 0x4
+        with self.assertRaises(ValueError):
+            BfBBContainer.get_in_place_hip_changes(gcm, self.source_iso, {"hb01": b'hb01'})
+
+    def test_batch_patch(self):
+        patch_dir = os.path.join(self.temp_dir.name, "patches")
+        output_dir = os.path.join(self.temp_dir.name, "output")
+        os.makedirs(patch_dir)
+        os.makedirs(output_dir)
+        options = [(True, True, 1), (False, True, 0), (False, False, 0)]
+        patch_files = []
+        for i, patch_options in enumerate(options):
+            patch_files.append(os.path.join(patch_dir, f"P{i}.apbfbb"))
+            with open(patch_files[-1], "wb") as f:
+                f.write(make_patch(*patch_options).fp.getvalue())
+        self.options.patch_processes = 2
+        with mock.patch.object(BfBBContainer, "get_rom_path", classmethod(lambda cls: self.source_iso)), \
+                mock.patch.object(BatchPatch, "BFBB_HASH", file_md5(self.source_iso)), \
+                mock.patch.object(BfBBContainer, "check_version", classmethod(lambda cls, patch: True)):
+            results = BatchPatch.batch_patch(patch_files, output_dir, workers=3)
+        for patch_options, result in zip(options, results):
+            expected = os.path.join(self.temp_dir.name, "expected.gcm")
+            BfBBContainer.patch(make_patch(*patch_options), self.source_iso, expected)
+            with open(result, "rb") as f, open(expected, "rb") as g:
+                self.assertEqual(g.read(), f.read())
+
+    def test_batch_patch_checks_the_rom(self):
+        with mock.patch.object(BfBBContainer, "get_rom_path", classmethod(lambda cls: self.source_iso)):
+            with self.assertRaises(Exception):
+                BatchPatch.batch_patch([])
+            self.assertEqual([], BatchPatch.batch_patch([], force=True))
+
+    def test_checked_out_workers_are_not_shared(self):
+        first = PatchWorkerModule.checkout_patch_workers(2, "")
+        second = PatchWorkerModule.checkout_patch_workers(2, "")
+        self.assertFalse(set(first) & set(second))
+        PatchWorkerModule.return_patch_workers(first, True)
+        PatchWorkerModule.return_patch_workers(second, False)
+        self.assertEqual(first, PatchWorkerModule.checkout_patch_workers(2, ""))
+        PatchWorkerModule.close_patch_workers()
+
+
+class PatchWorkerTest(unittest.TestCase):
+    def test_round_trip(self):
+        worker = PatchWorker("", FakeHipEditor)
+        try:
+            self.assertEqual(fake_edit('hb08', [75], b'HIPA'), worker.edit('hb08', [75], b'HIPA'))
+            self.assertEqual(fake_edit('hb01', [5] * 8, b'HIPB'), worker.edit('hb01', [5] * 8, b'HIPB'))
+        finally:
+            worker.close()
+        self.assertFalse(worker.is_alive())
+
+    def test_error(self):
+        # IP can't be loaded from an empty lib path, the error comes back and the worker stays usable
+        worker = PatchWorker("")
+        try:
+            for _ in range(2):
+                with self.assertRaises(RuntimeError):
+                    worker.edit('hb08', [75], b'HIPA')
+            self.assertTrue(worker.is_alive())
+        finally:
+            worker.close()
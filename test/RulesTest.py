@@ -0,0 +1,179 @@
+from BaseClasses import CollectionState
+from .. import Rules
+from ..Rules import HasSOAmount, SO_FARMABLE, SO_VALUE, _RuleCompiler, can_farm_so, so_values
+from ..constants import ConnectionNames, ItemNames, LocationNames
+from . import BfBBTestBase
+
+
+def old_has_so_amount(state: CollectionState, player: int, amount: int):
+    # how the shiny object rules counted before the counters in prog_items
+    if can_farm_so(state, player):
+        return True
+    return sum(state.count(item_name, player) * value for item_name, value in so_values.items()) >= amount
+
+
+# (rule table, location type or None for connections, name, the lambda rule it replaced)
+OLD_RULES = [
+    (Rules.spat_rules, None, ConnectionNames.pineapple_hub1,
+     lambda player: lambda state: state.has(ItemNames.spat, player, 1)),
+    (Rules.spat_rules, ItemNames.spat, LocationNames.spat_ks_01,
+     lambda player: lambda state: state.has(ItemNames.spat, player, min(
+         5, state.multiworld.worlds[player].options.required_spatulas.value))),
+    (Rules.spat_rules, ItemNames.spat, LocationNames.spat_ks_03,
+     lambda player: lambda state: state.has(ItemNames.spat, player, min(
+         15, state.multiworld.worlds[player].options.required_spatulas.value))),
+    (Rules.spat_rules, ItemNames.spat, LocationNames.spat_ks_05,
+     lambda player: lambda state: state.has(ItemNames.spat, player, min(
+         25, state.multiworld.worlds[player].options.required_spatulas.value))),
+    (Rules.spat_rules, ItemNames.spat, LocationNames.spat_ks_08,
+     lambda player: lambda state: state.has(ItemNames.spat, player, min(
+         40, state.multiworld.worlds[player].options.required_spatulas.value))),
+    (Rules.sock_rules, ItemNames.spat, LocationNames.spat_ps_02,
+     lambda player: lambda state: state.has(ItemNames.sock, player, 20)),
+    (Rules.skill_rules, None, ConnectionNames.hub2_b2,
+     lambda player: lambda state: state.has(ItemNames.bubble_bowl, player) or state.has(ItemNames.cruise_bubble,
+                                                                                         player)),
+    (Rules.skill_rules, None, ConnectionNames.cb_b3,
+     lambda player: lambda state: state.has(ItemNames.cruise_bubble, player)),
+    (Rules.skill_rules, ItemNames.spat, LocationNames.spat_b3_02,
+     lambda player: lambda state: state.has(ItemNames.bubble_bowl, player) and state.has(ItemNames.cruise_bubble,
+                                                                                          player)),
+    (Rules.skill_rules, ItemNames.sock, LocationNames.sock_kf01_03,
+     lambda player: lambda state: state.has(ItemNames.bubble_bowl, player)),
+    (Rules.lvl_itm_rules, None, ConnectionNames.bc02_bc05,
+     lambda player: lambda state: state.has(ItemNames.lvl_itm_bc, player, 4)),
+    (Rules.lvl_itm_rules, ItemNames.spat, LocationNames.spat_kf_02,
+     lambda player: lambda state: state.has(ItemNames.lvl_itm_kf1, player, 6)),
+    (Rules.so_krabs_rules, ItemNames.spat, LocationNames.spat_ks_01,
+     lambda player: lambda state: old_has_so_amount(state, player, 3000 / 2)),
+    (Rules.so_krabs_rules, ItemNames.spat, LocationNames.spat_ks_05,
+     lambda player: lambda state: old_has_so_amount(state, player, 20000 / 2)),
+    (Rules.so_krabs_rules, ItemNames.spat, LocationNames.spat_ks_08,
+     lambda player: lambda state: old_has_so_amount(state, player, 39500 / 2)),
+]
+
+STATES = [
+    {},
+    {ItemNames.spat: 1},
+    {ItemNames.spat: 5},
+    {ItemNames.spat: 15},
+    {ItemNames.spat: 20},
+    {ItemNames.spat: 40},
+    {ItemNames.sock: 20},
+    {ItemNames.bubble_bowl: 1},
+    {ItemNames.cruise_bubble: 1},
+    {ItemNames.bubble_bowl: 1, ItemNames.cruise_bubble: 1},
+    {ItemNames.lvl_itm_bc: 4, ItemNames.lvl_itm_kf1: 6},
+    {ItemNames.so_500: 4, ItemNames.so_100: 3},
+    {ItemNames.so_1000: 10, ItemNames.so_750: 3, ItemNames.so_250: 2},
+    # Goo Lagoon and the cruise bubble, shiny objects can be farmed without death link
+    {ItemNames.spat: 10, ItemNames.cruise_bubble: 1, ItemNames.so_500: 1},
+    {ItemNames.spat: 75, ItemNames.bubble_bowl: 1, ItemNames.cruise_bubble: 1},
+]
+
+
+class CompiledRulesTest(BfBBTestBase):
+    options = {
+        "include_socks": True,
+        "include_skills": True,
+        "include_level_items": True,
+        "include_purple_so": True,
+        # less than some Mr. Krabs spatulas need, they are capped at the required spatulas
+        "required_spatulas": 20,
+    }
+
+    def make_state(self, items: dict) -> CollectionState:
+        state = CollectionState(self.multiworld)
+        for name, count in items.items():
+            for _ in range(count):
+                state.collect(self.world.create_item(name), True)
+        return state
+
+    def assert_same_rules(self, rules: list):
+        """Compare every (name, compiled rule, old rule) on every state."""
+        for items in STATES:
+            state = self.make_state(items)
+            for name, compiled, old in rules:
+                with self.subTest(rule=name, items=items):
+                    self.assertEqual(old(state), compiled(state))
+
+    def test_rules_match_old_rules(self):
+        compiler = _RuleCompiler(self.player, self.world.options)
+        rules = []
+        for table, loc_type, name, old in OLD_RULES:
+            requirement = table[0][name] if loc_type is None else table[1][loc_type][name]
+            if type(requirement) == tuple:
+                # force override
+                requirement = requirement[0]
+            rules.append((name, compiler.compile(requirement), old(self.player)))
+        self.assert_same_rules(rules)
+
+    def test_gate_rules_match_old_rules(self):
+        compiler = _RuleCompiler(self.player, self.world.options)
+        rules = []
+        for name, cost in self.world.gate_costs.items():
+            old = (lambda v: lambda state: state.has(ItemNames.spat, self.player, v))(cost)
+            rules.append((name, compiler.compile(Rules.Has(ItemNames.spat, cost)), old))
+        self.assert_same_rules(rules)
+
+    def test_equal_requirements_share_a_rule(self):
+        compiler = _RuleCompiler(self.player, self.world.options)
+        # 25 spatulas are capped to the 20 required ones
+        self.assertIs(compiler.compile(Rules.Has(ItemNames.spat, 20)),
+                      compiler.compile(Rules.spat_rules[1][ItemNames.spat][LocationNames.spat_ks_05]))
+
+
+class CompiledRulesDeathLinkTest(CompiledRulesTest):
+    # randomized gate costs for the gate rules too
+    options = dict(CompiledRulesTest.options, death_link=True, randomize_gate_cost=1)
+
+    def test_so_amount_ignores_farming(self):
+        compiler = _RuleCompiler(self.player, self.world.options)
+        rule = compiler.compile(HasSOAmount(3000 / 2))
+        # Goo Lagoon and the cruise bubble but only 500 shiny objects
+        state = self.make_state(STATES[-2])
+        self.assertFalse(rule(state))
+        self.assertFalse(old_has_so_amount(state, self.player, 3000 / 2))
+
+
+class SOCountersTest(BfBBTestBase):
+    options = {
+        "include_skills": True,
+        "include_purple_so": True,
+    }
+
+    def test_so_value_follows_collect_and_remove(self):
+        rule = _RuleCompiler(self.player, self.world.options).compile(HasSOAmount(1500))
+        state = CollectionState(self.multiworld)
+        items = [self.world.create_item(name) for name in (ItemNames.so_500, ItemNames.so_500, ItemNames.so_500,
+                                                             ItemNames.so_100)]
+        for item in items:
+            state.collect(item, True)
+        self.assertEqual(1500, state.prog_items[self.player][SO_VALUE])
+        self.assertTrue(rule(state))
+        state.remove(items[0])
+        self.assertEqual(1000, state.prog_items[self.player][SO_VALUE])
+        self.assertFalse(rule(state))
+        for item in items[1:]:
+            state.remove(item)
+        self.assertEqual(0, state.prog_items[self.player][SO_VALUE])
+
+    def test_farming_is_reset_on_remove(self):
+        rule = _RuleCompiler(self.player, self.world.options).compile(HasSOAmount(39500 / 2))
+        state = CollectionState(self.multiworld)
+        # Goo Lagoon needs 10 spatulas, farming there needs the cruise bubble
+        for _ in range(10):
+            state.collect(self.world.create_item(ItemNames.spat), True)
+        self.assertFalse(rule(state))
+        cruise_bubble = self.world.create_item(ItemNames.cruise_bubble)
+        state.collect(cruise_bubble, True)
+        self.assertTrue(rule(state))
+        self.assertEqual(1, state.prog_items[self.player][SO_FARMABLE])
+        # a copy keeps the counters, removing from it doesn't touch the original
+        copy = state.copy()
+        copy.remove(cruise_bubble)
+        self.assertEqual(0, copy.prog_items[self.player][SO_FARMABLE])
+        self.assertFalse(rule(copy))
+        self.assertTrue(rule(state))
+        copy.collect(cruise_bubble, True)
+        self.assertTrue(rule(copy))